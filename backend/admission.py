@@ -0,0 +1,220 @@
+"""
+Per-client admission control.
+Each client gets a token bucket per resource (LLM tokens, rows scanned,
+upload bytes); a request is charged its estimated cost up front, waits
+briefly when its bucket is short, and is rejected when the wait would be
+too long. Metered requests also share a fixed number of execution slots,
+so a burst of heavy requests cannot starve cheap endpoints.
+"""
+
+import asyncio
+import sqlite3
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Optional, Tuple
+
+from sql_parser import referenced_tables
+
+# Per-client quota for each resource: (bucket capacity, refill per second)
+DEFAULT_QUOTAS = {
+    "llm_tokens": (4000, 50),
+    "rows_scanned": (10_000_000, 200_000),
+    "upload_bytes": (200 * 1024 * 1024, 2 * 1024 * 1024),
+}
+
+# Longest a request waits for its bucket to refill before it is rejected
+MAX_QUEUE_WAIT_SECONDS = 5.0
+
+# Metered requests allowed to run at once across all clients
+MAX_CONCURRENT_REQUESTS = 16
+
+# Full (idle) buckets are dropped once this many clients are tracked
+MAX_TRACKED_CLIENTS = 1000
+
+
+class RateLimited(Exception):
+    """Raised when a request cannot be admitted within MAX_QUEUE_WAIT_SECONDS."""
+
+    def __init__(self, resource: str, retry_after: float):
+        super().__init__(f"Rate limit exceeded for {resource}; retry in {retry_after:.1f}s")
+        self.resource = resource
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """Token bucket that may go into debt for requests larger than its capacity."""
+
+    def __init__(self, capacity: float, refill_per_second: float):
+        self.capacity = capacity
+        self.refill_per_second = refill_per_second
+        self.tokens = capacity
+        self._updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.refill_per_second)
+        self._updated = now
+
+    def take(self, cost: float) -> float:
+        """
+        Take cost tokens if available.
+
+        A cost above the capacity is admitted once the bucket is full and
+        leaves it in debt, delaying the client's next requests.
+
+        Args:
+            cost: Tokens to take
+
+        Returns:
+            0 if taken, otherwise seconds until enough tokens will be available
+        """
+        self._refill()
+        needed = min(cost, self.capacity)
+        if self.tokens >= needed:
+            self.tokens -= cost
+            return 0.0
+        return (needed - self.tokens) / self.refill_per_second
+
+    def is_full(self) -> bool:
+        self._refill()
+        return self.tokens >= self.capacity
+
+
+class AdmissionController:
+    """Token buckets per (client, resource) plus a shared pool of execution slots."""
+
+    def __init__(
+        self,
+        quotas: Optional[Dict[str, Tuple[float, float]]] = None,
+        max_queue_wait: float = MAX_QUEUE_WAIT_SECONDS,
+        max_concurrent: int = MAX_CONCURRENT_REQUESTS
+    ):
+        self.quotas = quotas or DEFAULT_QUOTAS
+        self.max_queue_wait = max_queue_wait
+        self.max_concurrent = max_concurrent
+        self._buckets: Dict[Tuple[str, str], TokenBucket] = {}
+        self._slots = None
+        self.in_flight = 0
+        self.priority = 0
+        self.metrics = {
+            resource: {"admitted": 0, "queued": 0, "rejected": 0, "cost_total": 0, "queue_wait_ms_total": 0.0}
+            for resource in self.quotas
+        }
+        self.slot_metrics = {"queued": 0, "rejected": 0}
+
+    def _bucket(self, client: str, resource: str) -> TokenBucket:
+        bucket = self._buckets.get((client, resource))
+        if bucket is None:
+            if len(self._buckets) >= MAX_TRACKED_CLIENTS * len(self.quotas):
+                self._buckets = {key: b for key, b in self._buckets.items() if not b.is_full()}
+            bucket = TokenBucket(*self.quotas[resource])
+            self._buckets[(client, resource)] = bucket
+        return bucket
+
+    async def admit(self, client: str, resource: str, cost: float) -> None:
+        """
+        Charge a request's cost to the client's bucket, waiting for it to refill if needed.
+
+        Args:
+            client: Client identity (e.g. remote address)
+            resource: Key of the quotas dict
+            cost: Estimated units the request will consume
+
+        Raises:
+            RateLimited: If the bucket will not refill within max_queue_wait
+        """
+        metrics = self.metrics[resource]
+        bucket = self._bucket(client, resource)
+        start = time.monotonic()
+        queued = False
+        while True:
+            wait = bucket.take(cost)
+            if wait == 0:
+                break
+            waited = time.monotonic() - start
+            if waited + wait > self.max_queue_wait:
+                metrics["rejected"] += 1
+                raise RateLimited(resource, wait)
+            if not queued:
+                queued = True
+                metrics["queued"] += 1
+            await asyncio.sleep(wait)
+
+        metrics["admitted"] += 1
+        metrics["cost_total"] += cost
+        metrics["queue_wait_ms_total"] += (time.monotonic() - start) * 1000
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        """
+        Hold one of the shared execution slots for the duration of a with-block.
+
+        Raises:
+            RateLimited: If no slot frees up within max_queue_wait
+        """
+        if self._slots is None:
+            # Created lazily so the semaphore binds to the running event loop
+            self._slots = asyncio.Semaphore(self.max_concurrent)
+        if self._slots.locked():
+            self.slot_metrics["queued"] += 1
+            try:
+                await asyncio.wait_for(self._slots.acquire(), self.max_queue_wait)
+            except asyncio.TimeoutError:
+                self.slot_metrics["rejected"] += 1
+                raise RateLimited("execution slots", self.max_queue_wait)
+        else:
+            await self._slots.acquire()
+
+        self.in_flight += 1
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+            self._slots.release()
+
+    def stats(self) -> Dict[str, object]:
+        """
+        Report admitted, queued and rejected requests per resource.
+
+        Returns:
+            Dictionary of counters
+        """
+        return {
+            "resources": {
+                resource: {
+                    **metrics,
+                    "queue_wait_ms_total": round(metrics["queue_wait_ms_total"], 1)
+                }
+                for resource, metrics in self.metrics.items()
+            },
+            "slots": {
+                **self.slot_metrics,
+                "in_flight": self.in_flight,
+                "max_concurrent": self.max_concurrent
+            },
+            "priority_requests": self.priority,
+            "tracked_clients": len({client for client, _ in self._buckets})
+        }
+
+
+def count_referenced_rows(conn: sqlite3.Connection, sql: str) -> int:
+    """
+    Estimate rows a query scans as the total size of the tables it references.
+
+    MAX(rowid) is answered from the end of the table's b-tree, so this is
+    cheap even for large tables; views and tables without a rowid count as 0.
+
+    Args:
+        conn: Connection the query will run on
+        sql: SQL query
+
+    Returns:
+        Estimated rows scanned (at least 1)
+    """
+    total = 0
+    for table_name in referenced_tables(sql):
+        try:
+            total += conn.execute(f"SELECT MAX(rowid) FROM {table_name}").fetchone()[0] or 0
+        except sqlite3.Error:
+            pass
+    return max(total, 1)
@@ -0,0 +1,334 @@
+"""
+Storage for uploaded SQLite database files and SQL dumps.
+Database files are kept on disk and ATTACHed read-only (with mmap) to
+connections on the uploaded database, so their rows are never copied.
+"""
+
+import os
+import re
+import sqlite3
+import time
+import logging
+from functools import lru_cache
+from pathlib import Path
+from typing import List, Dict, Any, Optional
+
+logger = logging.getLogger(__name__)
+
+# Directory holding uploaded database files
+ATTACHED_DB_DIR = Path(__file__).parent / 'attached_dbs'
+
+ATTACHED_REGISTRY_TABLE = '_attached_databases'
+
+# Bytes of each attached file to memory-map
+MMAP_SIZE = 256 * 1024 * 1024
+
+# SQLite allows 10 attached databases per connection by default; keep headroom
+MAX_ATTACHED_DATABASES = 8
+
+# Limits applied while executing an uploaded .sql dump
+SQL_DUMP_MAX_BYTES = 512 * 1024 * 1024
+SQL_DUMP_TIMEOUT_SECONDS = 60
+
+SQLITE_HEADER = b'SQLite format 3\x00'
+
+# Built-in schemas and the schema names used by federated connections
+RESERVED_ALIASES = {'main', 'temp', 'ecommerce', 'uploads'}
+
+
+def _ensure_registry(cursor: sqlite3.Cursor) -> None:
+    cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS {ATTACHED_REGISTRY_TABLE} (
+            alias TEXT PRIMARY KEY,
+            filename TEXT NOT NULL,
+            path TEXT NOT NULL,
+            created_at REAL NOT NULL
+        )
+    """)
+
+
+def _database_path(alias: str) -> Path:
+    return ATTACHED_DB_DIR / f"{alias}.db"
+
+
+def read_only_uri(path: Path) -> str:
+    """URI opening a database file read-only."""
+    return f"{path.resolve().as_uri()}?mode=ro"
+
+
+@lru_cache(maxsize=1024)
+def _is_plain_identifier(name: str) -> bool:
+    """Whether SQLite accepts a name unquoted as an identifier (keywords like 'order' are not)."""
+    if not re.fullmatch(r'[A-Za-z_][A-Za-z0-9_]*', name):
+        return False
+    conn = sqlite3.connect(':memory:')
+    try:
+        conn.execute(f"ATTACH DATABASE ':memory:' AS {name}")
+        conn.execute(f"SELECT name FROM {name}.sqlite_master").fetchall()
+        return True
+    except sqlite3.Error:
+        return False
+    finally:
+        conn.close()
+
+
+def make_alias(name: str) -> str:
+    """
+    Turn a sanitized file name into a usable schema alias.
+
+    Aliases are interpolated unquoted into queries and prompts, so names
+    that are SQL keywords get a prefix as well.
+
+    Args:
+        name: Sanitized name
+
+    Returns:
+        Alias that does not clash with SQLite's built-in schemas or keywords
+    """
+    if name in RESERVED_ALIASES or not _is_plain_identifier(name):
+        return f"db_{name}"
+    return name
+
+
+def store_database_file(file_content: bytes, alias: str) -> Path:
+    """
+    Validate an uploaded SQLite file and store it on disk.
+
+    Args:
+        file_content: Raw bytes of the database file
+        alias: Schema alias the database will be attached as
+
+    Returns:
+        Path of the stored file
+    """
+    if not file_content.startswith(SQLITE_HEADER):
+        raise ValueError("File is not a valid SQLite database")
+
+    ATTACHED_DB_DIR.mkdir(exist_ok=True)
+    path = _database_path(alias)
+    tmp_path = path.with_suffix('.tmp')
+    tmp_path.write_bytes(file_content)
+
+    # Make sure SQLite can actually read the schema before accepting it
+    try:
+        conn = sqlite3.connect(read_only_uri(tmp_path), uri=True)
+        try:
+            conn.execute("SELECT name FROM sqlite_master").fetchall()
+        finally:
+            conn.close()
+    except sqlite3.DatabaseError as e:
+        tmp_path.unlink(missing_ok=True)
+        raise ValueError(f"Failed to read SQLite database: {str(e)}")
+
+    os.replace(tmp_path, path)
+    logger.info(f"✅ Stored database file: {path.name}")
+    return path
+
+
+def load_sql_dump(file_content: bytes, alias: str) -> Path:
+    """
+    Execute an uploaded .sql dump into a fresh database file.
+
+    The dump runs in a sandbox: it cannot attach other files, PRAGMAs are
+    ignored, the file size and run time are capped, and journaling is off
+    for fast bulk loading.
+
+    Args:
+        file_content: Raw bytes of the SQL dump
+        alias: Schema alias the database will be attached as
+
+    Returns:
+        Path of the created database file
+    """
+    try:
+        script = file_content.decode('utf-8')
+    except UnicodeDecodeError:
+        raise ValueError("SQL dump must be UTF-8 encoded text")
+
+    ATTACHED_DB_DIR.mkdir(exist_ok=True)
+    path = _database_path(alias)
+    tmp_path = path.with_suffix('.tmp')
+    tmp_path.unlink(missing_ok=True)
+
+    conn = sqlite3.connect(tmp_path)
+    try:
+        # Bulk-load settings must be applied before the authorizer is installed
+        conn.execute("PRAGMA journal_mode = OFF")
+        conn.execute("PRAGMA synchronous = OFF")
+        page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+        conn.execute(f"PRAGMA max_page_count = {SQL_DUMP_MAX_BYTES // page_size}")
+
+        def authorizer(action, arg1, arg2, db_name, trigger):
+            if action in (sqlite3.SQLITE_ATTACH, sqlite3.SQLITE_DETACH):
+                return sqlite3.SQLITE_DENY
+            if action == sqlite3.SQLITE_PRAGMA:
+                return sqlite3.SQLITE_IGNORE
+            if action == sqlite3.SQLITE_FUNCTION and arg2 == 'load_extension':
+                return sqlite3.SQLITE_DENY
+            return sqlite3.SQLITE_OK
+
+        deadline = time.monotonic() + SQL_DUMP_TIMEOUT_SECONDS
+        conn.set_authorizer(authorizer)
+        conn.set_progress_handler(lambda: int(time.monotonic() > deadline), 10000)
+
+        conn.executescript(script)
+        conn.commit()
+    except sqlite3.Error as e:
+        conn.close()
+        tmp_path.unlink(missing_ok=True)
+        raise ValueError(f"Failed to load SQL dump: {str(e)}")
+    finally:
+        conn.close()
+
+    os.replace(tmp_path, path)
+    logger.info(f"✅ Loaded SQL dump into: {path.name}")
+    return path
+
+
+def register_database(conn: sqlite3.Connection, alias: str, filename: str, path: Path) -> None:
+    """
+    Record a stored database file so it is attached to future connections.
+
+    Args:
+        conn: Connection to the uploaded database
+        alias: Schema alias
+        filename: Original upload filename
+        path: Path of the stored file
+    """
+    cursor = conn.cursor()
+    _ensure_registry(cursor)
+    cursor.execute(
+        f"INSERT OR REPLACE INTO {ATTACHED_REGISTRY_TABLE} VALUES (?, ?, ?, ?)",
+        (alias, filename, str(path), time.time())
+    )
+    conn.commit()
+
+
+def unregister_database(conn: sqlite3.Connection, alias: str) -> bool:
+    """
+    Remove an attached database from the registry and delete its file.
+
+    Args:
+        conn: Connection to the uploaded database (without the alias attached)
+        alias: Schema alias
+
+    Returns:
+        True if the alias was registered
+    """
+    cursor = conn.cursor()
+    _ensure_registry(cursor)
+    cursor.execute(f"SELECT path FROM {ATTACHED_REGISTRY_TABLE} WHERE alias = ?", (alias,))
+    row = cursor.fetchone()
+    if row is None:
+        return False
+
+    cursor.execute(f"DELETE FROM {ATTACHED_REGISTRY_TABLE} WHERE alias = ?", (alias,))
+    conn.commit()
+    Path(row[0]).unlink(missing_ok=True)
+    logger.info(f"✅ Removed attached database: {alias}")
+    return True
+
+
+def list_attached_databases(conn: sqlite3.Connection) -> List[Dict[str, Any]]:
+    """
+    List registered database files, most recent first.
+
+    Args:
+        conn: Connection to the uploaded database
+
+    Returns:
+        List of dicts with 'alias', 'filename' and 'path'
+    """
+    cursor = conn.cursor()
+    cursor.execute(
+        "SELECT name FROM sqlite_master WHERE type='table' AND name = ?",
+        (ATTACHED_REGISTRY_TABLE,)
+    )
+    if cursor.fetchone() is None:
+        return []
+
+    cursor.execute(
+        f"SELECT alias, filename, path FROM {ATTACHED_REGISTRY_TABLE} ORDER BY created_at DESC"
+    )
+    return [
+        {"alias": alias, "filename": filename, "path": Path(path)}
+        for alias, filename, path in cursor.fetchall()
+        if Path(path).exists()
+    ]
+
+
+def attach_registered_databases(
+    conn: sqlite3.Connection,
+    registry_conn: Optional[sqlite3.Connection] = None
+) -> List[str]:
+    """
+    ATTACH every registered database file read-only with mmap enabled.
+
+    The connection must have been opened with uri=True.
+
+    Args:
+        conn: Connection to attach the databases to
+        registry_conn: Connection to the uploaded database holding the
+            registry, when it is not conn itself
+
+    Returns:
+        List of attached aliases
+    """
+    databases = list_attached_databases(registry_conn or conn)
+    if len(databases) > MAX_ATTACHED_DATABASES:
+        logger.warning(
+            f"⚠️ {len(databases)} database files uploaded, attaching the "
+            f"{MAX_ATTACHED_DATABASES} most recent"
+        )
+        databases = databases[:MAX_ATTACHED_DATABASES]
+
+    aliases = []
+    for database in databases:
+        alias = database["alias"]
+        try:
+            conn.execute("ATTACH DATABASE ? AS " + alias, (read_only_uri(database["path"]),))
+        except sqlite3.Error as e:
+            # One unusable registry entry must not make the uploaded database unreachable
+            logger.warning(f"⚠️ Could not attach {alias}: {str(e)}")
+            continue
+        conn.execute(f"PRAGMA {alias}.mmap_size = {MMAP_SIZE}")
+        aliases.append(alias)
+    return aliases
+
+
+def quote_table_name(table_name: str) -> str:
+    """
+    SQL for a table name. Tables of attached files (alias.table) keep the
+    names they were created with, so names with spaces or that are keywords
+    are quoted; uploaded table names are already sanitized.
+
+    Args:
+        table_name: Table name, optionally qualified as alias.table
+
+    Returns:
+        Name usable in a query, e.g. alias."Categories Old"
+    """
+    if '.' not in table_name:
+        return table_name
+    alias, name = table_name.split('.', 1)
+    if _is_plain_identifier(name):
+        return table_name
+    return f'{alias}."{name.replace(chr(34), chr(34) * 2)}"'
+
+
+def get_attached_tables(conn: sqlite3.Connection, alias: str) -> List[str]:
+    """
+    List user tables and views of an attached database.
+
+    Args:
+        conn: Connection with the alias attached
+        alias: Schema alias
+
+    Returns:
+        List of table names (unqualified)
+    """
+    cursor = conn.execute(
+        f"SELECT name FROM {alias}.sqlite_master WHERE type IN ('table', 'view') "
+        f"AND name NOT LIKE 'sqlite\\_%' ESCAPE '\\' ORDER BY name"
+    )
+    return [name for (name,) in cursor.fetchall()]
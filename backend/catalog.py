@@ -0,0 +1,133 @@
+"""
+Catalog of every table reachable from a federated connection, and
+selection of the tables relevant to a question so the LLM prompt only
+describes those.
+"""
+
+import sqlite3
+from typing import Dict, List, Any, Set, Tuple
+
+from example_index import tokenize
+
+# Tables described in a federated prompt (before adding join partners)
+MAX_PROMPT_TABLES = 4
+
+# Shared column names that identify an entity and so suggest a join
+KEY_COLUMN_SUFFIXES = ('_id', '_key', '_code', 'email', 'sku', 'uuid')
+
+
+def list_catalog_tables(conn: sqlite3.Connection) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    List user tables of every attached database with qualified names.
+
+    Args:
+        conn: Federated connection (databases attached under their aliases)
+
+    Returns:
+        Schema dictionary keyed by qualified table name (alias.table)
+    """
+    cursor = conn.cursor()
+    catalog = {}
+    for (_, alias, _) in conn.execute("PRAGMA database_list").fetchall():
+        if alias in ('main', 'temp'):
+            continue
+        # Internal tables (rollups, samples, FTS shadow tables, ...) are prefixed with an underscore
+        cursor.execute(
+            f"SELECT name FROM {alias}.sqlite_master WHERE type IN ('table', 'view') "
+            f"AND name NOT LIKE 'sqlite\\_%' ESCAPE '\\' AND name NOT LIKE '\\_%' ESCAPE '\\' ORDER BY name"
+        )
+        for (name,) in cursor.fetchall():
+            cursor.execute(f'PRAGMA {alias}.table_info("{name}")')
+            catalog[f"{alias}.{name}"] = [
+                {
+                    "name": col[1],
+                    "type": col[2],
+                    "isPrimaryKey": bool(col[5])
+                }
+                for col in cursor.fetchall()
+            ]
+    return catalog
+
+
+def _table_terms(qualified_name: str) -> Set[str]:
+    return set(tokenize(qualified_name.split('.', 1)[1].replace('_', ' ')))
+
+
+def _column_terms(columns: List[Dict[str, Any]]) -> Set[str]:
+    terms = set()
+    for col in columns:
+        terms.update(tokenize(col["name"].replace('_', ' ')))
+    return terms
+
+
+def find_join_keys(
+    catalog: Dict[str, List[Dict[str, Any]]],
+    tables: List[str]
+) -> List[Tuple[str, str]]:
+    """
+    Suggest join conditions between tables.
+
+    Matches `<table>_id` columns to that table's `id`, and key-like columns
+    (ids, codes, emails) with the same name in different tables.
+
+    Args:
+        catalog: Result of list_catalog_tables
+        tables: Qualified names to connect
+
+    Returns:
+        List of (left column, right column) qualified column pairs
+    """
+    keys = []
+    for i, left in enumerate(tables):
+        left_columns = {col["name"].lower() for col in catalog[left]}
+        for right in tables[i + 1:]:
+            right_columns = {col["name"].lower() for col in catalog[right]}
+            for a, a_columns, b, b_columns in ((left, left_columns, right, right_columns),
+                                               (right, right_columns, left, left_columns)):
+                for term in _table_terms(b):
+                    if f"{term}_id" in a_columns and 'id' in b_columns:
+                        keys.append((f"{a}.{term}_id", f"{b}.id"))
+            for column in sorted(left_columns & right_columns):
+                if column.endswith(KEY_COLUMN_SUFFIXES):
+                    keys.append((f"{left}.{column}", f"{right}.{column}"))
+    return keys
+
+
+def select_relevant_tables(
+    catalog: Dict[str, List[Dict[str, Any]]],
+    question: str,
+    max_tables: int = MAX_PROMPT_TABLES
+) -> List[str]:
+    """
+    Pick the tables a question most likely needs.
+
+    Tables are scored by question terms matching their name (weighted
+    higher) and column names; tables that can be joined to a selected
+    table on a key column are added so the model can connect them.
+
+    Args:
+        catalog: Result of list_catalog_tables
+        question: Natural language question
+        max_tables: Maximum number of directly matched tables
+
+    Returns:
+        Qualified table names, best matches first
+    """
+    terms = set(tokenize(question))
+    scores = {}
+    for name, columns in catalog.items():
+        score = 3 * len(terms & _table_terms(name)) + len(terms & _column_terms(columns))
+        if score:
+            scores[name] = score
+
+    if not scores:
+        # Nothing matched: describe as much of the catalog as the prompt allows
+        return list(catalog)[:max_tables * 2]
+
+    selected = sorted(scores, key=lambda name: -scores[name])[:max_tables]
+    for name in list(selected):
+        for candidate in catalog:
+            if candidate not in selected and len(selected) < max_tables * 2 \
+                    and find_join_keys(catalog, [name, candidate]):
+                selected.append(candidate)
+    return selected
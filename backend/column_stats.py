@@ -0,0 +1,319 @@
+"""
+Per-column statistics computed at upload time.
+Null counts, distinct-count estimates (HyperLogLog), min/max and the most
+frequent values are stored in an internal metadata table, served to the UI
+and added to the LLM prompt so generated queries use real literal values.
+"""
+
+import json
+import sqlite3
+import logging
+from typing import Dict, List, Any, Optional
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+STATS_TABLE = '_column_stats'
+
+# Number of most frequent values kept per column
+TOP_K = 5
+
+# Candidate top values carried between chunks (top-k is approximate beyond one chunk)
+MAX_TRACKED_VALUES = 1000
+
+# Values longer than this are not useful as prompt hints
+MAX_VALUE_LENGTH = 60
+
+# Columns with more distinct values than this get no sample values in the prompt
+MAX_HINT_CARDINALITY = 50
+
+HLL_PRECISION = 14
+_HLL_REGISTERS = 1 << HLL_PRECISION
+_HLL_VALUE_BITS = 64 - HLL_PRECISION
+
+
+class HyperLogLog:
+    """
+    Fixed-size distinct-count sketch (~0.8% standard error at precision 14).
+
+    Sketches are mergeable, so a column can be profiled chunk by chunk.
+    """
+
+    def __init__(self):
+        self.registers = np.zeros(_HLL_REGISTERS, dtype=np.uint8)
+
+    def add_series(self, series: pd.Series) -> None:
+        """
+        Add the non-null values of a Series to the sketch.
+
+        Args:
+            series: Column values
+        """
+        values = series.dropna()
+        if values.empty:
+            return
+        hashes = pd.util.hash_pandas_object(values, index=False).to_numpy()
+        index = (hashes >> np.uint64(_HLL_VALUE_BITS)).astype(np.int64)
+        remainder = hashes & np.uint64((1 << _HLL_VALUE_BITS) - 1)
+        # Remainders fit in 50 bits, so float64 gives their exact bit length
+        _, bit_length = np.frexp(remainder.astype(np.float64))
+        rank = (_HLL_VALUE_BITS + 1 - bit_length).astype(np.uint8)
+        np.maximum.at(self.registers, index, rank)
+
+    def merge(self, other: 'HyperLogLog') -> None:
+        """Fold another sketch into this one."""
+        np.maximum(self.registers, other.registers, out=self.registers)
+
+    def estimate(self) -> int:
+        """
+        Estimate the number of distinct values added.
+
+        Returns:
+            Estimated distinct count
+        """
+        m = float(_HLL_REGISTERS)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / np.sum(np.ldexp(1.0, -self.registers.astype(np.int64)))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if estimate <= 2.5 * m and zeros:
+            # Linear counting is more accurate for small cardinalities
+            estimate = m * np.log(m / zeros)
+        return int(round(estimate))
+
+
+def _to_python(value: Any) -> Any:
+    """Convert numpy/pandas scalars to JSON- and SQLite-friendly values."""
+    if value is None or (isinstance(value, float) and np.isnan(value)):
+        return None
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, pd.Timestamp):
+        return value.isoformat()
+    return value
+
+
+class _ColumnProfiler:
+    """Accumulates the statistics of one column across chunks."""
+
+    def __init__(self):
+        self.null_count = 0
+        self.sketch = HyperLogLog()
+        self.min_value = None
+        self.max_value = None
+        self.counts: Optional[pd.Series] = None
+
+    def update(self, series: pd.Series) -> None:
+        values = series.dropna()
+        self.null_count += len(series) - len(values)
+        if values.empty:
+            return
+        if pd.api.types.is_bool_dtype(values) or pd.api.types.infer_dtype(values) == 'boolean':
+            # SQLite stores booleans as 1/0, so hints must use those literals
+            values = values.astype('int64')
+        elif values.dtype == object and pd.api.types.infer_dtype(values) in ('integer', 'floating', 'mixed-integer-float'):
+            values = pd.to_numeric(values)
+
+        if pd.api.types.is_numeric_dtype(values):
+            self.sketch.add_series(values)
+            low, high = values.min(), values.max()
+            counts = values.value_counts(sort=False)
+        else:
+            # Work on distinct values only, so categoricals are never expanded to strings
+            counts = values.value_counts(sort=False)
+            counts = counts[counts > 0]
+            counts.index = counts.index.astype(str)
+            if not counts.index.is_unique:
+                counts = counts.groupby(level=0).sum()
+            self.sketch.add_series(counts.index.to_series())
+            low, high = counts.index.min(), counts.index.max()
+
+        self.min_value = low if self.min_value is None else min(self.min_value, low)
+        self.max_value = high if self.max_value is None else max(self.max_value, high)
+        self.counts = counts if self.counts is None else self.counts.add(counts, fill_value=0)
+        # Keep only the leading candidates so high-cardinality columns do not hold every value
+        if len(self.counts) > MAX_TRACKED_VALUES:
+            self.counts = self.counts.nlargest(MAX_TRACKED_VALUES)
+
+    def result(self) -> Dict[str, Any]:
+        top_values = []
+        if self.counts is not None:
+            for value, count in self.counts.nlargest(TOP_K).items():
+                top_values.append({"value": _to_python(value), "count": int(count)})
+        return {
+            "null_count": int(self.null_count),
+            "distinct_count": self.sketch.estimate(),
+            "min": _to_python(self.min_value),
+            "max": _to_python(self.max_value),
+            "top_values": top_values
+        }
+
+
+def _profile_chunks(chunks) -> Dict[str, Any]:
+    profilers: Dict[str, _ColumnProfiler] = {}
+    row_count = 0
+    for chunk in chunks:
+        row_count += len(chunk)
+        for col in chunk.columns:
+            profilers.setdefault(col, _ColumnProfiler()).update(chunk[col])
+    return {
+        "row_count": row_count,
+        "columns": {col: profiler.result() for col, profiler in profilers.items()}
+    }
+
+
+def profile_dataframe(df: pd.DataFrame) -> Dict[str, Any]:
+    """
+    Compute per-column statistics of a DataFrame.
+
+    Args:
+        df: Cleaned DataFrame
+
+    Returns:
+        Dictionary with 'row_count' and 'columns' (column name to statistics)
+    """
+    return _profile_chunks([df])
+
+
+def profile_table(conn: sqlite3.Connection, table_name: str, chunksize: int = 50000) -> Dict[str, Any]:
+    """
+    Compute per-column statistics of a table, reading it in chunks.
+
+    Args:
+        conn: Database connection
+        table_name: Table to profile
+        chunksize: Rows read per chunk
+
+    Returns:
+        Dictionary with 'row_count' and 'columns' (column name to statistics)
+    """
+    return _profile_chunks(pd.read_sql(f"SELECT * FROM {table_name}", conn, chunksize=chunksize))
+
+
+def _ensure_stats_table(cursor: sqlite3.Cursor) -> None:
+    cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS {STATS_TABLE} (
+            table_name TEXT NOT NULL,
+            column_name TEXT NOT NULL,
+            row_count INTEGER NOT NULL,
+            null_count INTEGER NOT NULL,
+            distinct_count INTEGER NOT NULL,
+            min_value,
+            max_value,
+            top_values TEXT NOT NULL,
+            PRIMARY KEY (table_name, column_name)
+        )
+    """)
+
+
+def store_column_stats(cursor: sqlite3.Cursor, table_name: str, stats: Dict[str, Any]) -> None:
+    """
+    Replace the stored statistics of a table.
+
+    Args:
+        cursor: Database cursor
+        table_name: Profiled table
+        stats: Result of profile_dataframe / profile_table
+    """
+    drop_column_stats(cursor, table_name)
+    cursor.executemany(
+        f"INSERT INTO {STATS_TABLE} VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+        [
+            (
+                table_name,
+                column,
+                stats["row_count"],
+                column_stats["null_count"],
+                column_stats["distinct_count"],
+                column_stats["min"],
+                column_stats["max"],
+                json.dumps(column_stats["top_values"])
+            )
+            for column, column_stats in stats["columns"].items()
+        ]
+    )
+    logger.info(f"✅ Stored column statistics for {table_name}")
+
+
+def drop_column_stats(cursor: sqlite3.Cursor, table_name: str) -> None:
+    """
+    Remove the stored statistics of a table.
+
+    Args:
+        cursor: Database cursor
+        table_name: Profiled table
+    """
+    _ensure_stats_table(cursor)
+    cursor.execute(f"DELETE FROM {STATS_TABLE} WHERE table_name = ?", (table_name,))
+
+
+def get_column_stats(cursor: sqlite3.Cursor, table_name: str) -> Dict[str, Dict[str, Any]]:
+    """
+    Load the stored statistics of a table.
+
+    Args:
+        cursor: Database cursor
+        table_name: Profiled table
+
+    Returns:
+        Column name to statistics (empty if the table was never profiled)
+    """
+    cursor.execute(
+        "SELECT name FROM sqlite_master WHERE type='table' AND name = ?", (STATS_TABLE,)
+    )
+    if cursor.fetchone() is None:
+        return {}
+    cursor.execute(
+        f"SELECT column_name, row_count, null_count, distinct_count, min_value, max_value, top_values "
+        f"FROM {STATS_TABLE} WHERE table_name = ? ORDER BY rowid",
+        (table_name,)
+    )
+    return {
+        row[0]: {
+            "row_count": row[1],
+            "null_count": row[2],
+            "distinct_count": row[3],
+            "min": row[4],
+            "max": row[5],
+            "top_values": json.loads(row[6])
+        }
+        for row in cursor.fetchall()
+    }
+
+
+def describe_column_stats(tables: Dict[str, Dict[str, Dict[str, Any]]]) -> str:
+    """
+    Describe value ranges and common values for the LLM prompt.
+
+    Args:
+        tables: Table name to the result of get_column_stats
+
+    Returns:
+        Prompt section, or an empty string when there are no statistics
+    """
+    lines = []
+    for table_name, stats in tables.items():
+        for column, column_stats in stats.items():
+            details = []
+            # Sample values only help for repeated categories, not unique keys or timestamps
+            top_values = [
+                item["value"] for item in column_stats["top_values"]
+                if isinstance(item["value"], str) and len(item["value"]) <= MAX_VALUE_LENGTH
+                and item["count"] > 1
+            ]
+            if top_values and column_stats["distinct_count"] <= MAX_HINT_CARDINALITY:
+                details.append("values include " + ", ".join(f"'{value}'" for value in top_values))
+            elif column_stats["min"] is not None:
+                details.append(f"range {column_stats['min']} to {column_stats['max']}")
+            details.append(f"~{column_stats['distinct_count']} distinct")
+            if column_stats["null_count"]:
+                details.append(f"{column_stats['null_count']} nulls")
+            lines.append(f"- {table_name}.{column}: {'; '.join(details)}")
+
+    if not lines:
+        return ""
+    return (
+        "\nCOLUMN VALUES (use these exact literals and casing in WHERE clauses):\n"
+        + "\n".join(lines) + "\n"
+    )
@@ -0,0 +1,77 @@
+"""
+Small thread-safe pool of SQLite connections.
+Used where opening a connection is expensive, e.g. connections that
+ATTACH several database files before they can run a query.
+"""
+
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List
+
+
+class ConnectionPool:
+    """Reuses connections built by a factory across threads."""
+
+    def __init__(self, factory: Callable[[], sqlite3.Connection], max_idle: int = 4):
+        self._factory = factory
+        self.max_idle = max_idle
+        self._idle: List[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+        # Bumped by clear(); connections from an older generation are closed on release
+        self._generation = 0
+        self.created = 0
+        self.reused = 0
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        """
+        Borrow a connection for the duration of a with-block.
+
+        Yields:
+            SQLite connection
+        """
+        with self._lock:
+            generation = self._generation
+            conn = self._idle.pop() if self._idle else None
+            if conn is not None:
+                self.reused += 1
+
+        if conn is None:
+            conn = self._factory()
+            with self._lock:
+                self.created += 1
+
+        try:
+            yield conn
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            with self._lock:
+                keep = generation == self._generation and len(self._idle) < self.max_idle
+                if keep:
+                    self._idle.append(conn)
+            if not keep:
+                conn.close()
+
+    def clear(self) -> None:
+        """Close idle connections and retire those in use (e.g. after attachments changed)."""
+        with self._lock:
+            self._generation += 1
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.close()
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Report pool usage.
+
+        Returns:
+            Dictionary of counters
+        """
+        return {
+            "created": self.created,
+            "reused": self.reused,
+            "idle": len(self._idle)
+        }
@@ -6,15 +6,75 @@ Creates and manages separate database for user uploads.
 import sqlite3
 import pandas as pd
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 import logging
 import re
 
+from admission import count_referenced_rows
+from sql_parser import referenced_tables
+from catalog import list_catalog_tables
+from connection_pool import ConnectionPool
+from attached_databases import (
+    make_alias,
+    store_database_file,
+    load_sql_dump,
+    register_database,
+    unregister_database,
+    attach_registered_databases,
+    get_attached_tables,
+    quote_table_name,
+    read_only_uri,
+)
+from column_stats import (
+    profile_table,
+    store_column_stats,
+    drop_column_stats,
+    get_column_stats,
+)
+from exporter import export_cursor
+from fts_index import (
+    build_fts_index,
+    rebuild_fts_index,
+    drop_fts_index,
+    get_fts_columns,
+    rewrite_like_with_fts,
+)
+from incremental_load import (
+    check_schema_compatibility,
+    merge_dataframe,
+    row_hash_table,
+)
+from sample_tables import (
+    build_sample_table,
+    drop_sample_table,
+    run_on_sample,
+)
+from summary_tables import (
+    build_summary_tables,
+    drop_summary_tables,
+    get_summary_tables,
+    rewrite_with_summaries,
+)
+from time_partitions import (
+    detect_datetime_columns,
+    build_time_partitions,
+    drop_time_partitions,
+    get_time_partitions,
+    rewrite_with_partitions,
+)
+
 logger = logging.getLogger(__name__)
 
 # Path to uploaded data database
 UPLOAD_DB_PATH = Path(__file__).parent / 'uploaded_data.db'
 
+# Path to the default e-commerce database (queried alongside uploads in federated mode)
+DEFAULT_DB_PATH = Path(__file__).parent / 'ecommerce.db'
+
+# Schema names of the federated connection
+FEDERATED_DEFAULT_ALIAS = 'ecommerce'
+FEDERATED_UPLOADS_ALIAS = 'uploads'
+
 
 def sanitize_table_name(filename: str) -> str:
     """
@@ -42,10 +102,86 @@ def sanitize_table_name(filename: str) -> str:
     return name.lower()
 
 
+def get_upload_connection() -> sqlite3.Connection:
+    """
+    Open a connection to the uploaded database with every uploaded
+    SQLite file attached read-only.
+    
+    Returns:
+        SQLite connection
+    """
+    conn = sqlite3.connect(UPLOAD_DB_PATH.resolve().as_uri(), uri=True)
+    try:
+        attach_registered_databases(conn)
+    except Exception:
+        conn.close()
+        raise
+    return conn
+
+
+def _open_federated_connection() -> sqlite3.Connection:
+    """
+    Open a connection with the default database, the uploaded database and
+    every uploaded SQLite file attached read-only under their own schema names.
+    """
+    conn = sqlite3.connect('file::memory:', uri=True, check_same_thread=False)
+    try:
+        conn.execute(f"ATTACH DATABASE ? AS {FEDERATED_DEFAULT_ALIAS}", (read_only_uri(DEFAULT_DB_PATH),))
+        if UPLOAD_DB_PATH.exists():
+            conn.execute(f"ATTACH DATABASE ? AS {FEDERATED_UPLOADS_ALIAS}", (read_only_uri(UPLOAD_DB_PATH),))
+            registry = sqlite3.connect(UPLOAD_DB_PATH)
+            try:
+                attach_registered_databases(conn, registry)
+            finally:
+                registry.close()
+    except Exception:
+        conn.close()
+        raise
+    return conn
+
+
+# Attaching every database is costly, so federated connections are reused
+federated_pool = ConnectionPool(_open_federated_connection)
+
+
+def _split_qualified_name(table_name: str) -> tuple:
+    """Split 'alias.table' into (alias, table); plain names get alias None."""
+    if '.' in table_name:
+        alias, name = table_name.split('.', 1)
+        return alias, name
+    return None, table_name
+
+
+def _drop_derived_tables(cursor: sqlite3.Cursor, table_name: str) -> None:
+    """Drop internal tables derived from an uploaded table."""
+    drop_time_partitions(cursor, table_name)
+    drop_summary_tables(cursor, table_name)
+    drop_fts_index(cursor, table_name)
+    drop_column_stats(cursor, table_name)
+    drop_sample_table(cursor, table_name)
+    cursor.execute(f"DROP TABLE IF EXISTS {row_hash_table(table_name)}")
+
+
+def _refresh_derived_tables(conn: sqlite3.Connection, table_name: str) -> None:
+    """Rebuild derived tables that exist for an uploaded table after its rows changed."""
+    cursor = conn.cursor()
+    cursor.execute(f"PRAGMA table_info({table_name})")
+    schema = {col[1]: col[2] for col in cursor.fetchall()}
+    if get_summary_tables(cursor, table_name):
+        build_summary_tables(conn, table_name, schema)
+    rebuild_fts_index(conn, table_name)
+    build_sample_table(conn, table_name, schema)
+    store_column_stats(cursor, table_name, profile_table(conn, table_name))
+
+
 def create_table_from_dataframe(
     df: pd.DataFrame,
     table_name: str,
-    schema: Dict[str, str]
+    schema: Dict[str, str],
+    materialize_summaries: bool = False,
+    full_text_index: bool = False,
+    column_stats: Optional[Dict[str, Any]] = None,
+    time_partitioning: bool = False
 ) -> None:
     """
     Create SQLite table from DataFrame with specified schema.
@@ -54,30 +190,58 @@ def create_table_from_dataframe(
         df: DataFrame to insert
         table_name: Name of table to create
         schema: Dictionary mapping column names to SQLite types
+        materialize_summaries: Also build rollup tables for aggregate queries
+        full_text_index: Also build an FTS5 index over TEXT columns
+        column_stats: Statistics computed while parsing; profiled from the table when omitted
+        time_partitioning: Store detected datetime columns as epoch seconds in
+            (per-month, for very large uploads) partitions behind a view
     """
+    if not schema:
+        raise ValueError(f"No columns found for {table_name}")
+    
     conn = sqlite3.connect(UPLOAD_DB_PATH)
     cursor = conn.cursor()
     
     try:
-        # Drop table if exists
+        # Drop table (and any tables derived from it) if exists
+        _drop_derived_tables(cursor, table_name)
         cursor.execute(f"DROP TABLE IF EXISTS {table_name}")
         
-        # Build CREATE TABLE statement
-        columns = []
-        for col_name, col_type in schema.items():
-            columns.append(f"{col_name} {col_type}")
+        datetime_columns = detect_datetime_columns(df) if time_partitioning else {}
+        if datetime_columns:
+            build_time_partitions(conn, df, table_name, schema, datetime_columns)
+        else:
+            # Build CREATE TABLE statement
+            columns = []
+            for col_name, col_type in schema.items():
+                columns.append(f"{col_name} {col_type}")
+            
+            create_sql = f"CREATE TABLE {table_name} ({', '.join(columns)})"
+            cursor.execute(create_sql)
+            
+            logger.info(f"✅ Created table: {table_name}")
+            
+            # Insert data
+            df.to_sql(table_name, conn, if_exists='replace', index=False)
+        
+        logger.info(f"✅ Inserted {len(df)} rows into {table_name}")
         
-        create_sql = f"CREATE TABLE {table_name} ({', '.join(columns)})"
-        cursor.execute(create_sql)
+        if materialize_summaries:
+            build_summary_tables(conn, table_name, schema)
         
-        logger.info(f"✅ Created table: {table_name}")
+        # FTS indexes and samples address rows by rowid, which a partitioned view does not have
+        if full_text_index and not datetime_columns:
+            build_fts_index(conn, table_name, [col for col, col_type in schema.items() if col_type == 'TEXT'])
         
-        # Insert data
-        df.to_sql(table_name, conn, if_exists='replace', index=False)
+        store_column_stats(cursor, table_name, column_stats or profile_table(conn, table_name))
         
-        logger.info(f"✅ Inserted {len(df)} rows into {table_name}")
+        # Large tables also get a weighted sample for approximate queries
+        if not datetime_columns:
+            build_sample_table(conn, table_name, schema)
         
         conn.commit()
+        # The first upload creates the database file, which older federated connections lack
+        federated_pool.clear()
     except Exception as e:
         conn.rollback()
         logger.error(f"❌ Failed to create table: {str(e)}")
@@ -86,6 +250,60 @@ def create_table_from_dataframe(
         conn.close()
 
 
+def append_to_table(
+    df: pd.DataFrame,
+    table_name: str,
+    schema: Dict[str, str],
+    mode: str = 'append',
+    key_column: Optional[str] = None
+) -> Dict[str, int]:
+    """
+    Append or upsert rows into an existing uploaded table.
+    
+    Creates the table when it does not exist yet.
+    
+    Args:
+        df: DataFrame with new rows
+        table_name: Name of existing table
+        schema: Dictionary mapping column names to SQLite types
+        mode: 'append' (skip existing rows) or 'upsert' (update changed rows)
+        key_column: Column identifying a row; rows are hashed when omitted
+        
+    Returns:
+        Dictionary with 'inserted', 'updated' and 'skipped' counts
+    """
+    existing = get_table_schema(table_name).get(table_name) if UPLOAD_DB_PATH.exists() else None
+    if not existing:
+        create_table_from_dataframe(df, table_name, schema)
+        return {"inserted": len(df), "updated": 0, "skipped": 0}
+    
+    check_schema_compatibility({col["name"]: col["type"] for col in existing}, schema, df)
+    
+    conn = sqlite3.connect(UPLOAD_DB_PATH)
+    
+    try:
+        if get_time_partitions(conn.cursor(), table_name):
+            raise ValueError(
+                f"{table_name} is time-partitioned; upload it again with mode=replace to add rows"
+            )
+        counts = merge_dataframe(conn, df, table_name, mode, key_column)
+        if counts["inserted"] or counts["updated"]:
+            _refresh_derived_tables(conn, table_name)
+        conn.commit()
+        
+        logger.info(
+            f"✅ Merged into {table_name}: {counts['inserted']} inserted, "
+            f"{counts['updated']} updated, {counts['skipped']} skipped"
+        )
+        return counts
+    except Exception as e:
+        conn.rollback()
+        logger.error(f"❌ Failed to merge into table: {str(e)}")
+        raise
+    finally:
+        conn.close()
+
+
 def get_uploaded_tables() -> List[Dict[str, Any]]:
     """
     Get list of all uploaded tables with metadata.
@@ -96,12 +314,16 @@ def get_uploaded_tables() -> List[Dict[str, Any]]:
     if not UPLOAD_DB_PATH.exists():
         return []
     
-    conn = sqlite3.connect(UPLOAD_DB_PATH)
+    conn = get_upload_connection()
     cursor = conn.cursor()
     
     try:
-        # Get all tables
-        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' ORDER BY name")
+        # Get all user tables (internal tables are prefixed with an underscore);
+        # time-partitioned uploads are views over their partitions
+        cursor.execute(
+            "SELECT name FROM sqlite_master WHERE type IN ('table', 'view') "
+            "AND name NOT LIKE '\\_%' ESCAPE '\\' ORDER BY name"
+        )
         tables = cursor.fetchall()
         
         result = []
@@ -123,6 +345,24 @@ def get_uploaded_tables() -> List[Dict[str, Any]]:
                 "type": "uploaded"
             })
         
+        # Tables of attached database files are exposed as alias.table
+        for (_, alias, _) in conn.execute("PRAGMA database_list").fetchall()[1:]:
+            if alias == 'temp':
+                continue
+            for name in get_attached_tables(conn, alias):
+                cursor.execute(f"SELECT COUNT(*) FROM {quote_table_name(f'{alias}.{name}')}")
+                row_count = cursor.fetchone()[0]
+                cursor.execute(f'PRAGMA {alias}.table_info("{name}")')
+                col_count = len(cursor.fetchall())
+                
+                result.append({
+                    "name": f"{alias}.{name}",
+                    "display_name": f"{alias} / {name}".replace('_', ' ').title(),
+                    "row_count": row_count,
+                    "column_count": col_count,
+                    "type": "attached"
+                })
+        
         return result
     finally:
         conn.close()
@@ -132,6 +372,9 @@ def delete_uploaded_table(table_name: str) -> bool:
     """
     Delete an uploaded table.
     
+    Attached database files are read-only, so deleting any of their
+    tables (alias.table) removes the whole database file.
+    
     Args:
         table_name: Name of table to delete
         
@@ -145,6 +388,13 @@ def delete_uploaded_table(table_name: str) -> bool:
     cursor = conn.cursor()
     
     try:
+        alias, _ = _split_qualified_name(table_name)
+        if alias:
+            removed = unregister_database(conn, alias)
+            federated_pool.clear()
+            return removed
+        
+        _drop_derived_tables(cursor, table_name)
         cursor.execute(f"DROP TABLE IF EXISTS {table_name}")
         conn.commit()
         logger.info(f"✅ Deleted table: {table_name}")
@@ -170,18 +420,26 @@ def get_table_schema(table_name: str, db_path: Path = UPLOAD_DB_PATH) -> Dict[st
     if not db_path.exists():
         return {}
     
-    conn = sqlite3.connect(db_path)
+    alias, name = _split_qualified_name(table_name)
+    if alias and db_path == UPLOAD_DB_PATH:
+        conn = get_upload_connection()
+    else:
+        conn = sqlite3.connect(db_path)
     cursor = conn.cursor()
     
     try:
-        cursor.execute(f"PRAGMA table_info({table_name})")
+        if alias:
+            cursor.execute(f'PRAGMA {alias}.table_info("{name}")')
+        else:
+            cursor.execute(f"PRAGMA table_info({table_name})")
         columns = cursor.fetchall()
         
+        # Date columns of time-partitioned views are expressions without a declared type
         schema = {
             table_name: [
                 {
                     "name": col[1],
-                    "type": col[2],
+                    "type": col[2] or "TEXT",
                     "isPrimaryKey": bool(col[5])
                 }
                 for col in columns
@@ -193,12 +451,107 @@ def get_table_schema(table_name: str, db_path: Path = UPLOAD_DB_PATH) -> Dict[st
         conn.close()
 
 
-def execute_query_on_uploaded_db(sql: str) -> tuple:
+def materialize_summary_tables(table_name: str) -> List[Dict[str, Any]]:
+    """
+    Build (or rebuild) rollup tables for an uploaded table on demand.
+    
+    Args:
+        table_name: Name of uploaded table
+        
+    Returns:
+        List of summary table info dictionaries
+    """
+    schema = get_table_schema(table_name)
+    if not schema.get(table_name):
+        raise ValueError(f"Table not found: {table_name}")
+    
+    conn = sqlite3.connect(UPLOAD_DB_PATH)
+    
+    try:
+        built = build_summary_tables(
+            conn,
+            table_name,
+            {col["name"]: col["type"] for col in schema[table_name]}
+        )
+        conn.commit()
+        return built
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+
+def get_full_text_columns(table_name: str) -> List[str]:
+    """
+    List columns of an uploaded table covered by a full-text index.
+    
+    Args:
+        table_name: Name of uploaded table
+        
+    Returns:
+        Indexed column names
+    """
+    if not UPLOAD_DB_PATH.exists() or '.' in table_name:
+        return []
+    
+    conn = sqlite3.connect(UPLOAD_DB_PATH)
+    
+    try:
+        return get_fts_columns(conn.cursor(), table_name)
+    finally:
+        conn.close()
+
+
+def get_table_column_stats(table_name: str) -> Dict[str, Dict[str, Any]]:
+    """
+    Get the statistics stored for an uploaded table's columns.
+    
+    Args:
+        table_name: Name of uploaded table
+        
+    Returns:
+        Column name to statistics (empty if none are stored)
+    """
+    if not UPLOAD_DB_PATH.exists() or '.' in table_name:
+        return {}
+    
+    conn = sqlite3.connect(UPLOAD_DB_PATH)
+    
+    try:
+        return get_column_stats(conn.cursor(), table_name)
+    finally:
+        conn.close()
+
+
+def list_summary_tables(table_name: str) -> List[Dict[str, Any]]:
+    """
+    List rollup tables built for an uploaded table.
+    
+    Args:
+        table_name: Name of uploaded table
+        
+    Returns:
+        List of summary table info dictionaries
+    """
+    if not UPLOAD_DB_PATH.exists():
+        return []
+    
+    conn = sqlite3.connect(UPLOAD_DB_PATH)
+    
+    try:
+        return get_summary_tables(conn.cursor(), table_name)
+    finally:
+        conn.close()
+
+
+def execute_query_on_uploaded_db(sql: str, table_name: Optional[str] = None) -> tuple:
     """
     Execute SQL query on uploaded database.
     
     Args:
         sql: SQL query to execute
+        table_name: Active uploaded table; enables rollup and full-text rewriting
         
     Returns:
         Tuple of (columns, rows)
@@ -206,13 +559,268 @@ def execute_query_on_uploaded_db(sql: str) -> tuple:
     if not UPLOAD_DB_PATH.exists():
         raise ValueError("No uploaded database found")
     
-    conn = sqlite3.connect(UPLOAD_DB_PATH)
+    conn = get_upload_connection()
     cursor = conn.cursor()
     
     try:
+        if table_name:
+            sql = rewrite_with_summaries(conn, sql, table_name)
+            sql = rewrite_with_partitions(conn, sql, table_name)
+            sql = rewrite_like_with_fts(conn, sql)
         cursor.execute(sql)
         columns = [description[0] for description in cursor.description]
         rows = cursor.fetchall()
         return columns, rows
     finally:
         conn.close()
+
+
+def export_query_on_uploaded_db(sql: str, export_format: str, table_name: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Run a query on the uploaded database and write its rows to a spool file.
+    
+    Args:
+        sql: SQL query to execute
+        export_format: 'csv' or 'parquet'
+        table_name: Active uploaded table; enables rollup and full-text rewriting
+        
+    Returns:
+        Export info dictionary (see exporter.export_cursor)
+    """
+    if not UPLOAD_DB_PATH.exists():
+        raise ValueError("No uploaded database found")
+    
+    conn = get_upload_connection()
+    cursor = conn.cursor()
+    
+    try:
+        if table_name:
+            sql = rewrite_with_summaries(conn, sql, table_name)
+            sql = rewrite_with_partitions(conn, sql, table_name)
+            sql = rewrite_like_with_fts(conn, sql)
+        cursor.execute(sql)
+        return export_cursor(cursor, export_format)
+    finally:
+        conn.close()
+
+
+def execute_approximate_query(sql: str, table_name: str) -> Optional[Dict[str, Any]]:
+    """
+    Answer an aggregate query from the sample of an uploaded table.
+    
+    Args:
+        sql: SQL query to execute
+        table_name: Active uploaded table
+        
+    Returns:
+        Approximate result with error bounds, or None when the query should
+        run exactly (no sample, unsupported shape, or a rollup answers it)
+    """
+    if not UPLOAD_DB_PATH.exists() or '.' in table_name:
+        return None
+    
+    conn = get_upload_connection()
+    
+    try:
+        # Rollups give exact answers at least as fast as the sample
+        if rewrite_with_summaries(conn, sql, table_name) != sql:
+            return None
+        return run_on_sample(conn, sql, table_name)
+    finally:
+        conn.close()
+
+
+def get_attached_database_schema(alias: str) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Get schema information for every table of an attached database file.
+    
+    Args:
+        alias: Schema alias of the attached database
+        
+    Returns:
+        Schema dictionary keyed by qualified table name (alias.table)
+    """
+    conn = get_upload_connection()
+    cursor = conn.cursor()
+    
+    try:
+        schema = {}
+        for name in get_attached_tables(conn, alias):
+            cursor.execute(f'PRAGMA {alias}.table_info("{name}")')
+            schema[f"{alias}.{name}"] = [
+                {
+                    "name": col[1],
+                    "type": col[2],
+                    "isPrimaryKey": bool(col[5])
+                }
+                for col in cursor.fetchall()
+            ]
+        return schema
+    finally:
+        conn.close()
+
+
+def import_database_file(file_content: bytes, filename: str) -> Dict[str, Any]:
+    """
+    Store an uploaded SQLite database (.db/.sqlite) or execute a .sql dump,
+    and attach it so its tables can be queried without copying rows.
+    
+    Args:
+        file_content: Raw file bytes
+        filename: Original filename
+        
+    Returns:
+        Dictionary with 'alias' and 'tables' (qualified table names)
+    """
+    alias = make_alias(sanitize_table_name(filename))
+    
+    if filename.endswith('.sql'):
+        path = load_sql_dump(file_content, alias)
+    else:
+        path = store_database_file(file_content, alias)
+    
+    conn = sqlite3.connect(UPLOAD_DB_PATH)
+    try:
+        register_database(conn, alias, filename, path)
+
+        try:
+            schema = get_attached_database_schema(alias)
+        except sqlite3.Error as e:
+            unregister_database(conn, alias)
+            raise ValueError(f"Failed to attach {filename}: {str(e)}")
+        if not schema:
+            unregister_database(conn, alias)
+            raise ValueError(f"No tables found in {filename}")
+    finally:
+        conn.close()
+    
+    federated_pool.clear()
+    logger.info(f"✅ Attached database {alias} with {len(schema)} tables")
+    return {"alias": alias, "tables": list(schema.keys()), "schema": schema}
+
+
+def estimate_rows_on_uploaded_db(sql: str) -> int:
+    """
+    Estimate rows a query on the uploaded database will scan.
+    
+    Args:
+        sql: SQL query
+        
+    Returns:
+        Total rows of the referenced tables
+    """
+    if not UPLOAD_DB_PATH.exists():
+        return 1
+    
+    conn = get_upload_connection()
+    
+    try:
+        rows = count_referenced_rows(conn, sql)
+        # Time-partitioned tables are views, which count_referenced_rows cannot size
+        for table_name in referenced_tables(sql):
+            layout = get_time_partitions(conn.cursor(), table_name)
+            if layout:
+                rows += sum(p["row_count"] for p in layout["partitions"])
+        return rows
+    finally:
+        conn.close()
+
+
+def explain_query_on_uploaded_db(sql: str) -> None:
+    """
+    Compile SQL against the uploaded database with EXPLAIN, without running it.
+    
+    Args:
+        sql: SQL query to validate
+        
+    Raises:
+        sqlite3.Error: If the query does not compile against the schema
+    """
+    conn = get_upload_connection()
+    
+    try:
+        conn.execute(f"EXPLAIN {sql}")
+    finally:
+        conn.close()
+
+
+def get_federated_catalog() -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Get schema information for every table queryable in federated mode.
+    
+    Returns:
+        Schema dictionary keyed by qualified table name
+        (ecommerce.table, uploads.table or alias.table)
+    """
+    with federated_pool.connection() as conn:
+        return list_catalog_tables(conn)
+
+
+def execute_federated_query(sql: str) -> tuple:
+    """
+    Execute SQL query across the default database, uploaded tables and
+    attached database files.
+    
+    Args:
+        sql: SQL query using qualified table names
+        
+    Returns:
+        Tuple of (columns, rows)
+    """
+    with federated_pool.connection() as conn:
+        cursor = conn.cursor()
+        try:
+            cursor.execute(sql)
+            columns = [description[0] for description in cursor.description]
+            rows = cursor.fetchall()
+            return columns, rows
+        finally:
+            cursor.close()
+
+
+def export_federated_query(sql: str, export_format: str) -> Dict[str, Any]:
+    """
+    Run a federated query and write its rows to a spool file.
+    
+    Args:
+        sql: SQL query using qualified table names
+        export_format: 'csv' or 'parquet'
+        
+    Returns:
+        Export info dictionary (see exporter.export_cursor)
+    """
+    with federated_pool.connection() as conn:
+        cursor = conn.cursor()
+        try:
+            cursor.execute(sql)
+            return export_cursor(cursor, export_format)
+        finally:
+            cursor.close()
+
+
+def explain_federated_query(sql: str) -> None:
+    """
+    Compile SQL against the federated connection with EXPLAIN, without running it.
+    
+    Args:
+        sql: SQL query to validate
+        
+    Raises:
+        sqlite3.Error: If the query does not compile against the schema
+    """
+    with federated_pool.connection() as conn:
+        conn.execute(f"EXPLAIN {sql}")
+
+
+def estimate_federated_rows(sql: str) -> int:
+    """
+    Estimate rows a federated query will scan.
+    
+    Args:
+        sql: SQL query using qualified table names
+        
+    Returns:
+        Total rows of the referenced tables
+    """
+    with federated_pool.connection() as conn:
+        return count_referenced_rows(conn, sql)
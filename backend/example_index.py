@@ -0,0 +1,204 @@
+"""
+In-process retrieval index over question -> SQL pairs that executed
+successfully. Used to inject the most similar past examples into the LLM
+prompt as few-shot demonstrations.
+"""
+
+import heapq
+import math
+import re
+import time
+import threading
+import logging
+from collections import Counter, OrderedDict
+from typing import Dict, List, Any
+
+logger = logging.getLogger(__name__)
+
+# Lookups slower than this are logged
+LOOKUP_BUDGET_MS = 1.0
+
+STOPWORDS = {
+    'a', 'an', 'the', 'of', 'in', 'on', 'for', 'to', 'and', 'or', 'by', 'with',
+    'me', 'show', 'list', 'give', 'what', 'which', 'is', 'are', 'all', 'get',
+    'find', 'display', 'please', 'from', 'that', 'each', 'per', 'do', 'does',
+}
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Split a question into lowercase terms, dropping stopwords and plural 's'.
+
+    Args:
+        text: Natural language question
+
+    Returns:
+        List of terms
+    """
+    terms = []
+    for word in re.findall(r'[a-z0-9_]+', text.lower()):
+        if word in STOPWORDS:
+            continue
+        if len(word) > 3 and word.endswith('s') and not word.endswith('ss'):
+            word = word[:-1]
+        terms.append(word)
+    return terms
+
+
+class ExampleIndex:
+    """TF-IDF index of successful examples, partitioned by database."""
+
+    def __init__(self, max_examples_per_database: int = 1000):
+        self.max_examples = max_examples_per_database
+        self._lock = threading.Lock()
+        # database -> OrderedDict(normalized question -> example), oldest first
+        self._examples: Dict[str, OrderedDict] = {}
+        # database -> term -> {normalized question: log-scaled term frequency}
+        self._postings: Dict[str, Dict[str, Dict[str, float]]] = {}
+        # database -> collection size when document norms were last computed
+        self._norm_sizes: Dict[str, int] = {}
+        self.lookups = 0
+        self.lookup_ms_total = 0.0
+        self.lookup_ms_max = 0.0
+
+    def add(self, database: str, question: str, sql: str) -> None:
+        """
+        Add (or refresh) a successful question -> SQL pair.
+
+        Args:
+            database: Active database the SQL ran against
+            question: Natural language question
+            sql: SQL that executed successfully
+        """
+        terms = Counter(tokenize(question))
+        if not terms:
+            return
+        key = ' '.join(question.lower().split())
+
+        with self._lock:
+            examples = self._examples.setdefault(database, OrderedDict())
+            postings = self._postings.setdefault(database, {})
+
+            if key in examples:
+                self._remove(database, key)
+
+            examples[key] = {"question": question.strip(), "sql": sql.strip(), "terms": terms}
+            for term, count in terms.items():
+                postings.setdefault(term, {})[key] = 1 + math.log(count)
+            examples[key]["norm"] = self._norm(database, terms)
+
+            while len(examples) > self.max_examples:
+                self._remove(database, next(iter(examples)))
+
+            # Done on insert so lookups stay within budget
+            self._refresh_norms(database)
+
+    def _idf(self, database: str, term: str) -> float:
+        total = len(self._examples[database])
+        return math.log((1 + total) / (1 + len(self._postings[database].get(term, ())))) + 1.0
+
+    def _norm(self, database: str, terms: Counter) -> float:
+        weights = ((1 + math.log(c)) * self._idf(database, t) for t, c in terms.items())
+        return math.sqrt(sum(w * w for w in weights)) or 1.0
+
+    def _refresh_norms(self, database: str) -> None:
+        """Recompute document norms once the collection has grown enough to shift IDF."""
+        examples = self._examples.get(database)
+        if not examples:
+            return
+        size = len(examples)
+        if abs(size - self._norm_sizes.get(database, 0)) * 10 <= size:
+            return
+        for example in examples.values():
+            example["norm"] = self._norm(database, example["terms"])
+        self._norm_sizes[database] = size
+
+    def _remove(self, database: str, key: str) -> None:
+        example = self._examples[database].pop(key)
+        postings = self._postings[database]
+        for term in example["terms"]:
+            postings[term].pop(key, None)
+            if not postings[term]:
+                del postings[term]
+
+    def search(self, database: str, question: str, k: int = 3, min_score: float = 0.2) -> List[Dict[str, str]]:
+        """
+        Find the k most similar past examples by TF-IDF cosine similarity.
+
+        Args:
+            database: Active database
+            question: Natural language question
+            k: Number of examples to return
+            min_score: Minimum similarity for an example to be used
+
+        Returns:
+            List of dicts with 'question', 'sql' and 'score'
+        """
+        start = time.perf_counter()
+        query_terms = Counter(tokenize(question))
+
+        with self._lock:
+            examples = self._examples.get(database, {})
+            postings = self._postings.get(database, {})
+
+            # Term-at-a-time accumulation over the postings of query terms only.
+            # Terms found in most examples barely affect ranking, so their
+            # postings are skipped whenever a rarer term is present.
+            total = len(examples)
+            has_rare_term = any(
+                0 < len(postings.get(term, ())) * 2 <= total for term in query_terms
+            )
+            scores: Dict[str, float] = {}
+            query_norm = 0.0
+            for term, count in query_terms.items():
+                if not examples:
+                    break
+                idf = self._idf(database, term)
+                query_weight = (1 + math.log(count)) * idf
+                query_norm += query_weight * query_weight
+                term_postings = postings.get(term, {})
+                if has_rare_term and len(term_postings) * 2 > total:
+                    continue
+                weight = query_weight * idf
+                for key, doc_weight in term_postings.items():
+                    scores[key] = scores.get(key, 0.0) + weight * doc_weight
+            query_norm = math.sqrt(query_norm) or 1.0
+
+            best = heapq.nlargest(
+                k,
+                ((score / (query_norm * examples[key]["norm"]), key) for key, score in scores.items())
+            )
+            results = [
+                {
+                    "question": examples[key]["question"],
+                    "sql": examples[key]["sql"],
+                    "score": round(score, 3)
+                }
+                for score, key in best
+                if score >= min_score
+            ]
+
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        self.lookups += 1
+        self.lookup_ms_total += elapsed_ms
+        self.lookup_ms_max = max(self.lookup_ms_max, elapsed_ms)
+        if elapsed_ms > LOOKUP_BUDGET_MS:
+            logger.warning(f"⚠️ Few-shot lookup took {elapsed_ms:.2f}ms ({len(scores)} candidates)")
+
+        return results
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Report index size and lookup latency.
+
+        Returns:
+            Dictionary of metrics
+        """
+        return {
+            "examples": sum(len(examples) for examples in self._examples.values()),
+            "databases": len(self._examples),
+            "lookups": self.lookups,
+            "avg_lookup_ms": round(self.lookup_ms_total / self.lookups, 4) if self.lookups else 0.0,
+            "max_lookup_ms": round(self.lookup_ms_max, 4),
+            "lookup_budget_ms": LOOKUP_BUDGET_MS
+        }
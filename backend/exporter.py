@@ -0,0 +1,242 @@
+"""
+Export of query results to CSV/Parquet spool files.
+Rows are written from the cursor in batches, so exports of any size use
+constant memory, and finished files are served from disk with HTTP
+range support.
+"""
+
+import csv
+import re
+import time
+import uuid
+import sqlite3
+import logging
+import importlib.util
+from pathlib import Path
+from typing import Dict, List, Any, Iterator, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+EXPORT_DIR = Path(__file__).parent / 'exports'
+
+# Rows fetched from the cursor per write
+EXPORT_BATCH_ROWS = 10000
+
+# Spool files older than this are deleted
+EXPORT_TTL_SECONDS = 3600
+
+# Bytes read per chunk when streaming a file range
+STREAM_CHUNK_BYTES = 64 * 1024
+
+# Parquet needs pyarrow, which is optional
+EXPORT_FORMATS = ('csv', 'parquet') if importlib.util.find_spec('pyarrow') else ('csv',)
+
+MEDIA_TYPES = {
+    'csv': 'text/csv',
+    'parquet': 'application/vnd.apache.parquet',
+}
+
+EXPORT_ID_PATTERN = re.compile(r'^[0-9a-f]{32}$')
+
+
+def _write_csv(cursor: sqlite3.Cursor, path: Path) -> int:
+    rows_written = 0
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow([description[0] for description in cursor.description])
+        while True:
+            batch = cursor.fetchmany(EXPORT_BATCH_ROWS)
+            if not batch:
+                break
+            writer.writerows(batch)
+            rows_written += len(batch)
+    return rows_written
+
+
+def _arrow_type(values: List[Any]) -> Any:
+    """
+    Parquet type for a column from its first batch of values.
+
+    SQLite values are typed per row, so numbers are written as float64 (an
+    INTEGER column may hold REAL values further down) and anything mixing
+    numbers with text is written as text.
+    """
+    import pyarrow as pa
+
+    kinds = {type(value) for value in values if value is not None}
+    if kinds and kinds <= {int, float}:
+        return pa.float64()
+    if kinds == {bytes}:
+        return pa.binary()
+    return pa.string()
+
+
+def _coerce(name: str, values: List[Any], arrow_type: Any) -> List[Any]:
+    """Convert a batch of values to a column's Parquet type, failing instead of truncating."""
+    import pyarrow as pa
+
+    if pa.types.is_string(arrow_type):
+        return [value if value is None or isinstance(value, str) else
+                value.decode('utf-8', 'replace') if isinstance(value, bytes) else str(value)
+                for value in values]
+    if pa.types.is_floating(arrow_type):
+        try:
+            return [None if value is None else float(value) for value in values]
+        except (TypeError, ValueError):
+            raise ValueError(f"Column {name} mixes numbers and text; export it as CSV instead")
+    if any(value is not None and not isinstance(value, bytes) for value in values):
+        raise ValueError(f"Column {name} mixes binary and other values; export it as CSV instead")
+    return values
+
+
+def _write_parquet(cursor: sqlite3.Cursor, path: Path) -> int:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    columns = [description[0] for description in cursor.description]
+    batch = cursor.fetchmany(EXPORT_BATCH_ROWS)
+    schema = pa.schema([
+        pa.field(name, _arrow_type([row[i] for row in batch])) for i, name in enumerate(columns)
+    ])
+
+    rows_written = 0
+    with pq.ParquetWriter(path, schema) as writer:
+        while batch:
+            arrays = [
+                pa.array(_coerce(field.name, [row[i] for row in batch], field.type), type=field.type)
+                for i, field in enumerate(schema)
+            ]
+            writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+            rows_written += len(batch)
+            batch = cursor.fetchmany(EXPORT_BATCH_ROWS)
+    return rows_written
+
+
+def cleanup_exports() -> None:
+    """Delete spool files older than EXPORT_TTL_SECONDS."""
+    if not EXPORT_DIR.exists():
+        return
+    cutoff = time.time() - EXPORT_TTL_SECONDS
+    for path in EXPORT_DIR.iterdir():
+        try:
+            if path.stat().st_mtime < cutoff:
+                path.unlink()
+        except OSError:
+            pass
+
+
+def export_cursor(cursor: sqlite3.Cursor, export_format: str) -> Dict[str, Any]:
+    """
+    Write the rows of an executed query to a new spool file.
+
+    Args:
+        cursor: Cursor with an executed SELECT
+        export_format: 'csv' or 'parquet'
+
+    Returns:
+        Dictionary with 'export_id', 'format', 'filename', 'row_count' and 'size_bytes'
+    """
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(f"Unsupported export format: {export_format}. Available: {', '.join(EXPORT_FORMATS)}")
+
+    cleanup_exports()
+    EXPORT_DIR.mkdir(exist_ok=True)
+
+    export_id = uuid.uuid4().hex
+    path = EXPORT_DIR / f"{export_id}.{export_format}"
+    start = time.perf_counter()
+    try:
+        if export_format == 'csv':
+            row_count = _write_csv(cursor, path)
+        else:
+            row_count = _write_parquet(cursor, path)
+    except Exception:
+        path.unlink(missing_ok=True)
+        raise
+
+    size = path.stat().st_size
+    logger.info(
+        f"✅ Exported {row_count} rows to {path.name} ({size} bytes) "
+        f"in {time.perf_counter() - start:.2f}s"
+    )
+    return {
+        "export_id": export_id,
+        "format": export_format,
+        "filename": path.name,
+        "row_count": row_count,
+        "size_bytes": size
+    }
+
+
+def find_export(export_id: str) -> Optional[Path]:
+    """
+    Locate the spool file of an export.
+
+    Args:
+        export_id: Id returned by export_cursor
+
+    Returns:
+        Path to the file, or None if it does not exist (or the id is malformed)
+    """
+    if not EXPORT_ID_PATTERN.match(export_id):
+        return None
+    for export_format in EXPORT_FORMATS:
+        path = EXPORT_DIR / f"{export_id}.{export_format}"
+        if path.exists():
+            return path
+    return None
+
+
+def parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """
+    Parse a single-range `Range: bytes=...` header.
+
+    Args:
+        header: Range header value, or None
+        size: File size in bytes
+
+    Returns:
+        Inclusive (start, end) byte offsets, or None to send the whole file
+
+    Raises:
+        ValueError: If the range cannot be satisfied
+    """
+    if not header:
+        return None
+    match = re.fullmatch(r'\s*bytes=(\d*)-(\d*)\s*', header)
+    if not match or match.group(1) == match.group(2) == '':
+        # Multiple or malformed ranges: ignore and send the whole file
+        return None
+    first, last = match.groups()
+    if first == '':
+        # Suffix range: the last N bytes
+        start, end = max(size - int(last), 0), size - 1
+    else:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        raise ValueError(f"Range not satisfiable for {size} bytes")
+    return start, end
+
+
+def iter_file_range(path: Path, start: int, end: int) -> Iterator[bytes]:
+    """
+    Read an inclusive byte range of a file in chunks.
+
+    Args:
+        path: File to read
+        start: First byte offset
+        end: Last byte offset
+
+    Yields:
+        File chunks
+    """
+    with open(path, 'rb') as f:
+        f.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = f.read(min(STREAM_CHUNK_BYTES, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
@@ -5,11 +5,39 @@ Handles parsing, type detection, and data cleaning.
 
 import pandas as pd
 import io
-from typing import Dict, List, Any, Tuple
+import os
+import time
+import zipfile
+import importlib.util
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from typing import Dict, List, Any, Tuple, Optional, Union
 import logging
 
+from pandas.api.types import union_categoricals
+
+from column_stats import profile_dataframe
+
 logger = logging.getLogger(__name__)
 
+SUPPORTED_EXTENSIONS = ('.csv', '.xlsx', '.xls', '.json')
+
+# Use the Rust-based calamine reader when installed; it is much faster than openpyxl
+EXCEL_ENGINE = 'calamine' if importlib.util.find_spec('python_calamine') else 'openpyxl'
+
+# Guard against zip bombs when expanding archives
+MAX_ARCHIVE_UNCOMPRESSED_BYTES = 200 * 1024 * 1024
+
+# Text columns with at most this share of distinct values become categoricals
+CATEGORY_MAX_RATIO = 0.5
+CATEGORY_MIN_ROWS = 100
+
+# CSV files are parsed (and compacted) in chunks of this many rows
+CSV_CHUNK_ROWS = 100000
+
+_process_pool: Optional[ProcessPoolExecutor] = None
+
 
 def detect_column_type(series: pd.Series) -> str:
     """
@@ -51,7 +79,9 @@ def parse_csv(file_content: bytes) -> pd.DataFrame:
         Parsed DataFrame
     """
     try:
-        df = pd.read_csv(io.BytesIO(file_content))
+        # Compact each chunk as it is read so peak memory stays close to the final frame
+        reader = pd.read_csv(io.BytesIO(file_content), chunksize=CSV_CHUNK_ROWS)
+        df = _concat_compact([compact_strings(chunk) for chunk in reader])
         logger.info(f"✅ Parsed CSV: {len(df)} rows, {len(df.columns)} columns")
         return df
     except Exception as e:
@@ -59,18 +89,19 @@ def parse_csv(file_content: bytes) -> pd.DataFrame:
         raise ValueError(f"Failed to parse CSV file: {str(e)}")
 
 
-def parse_excel(file_content: bytes) -> pd.DataFrame:
+def parse_excel(file_content: bytes, sheet_name: Union[str, int] = 0) -> pd.DataFrame:
     """
     Parse Excel file content into DataFrame.
     
     Args:
         file_content: Raw bytes of Excel file
+        sheet_name: Sheet name or index to read
         
     Returns:
-        Parsed DataFrame (first sheet)
+        Parsed DataFrame (first sheet by default)
     """
     try:
-        df = pd.read_excel(io.BytesIO(file_content), engine='openpyxl')
+        df = pd.read_excel(io.BytesIO(file_content), sheet_name=sheet_name, engine=EXCEL_ENGINE)
         logger.info(f"✅ Parsed Excel: {len(df)} rows, {len(df.columns)} columns")
         return df
     except Exception as e:
@@ -78,6 +109,24 @@ def parse_excel(file_content: bytes) -> pd.DataFrame:
         raise ValueError(f"Failed to parse Excel file: {str(e)}")
 
 
+def list_excel_sheets(file_content: bytes) -> List[str]:
+    """
+    List sheet names of an Excel workbook without parsing the sheets.
+    
+    Args:
+        file_content: Raw bytes of Excel file
+        
+    Returns:
+        List of sheet names
+    """
+    try:
+        with pd.ExcelFile(io.BytesIO(file_content), engine=EXCEL_ENGINE) as workbook:
+            return [str(name) for name in workbook.sheet_names]
+    except Exception as e:
+        logger.error(f"❌ Excel parsing failed: {str(e)}")
+        raise ValueError(f"Failed to parse Excel file: {str(e)}")
+
+
 def parse_json(file_content: bytes) -> pd.DataFrame:
     """
     Parse JSON file content into DataFrame.
@@ -97,10 +146,55 @@ def parse_json(file_content: bytes) -> pd.DataFrame:
         raise ValueError(f"Failed to parse JSON file: {str(e)}")
 
 
+def compact_strings(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Convert text columns with many repeated values to categoricals, in place.
+    
+    Args:
+        df: DataFrame to compact
+        
+    Returns:
+        The same DataFrame
+    """
+    for col in df.columns:
+        series = df[col]
+        if series.dtype == object and len(series) >= CATEGORY_MIN_ROWS:
+            if series.nunique() <= len(series) * CATEGORY_MAX_RATIO:
+                df[col] = series.astype('category')
+    return df
+
+
+def _concat_compact(chunks: List[pd.DataFrame]) -> pd.DataFrame:
+    """Concatenate compacted chunks, merging categoricals instead of falling back to object."""
+    if len(chunks) == 1:
+        return chunks[0]
+    if not chunks:
+        return pd.DataFrame()
+    
+    for col in chunks[0].columns:
+        parts = [chunk[col] for chunk in chunks]
+        if all(isinstance(part.dtype, pd.CategoricalDtype) for part in parts):
+            merged = union_categoricals(parts)
+            start = 0
+            for chunk in chunks:
+                chunk[col] = pd.Categorical.from_codes(
+                    merged.codes[start:start + len(chunk)], dtype=merged.dtype
+                )
+                start += len(chunk)
+        elif any(isinstance(part.dtype, pd.CategoricalDtype) for part in parts):
+            # Too many distinct values in some chunk: keep the column as plain text
+            for chunk in chunks:
+                chunk[col] = chunk[col].astype(object)
+    return pd.concat(chunks, ignore_index=True, copy=False)
+
+
 def clean_dataframe(df: pd.DataFrame) -> pd.DataFrame:
     """
     Clean DataFrame for SQLite insertion.
     
+    Numeric columns keep their native dtypes and NaN is left in place;
+    to_sql writes missing values as NULL at insert time.
+    
     Args:
         df: Input DataFrame
         
@@ -108,7 +202,9 @@ def clean_dataframe(df: pd.DataFrame) -> pd.DataFrame:
         Cleaned DataFrame
     """
     # Remove completely empty rows
-    df = df.dropna(how='all')
+    empty_rows = df.isna().all(axis=1)
+    if empty_rows.any():
+        df.drop(index=df.index[empty_rows], inplace=True)
     
     # Clean column names (remove special characters, spaces)
     df.columns = [
@@ -124,15 +220,18 @@ def clean_dataframe(df: pd.DataFrame) -> pd.DataFrame:
         for col in df.columns
     ]
     
-    # Convert datetime columns to ISO format strings
     for col in df.columns:
-        if pd.api.types.is_datetime64_any_dtype(df[col]):
-            df[col] = df[col].dt.strftime('%Y-%m-%d %H:%M:%S')
+        series = df[col]
+        if pd.api.types.is_datetime64_any_dtype(series):
+            # Convert datetime columns to ISO format strings
+            df[col] = series.dt.strftime('%Y-%m-%d %H:%M:%S')
     
-    # Replace NaN with None for SQLite
-    df = df.where(pd.notna(df), None)
+    compact_strings(df)
     
-    logger.info(f"✅ Cleaned DataFrame: {len(df)} rows")
+    logger.info(
+        f"✅ Cleaned DataFrame: {len(df)} rows, "
+        f"{df.memory_usage(deep=True).sum() / 1024 / 1024:.1f} MB in memory"
+    )
     return df
 
 
@@ -166,14 +265,15 @@ def get_preview_data(df: pd.DataFrame, num_rows: int = 5) -> List[Dict[str, Any]
     Returns:
         List of row dictionaries
     """
-    preview_df = df.head(num_rows)
-    return preview_df.to_dict('records')
+    preview_df = df.head(num_rows).astype(object)
+    # NaN is not valid JSON
+    return preview_df.where(preview_df.notna(), None).to_dict('records')
 
 
 def process_uploaded_file(
     file_content: bytes,
     filename: str
-) -> Tuple[pd.DataFrame, Dict[str, str], List[Dict[str, Any]]]:
+) -> Tuple[pd.DataFrame, Dict[str, str], List[Dict[str, Any]], Dict[str, Any]]:
     """
     Main function to process uploaded file.
     
@@ -182,7 +282,7 @@ def process_uploaded_file(
         filename: Original filename
         
     Returns:
-        Tuple of (DataFrame, schema_dict, preview_data)
+        Tuple of (DataFrame, schema_dict, preview_data, column_stats)
     """
     logger.info(f"📁 Processing file: {filename}")
     
@@ -205,5 +305,126 @@ def process_uploaded_file(
     # Get preview
     preview = get_preview_data(df)
     
+    # Profile columns for the prompt and the UI
+    stats = profile_dataframe(df)
+    
     logger.info(f"✅ File processed successfully: {filename}")
-    return df, schema, preview
+    return df, schema, preview, stats
+
+
+def expand_upload(file_content: bytes, filename: str) -> List[Dict[str, Any]]:
+    """
+    Expand an upload into independent ingestion tasks.
+    
+    Zip archives yield one task per supported member and Excel workbooks
+    yield one task per sheet.
+    
+    Args:
+        file_content: Raw file bytes
+        filename: Original filename
+        
+    Returns:
+        List of task dicts with 'name', 'content' and 'sheet_name'
+    """
+    if filename.endswith('.zip'):
+        tasks = []
+        try:
+            with zipfile.ZipFile(io.BytesIO(file_content)) as archive:
+                members = [
+                    info for info in archive.infolist()
+                    if not info.is_dir()
+                    and not Path(info.filename).name.startswith('.')
+                    and info.filename.lower().endswith(SUPPORTED_EXTENSIONS)
+                ]
+                if sum(info.file_size for info in members) > MAX_ARCHIVE_UNCOMPRESSED_BYTES:
+                    raise ValueError("Archive too large when uncompressed")
+                for info in members:
+                    tasks.extend(expand_upload(archive.read(info), Path(info.filename).name.lower()))
+        except zipfile.BadZipFile as e:
+            raise ValueError(f"Failed to read zip archive: {str(e)}")
+        if not tasks:
+            raise ValueError(f"No CSV, Excel or JSON files found in {filename}")
+        return tasks
+    
+    if filename.endswith(('.xlsx', '.xls')):
+        sheets = list_excel_sheets(file_content)
+        if len(sheets) == 1:
+            return [{"name": filename, "content": file_content, "sheet_name": sheets[0]}]
+        path = Path(filename)
+        return [
+            {"name": f"{path.stem}_{sheet}{path.suffix}", "content": file_content, "sheet_name": sheet}
+            for sheet in sheets
+        ]
+    
+    return [{"name": filename, "content": file_content, "sheet_name": None}]
+
+
+def _process_task(task: Dict[str, Any]) -> Dict[str, Any]:
+    """Parse, clean and describe a single file or sheet (runs in a worker process)."""
+    start = time.perf_counter()
+    
+    if task["sheet_name"] is not None:
+        df = parse_excel(task["content"], task["sheet_name"])
+        df = clean_dataframe(df)
+        schema = get_schema_info(df)
+        preview = get_preview_data(df)
+        stats = profile_dataframe(df)
+    else:
+        df, schema, preview, stats = process_uploaded_file(task["content"], task["name"])
+    
+    return {
+        "name": task["name"],
+        "sheet_name": task["sheet_name"],
+        "df": df,
+        "schema": schema,
+        "preview": preview,
+        "column_stats": stats,
+        "parse_seconds": round(time.perf_counter() - start, 4)
+    }
+
+
+def _get_process_pool() -> ProcessPoolExecutor:
+    global _process_pool
+    if _process_pool is None:
+        _process_pool = ProcessPoolExecutor(max_workers=os.cpu_count() or 1)
+    return _process_pool
+
+
+def process_uploaded_files(files: List[Tuple[bytes, str]]) -> List[Dict[str, Any]]:
+    """
+    Process several uploads (including zip archives and multi-sheet
+    workbooks) in parallel across a process pool.
+    
+    Args:
+        files: List of (file_content, filename) tuples
+        
+    Returns:
+        List of result dicts with 'name', 'sheet_name', 'df', 'schema',
+        'preview', 'column_stats' and 'parse_seconds', one per file or sheet
+        with data (blank sheets are skipped)
+    """
+    tasks = []
+    for file_content, filename in files:
+        tasks.extend(expand_upload(file_content, filename))
+    
+    logger.info(f"📁 Processing {len(tasks)} files/sheets using {EXCEL_ENGINE} for Excel")
+    
+    global _process_pool
+    if len(tasks) == 1:
+        results = [_process_task(tasks[0])]
+    else:
+        try:
+            results = list(_get_process_pool().map(_process_task, tasks))
+        except BrokenProcessPool:
+            logger.warning("⚠️ Process pool unavailable, processing files sequentially")
+            _process_pool = None
+            results = [_process_task(task) for task in tasks]
+    
+    # Blank sheets parse to frames without columns, which cannot become tables
+    for result in results:
+        if not result["schema"]:
+            logger.warning(f"⚠️ Skipping {result['name']}: no columns found")
+    results = [result for result in results if result["schema"]]
+    if not results:
+        raise ValueError("No data found in the uploaded files")
+    return results
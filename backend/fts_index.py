@@ -0,0 +1,175 @@
+"""
+SQLite FTS5 full-text indexes over TEXT columns.
+Indexes use the trigram tokenizer so they can serve substring LIKE
+patterns, and simple `col LIKE '%term%'` filters are rewritten to use them.
+"""
+
+import re
+import sqlite3
+import logging
+from typing import List
+
+from sql_parser import split_clauses, join_clauses, parse_single_table, strip_string_literals
+
+logger = logging.getLogger(__name__)
+
+# Trigram indexes need at least three literal characters to be used
+LIKE_PATTERN = re.compile(
+    r"(?<![\w.])(\"?[A-Za-z_][A-Za-z0-9_]*\"?)\s+LIKE\s+('%?[^%_']{3,}%?')",
+    re.IGNORECASE
+)
+
+
+def fts_table(table_name: str) -> str:
+    """Name of the FTS5 table indexing a table."""
+    return f"_fts_{table_name}"
+
+
+def build_fts_index(conn: sqlite3.Connection, table_name: str, text_columns: List[str]) -> List[str]:
+    """
+    Build (or rebuild) an external-content FTS5 index over TEXT columns.
+
+    Args:
+        conn: Database connection
+        table_name: Base table name
+        text_columns: Columns to index
+
+    Returns:
+        List of indexed columns (empty if FTS5 is unavailable)
+    """
+    cursor = conn.cursor()
+    index = fts_table(table_name)
+    cursor.execute(f"DROP TABLE IF EXISTS {index}")
+    if not text_columns:
+        return []
+
+    try:
+        cursor.execute(
+            f"CREATE VIRTUAL TABLE {index} USING fts5("
+            f"{', '.join(text_columns)}, content='{table_name}', content_rowid='rowid', "
+            f"tokenize='trigram')"
+        )
+    except sqlite3.OperationalError as e:
+        logger.warning(f"⚠️ Full-text index not available: {str(e)}")
+        return []
+
+    cursor.execute(f"INSERT INTO {index}({index}) VALUES('rebuild')")
+    logger.info(f"✅ Built full-text index on {table_name}: {', '.join(text_columns)}")
+    return text_columns
+
+
+def rebuild_fts_index(conn: sqlite3.Connection, table_name: str) -> None:
+    """
+    Resynchronize an existing FTS5 index with its base table.
+
+    Args:
+        conn: Database connection
+        table_name: Base table name
+    """
+    if get_fts_columns(conn.cursor(), table_name):
+        index = fts_table(table_name)
+        conn.execute(f"INSERT INTO {index}({index}) VALUES('rebuild')")
+
+
+def drop_fts_index(cursor: sqlite3.Cursor, table_name: str) -> None:
+    """
+    Drop the FTS5 index of a table.
+
+    Args:
+        cursor: Database cursor
+        table_name: Base table name
+    """
+    cursor.execute(f"DROP TABLE IF EXISTS {fts_table(table_name)}")
+
+
+def get_fts_columns(cursor: sqlite3.Cursor, table_name: str) -> List[str]:
+    """
+    List columns covered by a table's FTS5 index.
+
+    Args:
+        cursor: Database cursor
+        table_name: Base table name
+
+    Returns:
+        Indexed column names (empty if there is no index)
+    """
+    cursor.execute(
+        "SELECT name FROM sqlite_master WHERE type='table' AND name = ?",
+        (fts_table(table_name),)
+    )
+    if cursor.fetchone() is None:
+        return []
+    cursor.execute(f"PRAGMA table_info({fts_table(table_name)})")
+    return [col[1] for col in cursor.fetchall()]
+
+
+def _enclosing_parens(masked: str, position: int) -> list[int]:
+    """Offsets of the still-open parentheses around a position of a WHERE clause."""
+    open_parens = []
+    for i, ch in enumerate(masked[:position]):
+        if ch == '(':
+            open_parens.append(i)
+        elif ch == ')' and open_parens:
+            open_parens.pop()
+    return open_parens
+
+
+def rewrite_like_with_fts(conn: sqlite3.Connection, sql: str) -> str:
+    """
+    Rewrite `col LIKE 'pattern'` filters on indexed columns into FTS lookups.
+
+    Args:
+        conn: Database connection
+        sql: Validated SELECT query
+
+    Returns:
+        Rewritten SQL, or the original SQL when nothing can use the index
+    """
+    clauses = split_clauses(sql)
+    if clauses is None or not clauses.get('where'):
+        return sql
+
+    table_name = parse_single_table(clauses['from'])
+    if table_name is None or '.' in table_name:
+        return sql
+
+    indexed = {col.lower() for col in get_fts_columns(conn.cursor(), table_name)}
+    if not indexed:
+        return sql
+
+    where = clauses['where']
+    masked = strip_string_literals(where)
+    index = fts_table(table_name)
+    rewritten = []
+    last = 0
+    for match in LIKE_PATTERN.finditer(where):
+        column = match.group(1).strip('"')
+        # Skip negated patterns and matches that start inside a literal
+        prefix = masked[:match.start()].rstrip()
+        if column.lower() not in indexed or re.search(r'\bNOT$', prefix, re.IGNORECASE):
+            continue
+        if masked[match.start():match.end(1)] != where[match.start():match.end(1)]:
+            continue
+        # ESCAPE changes what the pattern means and cannot follow the rewrite
+        if re.match(r'\s*ESCAPE\b', masked[match.end():], re.IGNORECASE):
+            continue
+        # A subquery's columns belong to its own tables, not to the indexed one,
+        # and under NOT (...) the rewrite would let rows with a NULL column through
+        open_parens = _enclosing_parens(masked, match.start())
+        if any(re.match(r'\s*SELECT\b', masked[i + 1:], re.IGNORECASE) for i in open_parens):
+            continue
+        if any(re.search(r'\bNOT\s*$', masked[:i], re.IGNORECASE) for i in open_parens):
+            continue
+        rewritten.append(where[last:match.start()])
+        rewritten.append(
+            f"rowid IN (SELECT rowid FROM {index} WHERE {column} LIKE {match.group(2)})"
+        )
+        last = match.end()
+
+    if not rewritten:
+        return sql
+
+    rewritten.append(where[last:])
+    clauses['where'] = ''.join(rewritten)
+    logger.info(f"⚡ Using full-text index {index}")
+    return join_clauses(clauses)
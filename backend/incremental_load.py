@@ -0,0 +1,216 @@
+"""
+Incremental append/upsert of uploaded data into existing tables.
+Only new or changed rows are written, keyed on a chosen column or, when
+no key is given, on a hash of the whole row.
+"""
+
+import sqlite3
+import logging
+from typing import Dict, List, Any, Optional
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+LOAD_MODES = ('replace', 'append', 'upsert')
+
+# Type changes that keep existing rows and queries valid
+COMPATIBLE_TYPES = {
+    ('INTEGER', 'INTEGER'),
+    ('REAL', 'REAL'),
+    ('REAL', 'INTEGER'),
+    ('TEXT', 'TEXT'),
+    ('TEXT', 'INTEGER'),
+    ('TEXT', 'REAL'),
+}
+
+
+def row_hash_table(table_name: str) -> str:
+    """Name of the internal table holding row hashes for a table."""
+    return f"_rowhash_{table_name}"
+
+
+def _staging_table(table_name: str) -> str:
+    return f"_staging_{table_name}"
+
+
+def check_schema_compatibility(
+    existing: Dict[str, str],
+    incoming: Dict[str, str],
+    incoming_df: pd.DataFrame
+) -> None:
+    """
+    Validate that new data can be merged into an existing table.
+
+    Args:
+        existing: Column name to SQLite type of the existing table
+        incoming: Column name to SQLite type of the new data
+        incoming_df: New data (all-NULL columns are compatible with any type)
+
+    Raises:
+        ValueError: Describing every incompatibility found
+    """
+    problems = []
+
+    missing = [col for col in existing if col not in incoming]
+    extra = [col for col in incoming if col not in existing]
+    if missing:
+        problems.append(f"missing columns: {', '.join(missing)}")
+    if extra:
+        problems.append(f"unexpected columns: {', '.join(extra)}")
+
+    for col, col_type in incoming.items():
+        if col not in existing or incoming_df[col].isna().all():
+            continue
+        if (existing[col], col_type) not in COMPATIBLE_TYPES:
+            problems.append(f"column {col} is {col_type} but table has {existing[col]}")
+
+    if problems:
+        raise ValueError(f"Schema not compatible with existing table: {'; '.join(problems)}")
+
+
+def compute_row_hashes(df: pd.DataFrame, columns: List[str]) -> pd.Series:
+    """
+    Hash rows independently of how SQLite or pandas typed the values.
+
+    Numeric and boolean columns are hashed as floats and everything else
+    as text, with booleans spelled as SQLite stores them (0/1), so a row
+    read back from SQLite hashes the same as the DataFrame it came from.
+
+    Args:
+        df: Data to hash
+        columns: Columns to include, in table order
+
+    Returns:
+        Series of signed 64-bit hashes (SQLite INTEGER compatible)
+    """
+    normalized = {}
+    for col in columns:
+        series = df[col]
+        if pd.api.types.is_numeric_dtype(series):
+            normalized[col] = series.astype('float64')
+        elif pd.api.types.infer_dtype(series, skipna=True) == 'boolean':
+            # Booleans with missing values are object columns stored as TEXT '1'/'0'
+            normalized[col] = series.map({True: '1', False: '0'}).where(series.notna(), '\x00NULL').astype(str)
+        else:
+            normalized[col] = series.astype(object).where(series.notna(), '\x00NULL').astype(str)
+
+    hashes = pd.util.hash_pandas_object(pd.DataFrame(normalized), index=False)
+    return pd.Series(hashes.to_numpy().view('int64'), index=df.index)
+
+
+def _ensure_row_hashes(conn: sqlite3.Connection, table_name: str, columns: List[str]) -> None:
+    """Build the row hash table from existing rows the first time it is needed."""
+    hash_table = row_hash_table(table_name)
+    cursor = conn.cursor()
+    cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name = ?", (hash_table,))
+    if cursor.fetchone() is not None:
+        return
+
+    cursor.execute(f"CREATE TABLE {hash_table} (hash INTEGER PRIMARY KEY)")
+    for chunk in pd.read_sql(f"SELECT * FROM {table_name}", conn, chunksize=50000):
+        hashes = compute_row_hashes(chunk, columns)
+        cursor.executemany(
+            f"INSERT OR IGNORE INTO {hash_table} VALUES (?)",
+            ((int(h),) for h in hashes)
+        )
+    logger.info(f"✅ Built row hash index for {table_name}")
+
+
+def merge_dataframe(
+    conn: sqlite3.Connection,
+    df: pd.DataFrame,
+    table_name: str,
+    mode: str,
+    key_column: Optional[str] = None
+) -> Dict[str, int]:
+    """
+    Merge new rows into an existing table.
+
+    In 'append' mode rows whose key (or row hash) already exists are
+    skipped; in 'upsert' mode rows with an existing key are updated when
+    any value changed. Without a key column both modes skip duplicate rows.
+
+    Args:
+        conn: Connection to the uploaded database
+        df: Cleaned DataFrame with the same columns as the table
+        table_name: Existing table
+        mode: 'append' or 'upsert'
+        key_column: Column identifying a row, or None to use row hashes
+
+    Returns:
+        Dictionary with 'inserted', 'updated' and 'skipped' counts
+    """
+    cursor = conn.cursor()
+    cursor.execute(f"PRAGMA table_info({table_name})")
+    columns = [col[1] for col in cursor.fetchall()]
+    column_list = ', '.join(columns)
+    staging = _staging_table(table_name)
+
+    staged = df[columns].copy()
+    if key_column is None:
+        staged['_row_hash'] = compute_row_hashes(staged, columns).values
+
+    cursor.execute(f"DROP TABLE IF EXISTS {staging}")
+    staged.to_sql(staging, conn, index=False)
+    total = len(staged)
+
+    try:
+        if key_column is not None:
+            if key_column not in columns:
+                raise ValueError(f"Key column not found: {key_column}")
+
+            try:
+                cursor.execute(
+                    f"CREATE UNIQUE INDEX IF NOT EXISTS _idx_{table_name}_{key_column} "
+                    f"ON {table_name} ({key_column})"
+                )
+            except sqlite3.IntegrityError:
+                raise ValueError(f"Key column {key_column} has duplicate values in {table_name}")
+
+            # Keep only the last occurrence of each key in the new data
+            cursor.execute(
+                f"DELETE FROM {staging} WHERE rowid NOT IN "
+                f"(SELECT MAX(rowid) FROM {staging} GROUP BY {key_column})"
+            )
+
+            updated = 0
+            if mode == 'upsert':
+                value_columns = [col for col in columns if col != key_column]
+                if value_columns:
+                    changed = ' OR '.join(f"{table_name}.{col} IS NOT s.{col}" for col in value_columns)
+                    assignments = ', '.join(f"{col} = s.{col}" for col in value_columns)
+                    cursor.execute(
+                        f"UPDATE {table_name} SET {assignments} FROM {staging} AS s "
+                        f"WHERE {table_name}.{key_column} = s.{key_column} AND ({changed})"
+                    )
+                    updated = cursor.rowcount
+
+            cursor.execute(
+                f"INSERT INTO {table_name} ({column_list}) SELECT {column_list} FROM {staging} AS s "
+                f"WHERE NOT EXISTS (SELECT 1 FROM {table_name} AS t WHERE t.{key_column} = s.{key_column})"
+            )
+            inserted = cursor.rowcount
+
+            # Row hashes no longer describe the table
+            cursor.execute(f"DROP TABLE IF EXISTS {row_hash_table(table_name)}")
+        else:
+            _ensure_row_hashes(conn, table_name, columns)
+            hash_table = row_hash_table(table_name)
+
+            cursor.execute(
+                f"INSERT INTO {table_name} ({column_list}) SELECT {column_list} FROM {staging} "
+                f"WHERE rowid IN (SELECT MIN(rowid) FROM {staging} GROUP BY _row_hash) "
+                f"AND _row_hash NOT IN (SELECT hash FROM {hash_table})"
+            )
+            inserted = cursor.rowcount
+            updated = 0
+            cursor.execute(f"INSERT OR IGNORE INTO {hash_table} SELECT _row_hash FROM {staging}")
+    finally:
+        cursor.execute(f"DROP TABLE IF EXISTS {staging}")
+
+    return {
+        "inserted": inserted,
+        "updated": updated,
+        "skipped": total - inserted - updated
+    }
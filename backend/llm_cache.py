@@ -0,0 +1,218 @@
+"""
+Persistent cache of LLM generations.
+Maps a normalized question plus a fingerprint of the prompt's schema
+section to the generated (sql, explanation), stored in SQLite so answers
+survive restarts. The most frequently used entries are loaded into memory
+at startup; the file is bounded by evicting least recently used entries.
+"""
+
+import hashlib
+import sqlite3
+import threading
+import time
+import logging
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Entries kept on disk; least recently used beyond this are deleted
+MAX_DISK_ENTRIES = 50000
+
+# Entries kept in memory (and loaded at startup, most used first)
+MAX_MEMORY_ENTRIES = 2000
+
+# Hit counts and last-used times are flushed to disk in batches of this size
+TOUCH_FLUSH_EVERY = 50
+
+
+def fingerprint(prompt: str) -> str:
+    """
+    Fingerprint the schema-dependent part of a prompt.
+
+    Args:
+        prompt: System prompt describing the schema
+
+    Returns:
+        Hex digest; changes whenever tables, columns or statistics change
+    """
+    return hashlib.sha256(prompt.encode('utf-8')).hexdigest()[:32]
+
+
+def _cache_key(question: str, schema_fingerprint: str) -> str:
+    normalized = ' '.join(question.lower().split()).rstrip('?.; ')
+    return hashlib.sha256(f"{schema_fingerprint}\x00{normalized}".encode('utf-8')).hexdigest()
+
+
+class LLMCache:
+    """SQLite-backed LRU cache of generated SQL with an in-memory hot set."""
+
+    def __init__(
+        self,
+        path: Path,
+        max_disk_entries: int = MAX_DISK_ENTRIES,
+        max_memory_entries: int = MAX_MEMORY_ENTRIES
+    ):
+        self.path = path
+        self.max_disk_entries = max_disk_entries
+        self.max_memory_entries = max_memory_entries
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        # A lost cache entry only costs a regeneration, so commits need not fsync
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS generations (
+                key TEXT PRIMARY KEY,
+                question TEXT NOT NULL,
+                sql TEXT NOT NULL,
+                explanation TEXT,
+                hits INTEGER NOT NULL DEFAULT 0,
+                last_used REAL NOT NULL,
+                created_at REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_generations_last_used ON generations(last_used)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_generations_hits ON generations(hits)")
+        self._conn.commit()
+        # Kept up to date by put() so storing never has to count the table
+        self._disk_entries = self._conn.execute("SELECT COUNT(*) FROM generations").fetchone()[0]
+        # key -> {"sql", "explanation"}, least recently used first
+        self._memory: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        # key -> (extra hits, last used) not yet written to disk
+        self._pending_touches: Dict[str, tuple] = {}
+        self.metrics = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "stores": 0,
+            "evicted": 0,
+            "warm_entries": 0,
+            "warm_ms": 0.0
+        }
+
+    def warm(self) -> None:
+        """Load the most frequently used entries into memory."""
+        start = time.perf_counter()
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT key, sql, explanation FROM generations ORDER BY hits DESC, last_used DESC LIMIT ?",
+                (self.max_memory_entries,)
+            ).fetchall()
+            # Most used last, so they are the last to be evicted from memory
+            for key, sql, explanation in reversed(rows):
+                self._memory[key] = {"sql": sql, "explanation": explanation}
+        self.metrics["warm_entries"] = len(rows)
+        self.metrics["warm_ms"] = round((time.perf_counter() - start) * 1000, 1)
+        logger.info(f"✅ Warmed LLM cache with {len(rows)} entries in {self.metrics['warm_ms']}ms")
+
+    def _remember(self, key: str, entry: Dict[str, Any]) -> None:
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+    def _touch(self, key: str) -> None:
+        hits, _ = self._pending_touches.get(key, (0, 0.0))
+        self._pending_touches[key] = (hits + 1, time.time())
+        if len(self._pending_touches) >= TOUCH_FLUSH_EVERY:
+            self._flush_touches()
+
+    def _flush_touches(self) -> None:
+        self._conn.executemany(
+            "UPDATE generations SET hits = hits + ?, last_used = MAX(last_used, ?) WHERE key = ?",
+            [(hits, last_used, key) for key, (hits, last_used) in self._pending_touches.items()]
+        )
+        self._conn.commit()
+        self._pending_touches.clear()
+
+    def get(self, question: str, schema_fingerprint: str) -> Optional[Dict[str, Any]]:
+        """
+        Look up a previous generation.
+
+        Args:
+            question: Natural language question
+            schema_fingerprint: Result of fingerprint() for the current prompt
+
+        Returns:
+            Dictionary with 'sql' and 'explanation', or None on a miss
+        """
+        key = _cache_key(question, schema_fingerprint)
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                self._memory.move_to_end(key)
+                self.metrics["memory_hits"] += 1
+            else:
+                row = self._conn.execute(
+                    "SELECT sql, explanation FROM generations WHERE key = ?", (key,)
+                ).fetchone()
+                if row is None:
+                    self.metrics["misses"] += 1
+                    return None
+                entry = {"sql": row[0], "explanation": row[1]}
+                self._remember(key, entry)
+                self.metrics["disk_hits"] += 1
+            self._touch(key)
+            return dict(entry)
+
+    def put(self, question: str, schema_fingerprint: str, sql: str, explanation: str) -> None:
+        """
+        Store a generation, evicting least recently used entries beyond max_disk_entries.
+
+        Args:
+            question: Natural language question
+            schema_fingerprint: Result of fingerprint() for the current prompt
+            sql: Generated SQL
+            explanation: Generated explanation
+        """
+        key = _cache_key(question, schema_fingerprint)
+        now = time.time()
+        with self._lock:
+            is_new = self._conn.execute("SELECT 1 FROM generations WHERE key = ?", (key,)).fetchone() is None
+            self._conn.execute(
+                "INSERT INTO generations (key, question, sql, explanation, hits, last_used, created_at) "
+                "VALUES (?, ?, ?, ?, 0, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET sql = excluded.sql, explanation = excluded.explanation, "
+                "last_used = excluded.last_used",
+                (key, question, sql, explanation, now, now)
+            )
+            self._remember(key, {"sql": sql, "explanation": explanation})
+            self.metrics["stores"] += 1
+            self._disk_entries += is_new
+
+            count = self._disk_entries
+            if count > self.max_disk_entries:
+                # Pending touches decide what is recently used, so write them first
+                self._flush_touches()
+                cursor = self._conn.execute(
+                    "DELETE FROM generations WHERE key IN "
+                    "(SELECT key FROM generations ORDER BY last_used LIMIT ?)",
+                    (count - self.max_disk_entries,)
+                )
+                self.metrics["evicted"] += cursor.rowcount
+                self._disk_entries -= cursor.rowcount
+            self._conn.commit()
+
+    def close(self) -> None:
+        """Flush pending hit counts and close the database."""
+        with self._lock:
+            if self._pending_touches:
+                self._flush_touches()
+            self._conn.close()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Report hit rates, sizes and the startup warm-up time.
+
+        Returns:
+            Dictionary of counters
+        """
+        lookups = self.metrics["memory_hits"] + self.metrics["disk_hits"] + self.metrics["misses"]
+        return {
+            **self.metrics,
+            "hit_rate": round((lookups - self.metrics["misses"]) / lookups, 3) if lookups else 0.0,
+            "memory_entries": len(self._memory),
+            "disk_entries": self._disk_entries
+        }
@@ -0,0 +1,168 @@
+"""
+Single-pass extraction of the {"sql": ..., "explanation": ...} envelope
+from LLM responses. The parser is incremental so it can consume a streamed
+response and stop as soon as a complete envelope has arrived.
+"""
+
+import json
+import re
+import time
+from typing import Dict, List, Any, Optional
+
+FENCED_SQL_PATTERN = re.compile(r'```(?:sql)?\s*(.*?)```', re.DOTALL | re.IGNORECASE)
+BARE_SELECT_PATTERN = re.compile(r'(SELECT\b.*?)(?:;|\n\s*\n|$)', re.DOTALL | re.IGNORECASE)
+
+# A complete "sql" string in an envelope that was cut off before its closing brace
+TRUNCATED_SQL_PATTERN = re.compile(r'"sql"\s*:\s*("(?:[^"\\]|\\.)*")', re.DOTALL)
+
+parse_stats = {
+    "responses": 0,
+    "envelopes": 0,
+    "truncated_envelopes": 0,
+    "fenced_sql": 0,
+    "bare_select": 0,
+    "raw_text": 0,
+    "parse_us_total": 0.0
+}
+
+
+class JsonEnvelopeParser:
+    """
+    Incremental scanner for the first JSON object containing an "sql" key.
+
+    Tracks the open braces outside of JSON strings, so braces inside the
+    SQL or the explanation do not end the object early, and every object
+    that closes is tried, so an unbalanced brace in surrounding prose does
+    not hide the envelope.
+    """
+
+    def __init__(self):
+        self.text = ''
+        self.result: Optional[Dict[str, Any]] = None
+        self._pos = 0
+        # Positions of the braces opened and not yet closed
+        self._open: List[int] = []
+        self._in_string = False
+        self._escape = False
+        self._elapsed = 0.0
+
+    def feed(self, chunk: str) -> Optional[Dict[str, Any]]:
+        """
+        Consume the next piece of the response.
+
+        Args:
+            chunk: Newly received text
+
+        Returns:
+            The envelope once complete, otherwise None
+        """
+        if self.result is not None:
+            return self.result
+
+        start = time.perf_counter()
+        self.text += chunk
+        text = self.text
+        for i in range(self._pos, len(text)):
+            ch = text[i]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == '\\':
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"':
+                if self._open:
+                    self._in_string = True
+            elif ch == '{':
+                self._open.append(i)
+            elif ch == '}' and self._open:
+                candidate = text[self._open.pop():i + 1]
+                if '"sql"' in candidate:
+                    self.result = self._decode(candidate)
+                    if self.result is not None:
+                        self._pos = i + 1
+                        break
+        else:
+            self._pos = len(text)
+
+        self._elapsed += time.perf_counter() - start
+        return self.result
+
+    @staticmethod
+    def _decode(candidate: str) -> Optional[Dict[str, Any]]:
+        try:
+            # strict=False accepts raw newlines inside strings, common in model output
+            obj = json.loads(candidate, strict=False)
+        except json.JSONDecodeError:
+            return None
+        if isinstance(obj, dict) and 'sql' in obj:
+            return obj
+        return None
+
+    def _truncated_sql(self) -> Optional[str]:
+        """SQL of an envelope cut off (e.g. at max_tokens) after its "sql" string was complete."""
+        if not self._open:
+            return None
+        match = TRUNCATED_SQL_PATTERN.search(self.text, self._open[0])
+        if match is None:
+            return None
+        try:
+            return json.loads(match.group(1), strict=False)
+        except json.JSONDecodeError:
+            return None
+
+    def finish(self) -> Dict[str, Any]:
+        """
+        Return the envelope, falling back to SQL found elsewhere in the text.
+
+        Returns:
+            Dictionary with 'sql' and 'explanation'
+        """
+        start = time.perf_counter()
+        parse_stats["responses"] += 1
+
+        if self.result is not None:
+            parse_stats["envelopes"] += 1
+            result = dict(self.result)
+            result['sql'] = str(result.get('sql') or '')
+            result.setdefault('explanation', '')
+        else:
+            truncated = self._truncated_sql()
+            fenced = FENCED_SQL_PATTERN.search(self.text)
+            bare = BARE_SELECT_PATTERN.search(self.text)
+            if truncated is not None:
+                parse_stats["truncated_envelopes"] += 1
+                sql = truncated
+            elif fenced:
+                parse_stats["fenced_sql"] += 1
+                sql = fenced.group(1)
+            elif bare:
+                parse_stats["bare_select"] += 1
+                sql = bare.group(1)
+            else:
+                parse_stats["raw_text"] += 1
+                sql = self.text
+            result = {
+                "sql": sql.strip(),
+                "explanation": "SQL query generated from natural language"
+            }
+
+        self._elapsed += time.perf_counter() - start
+        parse_stats["parse_us_total"] += self._elapsed * 1e6
+        return result
+
+
+def get_parse_stats() -> Dict[str, Any]:
+    """
+    Report how responses were parsed and the average parsing cost.
+
+    Returns:
+        Dictionary of metrics
+    """
+    responses = parse_stats["responses"]
+    return {
+        **{key: value for key, value in parse_stats.items() if key != "parse_us_total"},
+        "envelope_rate": round(parse_stats["envelopes"] / responses, 3) if responses else 0.0,
+        "avg_parse_us": round(parse_stats["parse_us_total"] / responses, 1) if responses else 0.0
+    }
@@ -0,0 +1,92 @@
+"""
+Background query jobs.
+Lets a client ask for the exact result of a query (typically after an
+approximate answer) and poll for it instead of holding a request open.
+"""
+
+import asyncio
+import time
+import uuid
+import logging
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Finished jobs beyond this many are forgotten, oldest first
+MAX_JOBS = 100
+
+
+class QueryJobs:
+    """In-memory registry of background query jobs."""
+
+    def __init__(self, max_jobs: int = MAX_JOBS):
+        self.max_jobs = max_jobs
+        self._jobs: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._tasks: Dict[str, asyncio.Task] = {}
+
+    def submit(self, fn: Callable[[], Awaitable[Any]], **details: Any) -> str:
+        """
+        Start a job in the background.
+
+        Args:
+            fn: Coroutine function producing the job result
+            **details: Extra fields reported with the job (e.g. sql)
+
+        Returns:
+            Job id
+        """
+        job_id = uuid.uuid4().hex
+        self._jobs[job_id] = {
+            "job_id": job_id,
+            "status": "running",
+            "submitted_at": time.time(),
+            **details
+        }
+        self._tasks[job_id] = asyncio.ensure_future(self._run(job_id, fn))
+        self._evict()
+        return job_id
+
+    async def _run(self, job_id: str, fn: Callable[[], Awaitable[Any]]) -> None:
+        start = time.perf_counter()
+        try:
+            result = await fn()
+            update = {"status": "done", "result": result}
+        except Exception as e:
+            logger.error(f"❌ Query job {job_id} failed: {str(e)}")
+            update = {"status": "failed", "error": str(e)}
+        finally:
+            self._tasks.pop(job_id, None)
+
+        job = self._jobs.get(job_id)
+        if job is not None:
+            job.update(update, elapsed_ms=round((time.perf_counter() - start) * 1000, 1))
+
+    def _evict(self) -> None:
+        finished = [job_id for job_id, job in self._jobs.items() if job["status"] != "running"]
+        for job_id in finished[:max(0, len(self._jobs) - self.max_jobs)]:
+            del self._jobs[job_id]
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Look up a job.
+
+        Args:
+            job_id: Id returned by submit
+
+        Returns:
+            Job status dict, or None if unknown
+        """
+        return self._jobs.get(job_id)
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Report job counts by status.
+
+        Returns:
+            Dictionary of counters
+        """
+        counts = {"running": 0, "done": 0, "failed": 0}
+        for job in self._jobs.values():
+            counts[job["status"]] += 1
+        return counts
@@ -0,0 +1,386 @@
+"""
+Sample tables for approximate query answering on large uploads.
+A uniform (or, when a low-cardinality dimension exists, stratified) sample
+is stored with a per-row weight; aggregate queries are rewritten to run on
+the sample, scale their results by the weights and report 95% error bounds.
+"""
+
+import math
+import re
+import sqlite3
+import logging
+from typing import Dict, List, Optional, Any
+
+from sql_parser import (
+    AGGREGATE_PATTERN,
+    split_clauses,
+    join_clauses,
+    split_top_level,
+    split_alias,
+    parse_single_table,
+    strip_string_literals,
+)
+from summary_tables import detect_dimensions
+
+logger = logging.getLogger(__name__)
+
+SAMPLE_META_TABLE = '_sample_tables'
+
+# Tables smaller than this are fast enough to query exactly
+MIN_ROWS_FOR_SAMPLE = 100000
+
+# Target number of sampled rows
+SAMPLE_SIZE = 10000
+
+# Every stratum keeps at least this many rows (or all of them) so rare groups are represented
+MIN_ROWS_PER_STRATUM = 100
+
+# Strata are only used for dimensions with at most this many values
+MAX_STRATA = 50
+
+# z-score of the reported error bounds
+CONFIDENCE = 0.95
+CONFIDENCE_Z = 1.96
+
+# A sample's extremes understate the table's, with no error bound, so
+# queries using MIN/MAX are always answered exactly
+EXTREME_AGGREGATES = ('MIN', 'MAX')
+
+# Aggregate calls the rewriter cannot scale (nested expressions, DISTINCT, ...)
+ANY_AGGREGATE_CALL = re.compile(r'\b(COUNT|SUM|AVG|MIN|MAX|TOTAL|GROUP_CONCAT)\s*\(', re.IGNORECASE)
+
+
+def sample_table(table_name: str) -> str:
+    """Name of the sample table of a table."""
+    return f"_sample_{table_name}"
+
+
+def _ensure_meta_table(cursor: sqlite3.Cursor) -> None:
+    cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS {SAMPLE_META_TABLE} (
+            table_name TEXT PRIMARY KEY,
+            sample_table TEXT NOT NULL,
+            stratify_column TEXT,
+            sample_rows INTEGER NOT NULL,
+            total_rows INTEGER NOT NULL
+        )
+    """)
+
+
+def drop_sample_table(cursor: sqlite3.Cursor, table_name: str) -> None:
+    """
+    Drop the sample table of a table.
+
+    Args:
+        cursor: Cursor on the uploaded database
+        table_name: Base table name
+    """
+    _ensure_meta_table(cursor)
+    cursor.execute(f"DROP TABLE IF EXISTS {sample_table(table_name)}")
+    cursor.execute(f"DELETE FROM {SAMPLE_META_TABLE} WHERE table_name = ?", (table_name,))
+
+
+def _choose_stratify_column(cursor: sqlite3.Cursor, table_name: str, schema: Dict[str, str]) -> Optional[str]:
+    """Pick the plain dimension with the fewest values (at least two) for stratification."""
+    best, best_count = None, MAX_STRATA + 1
+    for dim in detect_dimensions(cursor, table_name, schema):
+        if dim['dimension'] != dim['key_column']:
+            continue
+        cursor.execute(f"SELECT COUNT(DISTINCT {dim['dimension']}) FROM {table_name}")
+        count = cursor.fetchone()[0]
+        if 2 <= count < best_count:
+            best, best_count = dim['dimension'], count
+    return best
+
+
+def build_sample_table(
+    conn: sqlite3.Connection,
+    table_name: str,
+    schema: Dict[str, str]
+) -> Optional[Dict[str, Any]]:
+    """
+    Build (or rebuild) the weighted sample of a large table.
+
+    Each sampled row stores `_weight`, the number of base rows it stands for.
+
+    Args:
+        conn: Connection to the uploaded database
+        table_name: Base table name
+        schema: Dictionary mapping column names to SQLite types
+
+    Returns:
+        Sample table info, or None when the table is too small to need one
+    """
+    cursor = conn.cursor()
+    drop_sample_table(cursor, table_name)
+
+    cursor.execute(f"SELECT COUNT(*) FROM {table_name}")
+    total_rows = cursor.fetchone()[0]
+    if total_rows < MIN_ROWS_FOR_SAMPLE:
+        return None
+
+    sample = sample_table(table_name)
+    column_list = ', '.join(schema)
+    fraction = SAMPLE_SIZE / total_rows
+    stratify_column = _choose_stratify_column(cursor, table_name, schema)
+
+    if stratify_column:
+        # Proportional allocation with a floor per stratum; the weight is stratum size / stratum sample size
+        cursor.execute(
+            f"CREATE TABLE {sample} AS "
+            f"WITH strata AS ("
+            f"  SELECT {stratify_column} AS stratum, COUNT(*) AS n FROM {table_name} GROUP BY {stratify_column}"
+            f"), allocation AS ("
+            f"  SELECT stratum, n, MIN(n, MAX(?, CAST(ROUND(n * ?) AS INTEGER))) AS k FROM strata"
+            f"), ranked AS ("
+            f"  SELECT {column_list}, ROW_NUMBER() OVER (PARTITION BY {stratify_column} ORDER BY random()) AS _rn "
+            f"  FROM {table_name}"
+            f") "
+            f"SELECT {', '.join(f'ranked.{col}' for col in schema)}, allocation.n * 1.0 / allocation.k AS _weight "
+            f"FROM ranked JOIN allocation ON ranked.{stratify_column} IS allocation.stratum "
+            f"WHERE ranked._rn <= allocation.k",
+            (MIN_ROWS_PER_STRATUM, fraction)
+        )
+    else:
+        cursor.execute(
+            f"CREATE TABLE {sample} AS "
+            f"SELECT {column_list}, ? * 1.0 / ? AS _weight FROM {table_name} "
+            f"WHERE rowid IN (SELECT rowid FROM {table_name} ORDER BY random() LIMIT ?)",
+            (total_rows, SAMPLE_SIZE, SAMPLE_SIZE)
+        )
+
+    cursor.execute(f"SELECT COUNT(*) FROM {sample}")
+    sample_rows = cursor.fetchone()[0]
+    cursor.execute(
+        f"INSERT INTO {SAMPLE_META_TABLE} VALUES (?, ?, ?, ?, ?)",
+        (table_name, sample, stratify_column, sample_rows, total_rows)
+    )
+
+    logger.info(
+        f"✅ Built sample of {table_name}: {sample_rows} of {total_rows} rows"
+        + (f", stratified by {stratify_column}" if stratify_column else "")
+    )
+    return {
+        "sample_table": sample,
+        "stratify_column": stratify_column,
+        "sample_rows": sample_rows,
+        "total_rows": total_rows
+    }
+
+
+def get_sample_info(cursor: sqlite3.Cursor, table_name: str) -> Optional[Dict[str, Any]]:
+    """
+    Get the sample table registered for a table.
+
+    Args:
+        cursor: Cursor on the uploaded database
+        table_name: Base table name
+
+    Returns:
+        Sample table info, or None if the table has no sample
+    """
+    cursor.execute(
+        "SELECT name FROM sqlite_master WHERE type='table' AND name = ?",
+        (SAMPLE_META_TABLE,)
+    )
+    if cursor.fetchone() is None:
+        return None
+
+    cursor.execute(
+        f"SELECT sample_table, stratify_column, sample_rows, total_rows FROM {SAMPLE_META_TABLE} "
+        f"WHERE table_name = ?",
+        (table_name,)
+    )
+    row = cursor.fetchone()
+    if row is None:
+        return None
+    return {
+        "sample_table": row[0],
+        "stratify_column": row[1],
+        "sample_rows": row[2],
+        "total_rows": row[3]
+    }
+
+
+def _scale_aggregate(func: str, arg: str) -> Dict[str, Any]:
+    """
+    Translate COUNT, SUM or AVG into a weighted estimate plus the sums its variance needs.
+
+    Variances use the Horvitz-Thompson estimator for Poisson sampling,
+    sum of w(w-1)y^2, which is conservative for fixed-size samples.
+    """
+    if arg == '*':
+        value, present = "1", "1"
+    else:
+        value, present = arg, f"({arg} IS NOT NULL)"
+    factor = "_weight * (_weight - 1)"
+
+    if func == 'COUNT':
+        return {
+            "kind": "count",
+            "estimate": f"TOTAL(_weight * {present})",
+            "aux": [f"TOTAL({factor} * {present})"]
+        }
+    if func == 'SUM':
+        return {
+            "kind": "total",
+            "estimate": f"SUM(_weight * {value})",
+            "aux": [f"TOTAL({factor} * {value} * {value})"]
+        }
+    # AVG is a ratio estimate: weighted sum / weighted count of non-null values
+    return {
+        "kind": "ratio",
+        "estimate": f"(SUM(_weight * {value}) / SUM(_weight * {present}))",
+        "aux": [
+            f"TOTAL({factor} * {value} * {value})",
+            f"TOTAL({factor} * {value})",
+            f"TOTAL({factor} * {present})",
+            f"TOTAL(_weight * {present})",
+        ]
+    }
+
+
+def _rewrite_aggregate_references(expr: str) -> Optional[str]:
+    """Scale every aggregate in a HAVING / ORDER BY expression."""
+    unsupported = False
+
+    def replace(match: re.Match) -> str:
+        nonlocal unsupported
+        if match.group(2) or match.group(1).upper() in EXTREME_AGGREGATES:
+            unsupported = True
+            return match.group()
+        return _scale_aggregate(match.group(1).upper(), match.group(3))["estimate"]
+
+    rewritten = AGGREGATE_PATTERN.sub(replace, expr)
+    if unsupported or len(ANY_AGGREGATE_CALL.findall(strip_string_literals(rewritten))) != \
+            len(ANY_AGGREGATE_CALL.findall(strip_string_literals(expr))):
+        return None
+    return rewritten
+
+
+def rewrite_for_sample(sql: str, table_name: str, sample: str) -> Optional[Dict[str, Any]]:
+    """
+    Rewrite an aggregate query over a table to run on its weighted sample.
+
+    Args:
+        sql: Validated SELECT query
+        table_name: Base table name
+        sample: Sample table name
+
+    Returns:
+        Dict with the rewritten 'sql' and an 'items' plan for computing
+        error bounds, or None if the query cannot be answered approximately
+    """
+    clauses = split_clauses(sql)
+    if clauses is None or parse_single_table(clauses['from']) != table_name.lower():
+        return None
+    if re.match(r'DISTINCT\b', clauses['select'], re.IGNORECASE):
+        return None
+
+    select_items, aux_items, items = [], [], []
+    for item in split_top_level(clauses['select']):
+        expr, alias = split_alias(item)
+        name = alias or expr
+        match = AGGREGATE_PATTERN.fullmatch(expr)
+        if match is None:
+            # Plain expressions (group keys) are kept, but hidden aggregates cannot be scaled
+            if ANY_AGGREGATE_CALL.search(strip_string_literals(expr)):
+                return None
+            select_items.append(item)
+            items.append({"name": name, "kind": "plain", "aux": []})
+            continue
+
+        if match.group(2) or '"' in name or match.group(1).upper() in EXTREME_AGGREGATES:
+            return None
+        scaled = _scale_aggregate(match.group(1).upper(), match.group(3))
+        select_items.append(f'{scaled["estimate"]} AS "{name}"')
+        items.append({
+            "name": name,
+            "kind": scaled["kind"],
+            "aux": list(range(len(aux_items), len(aux_items) + len(scaled["aux"])))
+        })
+        aux_items.extend(scaled["aux"])
+
+    if not aux_items:
+        # Nothing to scale: base rows only
+        return None
+
+    new_clauses = dict(clauses)
+    new_clauses['select'] = ', '.join(
+        select_items + [f"{aux} AS _aux_{i}" for i, aux in enumerate(aux_items)]
+    )
+    new_clauses['from'] = sample
+    for clause in ('having', 'order by'):
+        if clauses.get(clause):
+            rewritten = _rewrite_aggregate_references(clauses[clause])
+            if rewritten is None:
+                return None
+            new_clauses[clause] = rewritten
+
+    return {"sql": join_clauses(new_clauses), "items": items}
+
+
+def _error_bound(item: Dict[str, Any], value: Any, aux: List[Any]) -> Optional[float]:
+    """95% confidence half-width of one estimated value."""
+    if item["kind"] == "plain" or value is None:
+        return None
+    if item["kind"] in ("count", "total"):
+        variance = aux[item["aux"][0]]
+    else:
+        squares, values, count, weight = (aux[i] for i in item["aux"])
+        if not weight:
+            return None
+        variance = (squares - 2 * value * values + value * value * count) / (weight * weight)
+    return round(CONFIDENCE_Z * math.sqrt(max(variance, 0.0)), 6)
+
+
+def run_on_sample(conn: sqlite3.Connection, sql: str, table_name: str) -> Optional[Dict[str, Any]]:
+    """
+    Answer an aggregate query approximately from the table's sample.
+
+    Args:
+        conn: Connection to the uploaded database
+        sql: Validated SELECT query
+        table_name: Base table name
+
+    Returns:
+        Dict with 'columns', 'rows', 'error_bounds' (one dict per row of
+        column name to 95% half-width) and sample sizes, or None when the
+        table has no sample or the query cannot be answered approximately
+    """
+    info = get_sample_info(conn.cursor(), table_name)
+    if info is None:
+        return None
+
+    plan = rewrite_for_sample(sql, table_name, info["sample_table"])
+    if plan is None:
+        return None
+
+    cursor = conn.cursor()
+    cursor.execute(plan["sql"])
+    items = plan["items"]
+    width = len(items)
+    columns = [description[0] for description in cursor.description[:width]]
+
+    rows, error_bounds = [], []
+    for row in cursor.fetchall():
+        values, aux = list(row[:width]), row[width:]
+        for i, item in enumerate(items):
+            if item["kind"] == "count":
+                values[i] = int(round(values[i]))
+        rows.append(tuple(values))
+        error_bounds.append({
+            item["name"]: _error_bound(item, value, aux)
+            for item, value in zip(items, values)
+            if item["kind"] != "plain"
+        })
+
+    logger.info(f"⚡ Answered approximately from {info['sample_table']}")
+    return {
+        "columns": columns,
+        "rows": rows,
+        "error_bounds": error_bounds,
+        "confidence": CONFIDENCE,
+        "sample_rows": info["sample_rows"],
+        "total_rows": info["total_rows"]
+    }
@@ -1,4 +1,5 @@
-from fastapi import FastAPI, APIRouter, HTTPException, UploadFile, File
+from fastapi import FastAPI, APIRouter, HTTPException, UploadFile, File, Request
+from fastapi.responses import FileResponse, StreamingResponse, JSONResponse
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
@@ -6,25 +7,56 @@ import os
 import logging
 from pathlib import Path
 from pydantic import BaseModel, Field, ConfigDict
-from typing import List, Optional, Any, Dict
+from typing import List, Optional, Any, Dict, Callable, Awaitable
 import uuid
 from datetime import datetime, timezone
 import sqlite3
 from openai import OpenAI
 import json
 import re
+import asyncio
+import time
 
 # Import file handling modules
-from file_handler import process_uploaded_file
+from file_handler import process_uploaded_file, process_uploaded_files
+from example_index import ExampleIndex
+from llm_response import JsonEnvelopeParser, get_parse_stats
+from singleflight import SingleFlight
+from query_jobs import QueryJobs
+from admission import AdmissionController, RateLimited, count_referenced_rows
+from llm_cache import LLMCache, fingerprint
+from template_matcher import TemplateMatcher, FastPathStats, timed_match
+from exporter import EXPORT_FORMATS, MEDIA_TYPES, export_cursor, find_export, parse_range, iter_file_range
+from fts_index import build_fts_index, get_fts_columns, rewrite_like_with_fts
+from column_stats import profile_table, store_column_stats, get_column_stats, describe_column_stats
 from db_manager import (
     sanitize_table_name,
     create_table_from_dataframe,
+    append_to_table,
     get_uploaded_tables,
     delete_uploaded_table,
     get_table_schema,
     execute_query_on_uploaded_db,
+    explain_query_on_uploaded_db,
+    execute_approximate_query,
+    export_query_on_uploaded_db,
+    materialize_summary_tables,
+    list_summary_tables,
+    import_database_file,
+    get_attached_database_schema,
+    get_full_text_columns,
+    get_table_column_stats,
+    get_federated_catalog,
+    execute_federated_query,
+    explain_federated_query,
+    export_federated_query,
+    estimate_rows_on_uploaded_db,
+    estimate_federated_rows,
+    federated_pool,
     UPLOAD_DB_PATH
 )
+from catalog import select_relevant_tables, find_join_keys
+from attached_databases import quote_table_name, unregister_database
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
@@ -55,8 +87,62 @@ query_history_memory = []
 # Create SQLite database with e-commerce schema
 DB_PATH = ROOT_DIR / 'ecommerce.db'
 
+# Build FTS5 indexes over TEXT columns of the default tables
+ENABLE_FULL_TEXT_INDEX = os.environ.get('ENABLE_FULL_TEXT_INDEX', 'true').lower() == 'true'
+
+# Few-shot examples retrieved from successfully executed questions
+FEW_SHOT_EXAMPLES = 3
+example_index = ExampleIndex()
+
+# Ask the LLM backend for constrained JSON output (Ollama supports OpenAI's json_object mode)
+LLM_JSON_MODE = os.environ.get('LLM_JSON_MODE', 'true').lower() == 'true'
+
+# Extra LLM calls allowed to repair SQL that fails EXPLAIN
+MAX_REPAIR_ATTEMPTS = 2
+
+# Completion budget per LLM call
+LLM_MAX_TOKENS = 500
+
+# Persist validated generations so restarts do not start cold
+ENABLE_LLM_CACHE = os.environ.get('ENABLE_LLM_CACHE', 'true').lower() == 'true'
+LLM_CACHE_PATH = ROOT_DIR / 'llm_cache.db'
+
+# Answer common question shapes (counts, top-N, group-by) without the LLM
+ENABLE_TEMPLATE_FAST_PATH = os.environ.get('ENABLE_TEMPLATE_FAST_PATH', 'true').lower() == 'true'
+template_stats = FastPathStats()
+# (database, database file mtime) -> matcher built from that schema
+template_matchers: Dict[tuple, TemplateMatcher] = {}
+generation_metrics = {
+    "requests": 0,
+    "attempts": 0,
+    "validated": 0,
+    "repaired": 0,
+    "failed_validation": 0,
+    "latency_ms_total": 0.0
+}
+
+# Coalesce identical concurrent generate/execute requests
+generation_flight = SingleFlight()
+execution_flight = SingleFlight()
+
+# Exact results requested in the background (e.g. after an approximate answer)
+query_jobs = QueryJobs()
+
+# Per-client token buckets for LLM tokens, rows scanned and upload bytes
+ENABLE_ADMISSION_CONTROL = os.environ.get('ENABLE_ADMISSION_CONTROL', 'true').lower() == 'true'
+admission = AdmissionController()
+
+# Cheap endpoints bypass admission control so they stay responsive under load
+PRIORITY_PATHS = {"/api/", "/api/health", "/api/metrics", "/api/schema", "/api/active-schema", "/api/databases", "/api/catalog"}
+
+# Endpoints charged by request body size
+UPLOAD_PATHS = {"/api/upload-data", "/api/upload-data/batch"}
+
 # Active database tracking
-active_database = "default"  # "default" or table name from uploaded_data.db
+active_database = "default"  # "default", "federated" or table name from uploaded_data.db
+
+# Queries the default database and all uploads together, with qualified table names
+FEDERATED_DATABASE = "federated"
 
 def init_sqlite_db():
     conn = sqlite3.connect(DB_PATH)
@@ -147,16 +233,59 @@ def init_sqlite_db():
         ]
         cursor.executemany('INSERT INTO orders (customer_id, product_id, quantity, total_price, order_date, status) VALUES (?, ?, ?, ?, ?, ?)', orders)
     
+    # Keep full-text indexes in sync with the tables
+    if ENABLE_FULL_TEXT_INDEX:
+        for table_name in ('products', 'customers', 'orders'):
+            cursor.execute(f"PRAGMA table_info({table_name})")
+            text_columns = [col[1] for col in cursor.fetchall() if col[2] == 'TEXT']
+            build_fts_index(conn, table_name, text_columns)
+    
+    # Value statistics for the prompt
+    for table_name in ('products', 'customers', 'orders'):
+        store_column_stats(cursor, table_name, profile_table(conn, table_name))
+    
     conn.commit()
     conn.close()
 
 # Initialize database on startup
 init_sqlite_db()
 
+# Load the most used cached generations before serving requests
+llm_cache = None
+if ENABLE_LLM_CACHE:
+    llm_cache = LLMCache(LLM_CACHE_PATH)
+    llm_cache.warm()
+
 # Create the main app
 app = FastAPI()
 api_router = APIRouter(prefix="/api")
 
+@app.exception_handler(RateLimited)
+async def handle_rate_limited(request: Request, e: RateLimited):
+    return rate_limited_response(e)
+
+@app.middleware("http")
+async def admission_control(request: Request, call_next):
+    """Admit requests through the priority lane or a metered execution slot."""
+    if not ENABLE_ADMISSION_CONTROL or request.method == "OPTIONS" or not request.url.path.startswith("/api/"):
+        return await call_next(request)
+    
+    if request.url.path in PRIORITY_PATHS:
+        admission.priority += 1
+        return await call_next(request)
+    
+    if request.url.path in UPLOAD_PATHS and not request.headers.get("content-length", "").isdigit():
+        # Quotas are charged up front, so a chunked upload would have no size to charge
+        return JSONResponse(status_code=411, content={"detail": "Uploads must send a Content-Length header"})
+    
+    try:
+        if request.url.path in UPLOAD_PATHS:
+            await admit(request, "upload_bytes", int(request.headers["content-length"]))
+        async with admission.slot():
+            return await call_next(request)
+    except RateLimited as e:
+        return rate_limited_response(e)
+
 # Models
 class QueryRequest(BaseModel):
     question: str
@@ -164,14 +293,33 @@ class QueryRequest(BaseModel):
 class QueryResponse(BaseModel):
     sql: str
     explanation: str
+    attempts: int = 1
+    latency_ms: Optional[float] = None
+    validated: bool = True
+    cached: bool = False
+    template: Optional[str] = None  # Fast-path template that produced the SQL, if any
 
 class ExecuteQueryRequest(BaseModel):
     sql: str
+    question: Optional[str] = None  # Question the SQL answers; indexed as a few-shot example on success
+    approximate: bool = False  # Answer aggregates from the table's sample, with error bounds
 
 class ExecuteQueryResponse(BaseModel):
     columns: List[str]
     rows: List[List[Any]]
     row_count: int
+    approximate: bool = False
+    error_bounds: Optional[List[Dict[str, Optional[float]]]] = None  # Per row: column -> 95% half-width
+    confidence: Optional[float] = None
+    sample_rows: Optional[int] = None
+    total_rows: Optional[int] = None
+
+class QueryJobRequest(BaseModel):
+    sql: str
+
+class ExportRequest(BaseModel):
+    sql: str
+    format: str = "csv"  # "csv", or "parquet" when pyarrow is installed
 
 class QueryHistory(BaseModel):
     model_config = ConfigDict(extra="ignore")
@@ -192,8 +340,11 @@ def get_database_schema() -> str:
     conn = sqlite3.connect(DB_PATH)
     cursor = conn.cursor()
     
-    # Get all tables
-    cursor.execute("SELECT name FROM sqlite_master WHERE type='table' ORDER BY name")
+    # Get all tables (internal tables are prefixed with an underscore)
+    cursor.execute(
+        "SELECT name FROM sqlite_master WHERE type='table' "
+        "AND name NOT LIKE '\\_%' ESCAPE '\\' ORDER BY name"
+    )
     tables = cursor.fetchall()
     
     schema_str = "Database Schema:\n\n"
@@ -217,6 +368,19 @@ def get_database_schema() -> str:
     conn.close()
     return schema_str
 
+def describe_full_text_indexes(indexes: Dict[str, List[str]]) -> str:
+    """Describe available FTS5 indexes for the LLM prompt."""
+    lines = []
+    for table_name, columns in indexes.items():
+        if columns:
+            lines.append(
+                f"- {table_name} columns {', '.join(columns)} are full-text indexed. To search text use: "
+                f"WHERE rowid IN (SELECT rowid FROM _fts_{table_name} WHERE _fts_{table_name} MATCH 'term')"
+            )
+    if not lines:
+        return ""
+    return "\nFULL-TEXT SEARCH:\n" + "\n".join(lines) + "\n- LIKE '%term%' on these columns is also fast\n"
+
 def sanitize_sql(sql: str) -> str:
     """Validate and sanitize SQL query - only allow SELECT statements."""
     sql = sql.strip()
@@ -240,8 +404,186 @@ def sanitize_sql(sql: str) -> str:
     
     return sql
 
-async def generate_sql_with_llm(question: str) -> dict:
-    """Generate SQL query from natural language using Ollama."""
+def validate_sql(sql: str) -> Optional[str]:
+    """Check a candidate query against the active schema without running it.
+    
+    Returns the error message, or None if the query is valid.
+    """
+    try:
+        sql = sanitize_sql(sql)
+        if active_database == "default":
+            conn = sqlite3.connect(DB_PATH)
+            try:
+                conn.execute(f"EXPLAIN {sql}")
+            finally:
+                conn.close()
+        elif active_database == FEDERATED_DATABASE:
+            explain_federated_query(sql)
+        else:
+            explain_query_on_uploaded_db(sql)
+        return None
+    except (ValueError, sqlite3.Error) as e:
+        return str(e)
+
+def record_generation(attempts: int, validated: bool, latency_ms: float) -> None:
+    """Update generate-and-validate counters."""
+    generation_metrics["requests"] += 1
+    generation_metrics["attempts"] += attempts
+    generation_metrics["latency_ms_total"] += latency_ms
+    if validated:
+        generation_metrics["validated"] += 1
+        if attempts > 1:
+            generation_metrics["repaired"] += 1
+    else:
+        generation_metrics["failed_validation"] += 1
+
+def stream_completion(client: OpenAI, messages: List[Dict[str, str]]) -> JsonEnvelopeParser:
+    """Stream a chat completion, stopping as soon as a complete JSON envelope has arrived."""
+    stream = client.chat.completions.create(
+        model="qwen2.5:0.5b",  # Lightweight model
+        messages=messages,
+        temperature=0.1,
+        max_tokens=LLM_MAX_TOKENS,
+        stream=True,
+        **({"response_format": {"type": "json_object"}} if LLM_JSON_MODE else {})
+    )
+    
+    parser = JsonEnvelopeParser()
+    for chunk in stream:
+        if chunk.choices and chunk.choices[0].delta.content:
+            if parser.feed(chunk.choices[0].delta.content) is not None:
+                stream.response.close()
+                break
+    return parser
+
+def run_query(sql: str, database: str) -> tuple:
+    """Execute validated SQL on the given database and return (columns, rows)."""
+    if database == "default":
+        conn = sqlite3.connect(DB_PATH)
+        try:
+            cursor = conn.cursor()
+            cursor.execute(rewrite_like_with_fts(conn, sql))
+            columns = [description[0] for description in cursor.description]
+            return columns, cursor.fetchall()
+        finally:
+            conn.close()
+    
+    if database == FEDERATED_DATABASE:
+        return execute_federated_query(sql)
+    
+    # Execute on uploaded database
+    return execute_query_on_uploaded_db(sql, database)
+
+def run_export(sql: str, database: str, export_format: str) -> Dict[str, Any]:
+    """Execute validated SQL on the given database and spool its rows to an export file."""
+    if database == "default":
+        conn = sqlite3.connect(DB_PATH)
+        try:
+            cursor = conn.cursor()
+            cursor.execute(rewrite_like_with_fts(conn, sql))
+            return export_cursor(cursor, export_format)
+        finally:
+            conn.close()
+    
+    if database == FEDERATED_DATABASE:
+        return export_federated_query(sql, export_format)
+    
+    return export_query_on_uploaded_db(sql, export_format, database)
+
+# Quoted literals and identifiers, whose whitespace and case are significant
+QUOTED_PATTERN = re.compile(r"('(?:[^']|'')*'|\"(?:[^\"]|\"\")*\")")
+
+def coalesce_key(sql: str) -> str:
+    """Normalize whitespace outside quotes and trailing semicolons so equivalent queries share a key."""
+    parts = QUOTED_PATTERN.split(sql)
+    # Odd parts are quoted: 'a  b' and 'a b' are different values
+    return ''.join(part if i % 2 else re.sub(r'\s+', ' ', part) for i, part in enumerate(parts)).strip().rstrip(';').strip()
+
+def quote_column(qualified_column: str) -> str:
+    """SQL for a qualified column (alias.table.column) with its table name quoted as needed."""
+    table_name, column = qualified_column.rsplit('.', 1)
+    return f"{quote_table_name(table_name)}.{column}"
+
+def estimate_rows_scanned(sql: str, database: str) -> int:
+    """Estimate rows a query will scan from the sizes of the tables it references."""
+    if database == "default":
+        conn = sqlite3.connect(DB_PATH)
+        try:
+            return count_referenced_rows(conn, sql)
+        finally:
+            conn.close()
+    
+    if database == FEDERATED_DATABASE:
+        return estimate_federated_rows(sql)
+    
+    return estimate_rows_on_uploaded_db(sql)
+
+def get_template_matcher() -> Optional[TemplateMatcher]:
+    """Template matcher for the active database's catalog, rebuilt when its file changes."""
+    if active_database == FEDERATED_DATABASE:
+        return None
+    
+    db_path = DB_PATH if active_database == "default" else UPLOAD_DB_PATH
+    if not db_path.exists():
+        return None
+    key = (active_database, db_path.stat().st_mtime_ns)
+    matcher = template_matchers.get(key)
+    if matcher is not None:
+        return matcher
+    
+    if active_database == "default":
+        schema, stats = {}, {}
+        conn = sqlite3.connect(DB_PATH)
+        try:
+            for table_name in ('products', 'customers', 'orders'):
+                schema.update(get_table_schema(table_name, DB_PATH))
+                stats[table_name] = get_column_stats(conn.cursor(), table_name)
+        finally:
+            conn.close()
+    elif '.' in active_database:
+        schema, stats = get_attached_database_schema(active_database.split('.', 1)[0]), None
+    else:
+        schema = get_table_schema(active_database)
+        stats = {active_database: get_table_column_stats(active_database)}
+    
+    matcher = TemplateMatcher(schema, stats)
+    # Only the current version of each database is worth keeping
+    for stale in [k for k in template_matchers if k[0] == active_database]:
+        del template_matchers[stale]
+    template_matchers[key] = matcher
+    return matcher
+
+def client_id(request: Request) -> str:
+    """Identify the client a request is charged to."""
+    return request.client.host if request.client else "unknown"
+
+async def admit(request: Request, resource: str, cost: float) -> None:
+    """Charge a request to its client's bucket; raises RateLimited when over quota."""
+    if ENABLE_ADMISSION_CONTROL:
+        await admission.admit(client_id(request), resource, cost)
+
+async def admit_scan(request: Request, sql: str, database: str) -> None:
+    """Charge a query's estimated rows scanned."""
+    if ENABLE_ADMISSION_CONTROL:
+        rows = await asyncio.to_thread(estimate_rows_scanned, sql, database)
+        await admission.admit(client_id(request), "rows_scanned", rows)
+
+def rate_limited_response(e: RateLimited) -> JSONResponse:
+    """429 response telling the client when to retry."""
+    return JSONResponse(
+        status_code=429,
+        content={"detail": str(e)},
+        headers={"Retry-After": str(max(1, round(e.retry_after)))}
+    )
+
+async def generate_sql_with_llm(question: str, before_llm_call: Optional[Callable[[], Awaitable[None]]] = None) -> dict:
+    """Generate SQL query from natural language using Ollama.
+    
+    Answers from the persistent cache when the same question was answered
+    for the same schema; before_llm_call is awaited only on a cache miss.
+    """
+    # The active database may be switched while this request awaits
+    database = active_database
     
     # Get schema for ACTIVE database (not just default)
     if active_database == "default":
@@ -255,6 +597,67 @@ SCHEMA:
 CRITICAL RULES:
 - The primary key column in ALL tables is called "id" (not product_id, not customer_id, not order_id)
 - When joining tables, use the foreign key columns: customer_id and product_id in the orders table
+"""
+        conn = sqlite3.connect(DB_PATH)
+        try:
+            cursor = conn.cursor()
+            schema_description += describe_full_text_indexes({
+                table_name: get_fts_columns(cursor, table_name)
+                for table_name in ('products', 'customers', 'orders')
+            })
+            schema_description += describe_column_stats({
+                table_name: get_column_stats(cursor, table_name)
+                for table_name in ('products', 'customers', 'orders')
+            })
+        finally:
+            conn.close()
+    elif active_database == FEDERATED_DATABASE:
+        # Every database is queryable; describe only the tables the question needs
+        catalog = get_federated_catalog()
+        tables = select_relevant_tables(catalog, question)
+        if not tables:
+            raise ValueError("No tables available for cross-database queries")
+        
+        schema = "\n".join(
+            f"Table: {quote_table_name(name)}\nColumns: " + ", ".join(f"{col['name']} ({col['type']})" for col in catalog[name])
+            for name in tables
+        )
+        join_keys = find_join_keys(catalog, tables)
+        
+        schema_description = f"""
+SCHEMA:
+{schema}
+
+CRITICAL RULES:
+- Use ONLY the table and column names listed above
+- Always use the qualified table names exactly as listed (ecommerce.orders, uploads.<table>, ...)
+- The primary key column of the ecommerce tables is called "id"
+- Join tables from different databases when the question needs them
+"""
+        if join_keys:
+            schema_description += "\nJOIN KEYS:\n" + "\n".join(
+                f"- {quote_column(left)} = {quote_column(right)}" for left, right in join_keys
+            ) + "\n"
+    elif '.' in active_database:
+        # Attached database file: describe all of its tables
+        alias = active_database.split('.', 1)[0]
+        attached_schema = get_attached_database_schema(alias)
+        if not attached_schema:
+            raise ValueError(f"Schema not found for database: {alias}")
+        
+        schema = "\n".join(
+            f"Table: {quote_table_name(name)}\nColumns: " + ", ".join(f"{col['name']} ({col['type']})" for col in columns)
+            for name, columns in attached_schema.items()
+        )
+        
+        schema_description = f"""
+SCHEMA:
+{schema}
+
+CRITICAL RULES:
+- Use ONLY the table and column names listed above
+- Always qualify table names with the database name, e.g. {quote_table_name(active_database)}
+- Prefer the {quote_table_name(active_database)} table unless the question needs the others
 """
     else:
         # Get schema for uploaded database
@@ -275,6 +678,12 @@ CRITICAL RULES:
 - All column names are lowercase with underscores
 - Query ONLY the {active_database} table
 """
+        schema_description += describe_full_text_indexes({
+            active_database: get_full_text_columns(active_database)
+        })
+        schema_description += describe_column_stats({
+            active_database: get_table_column_stats(active_database)
+        })
     
     system_message = f"""You are an expert SQL query generator.
 
@@ -298,9 +707,25 @@ Return your response in this exact JSON format:
 }}
 """
     
+    # The prompt embeds the schema and its statistics, so any data change misses the cache
+    schema_fingerprint = fingerprint(system_message)
+    if llm_cache is not None:
+        start = time.perf_counter()
+        # SQLite lookups stay off the event loop
+        cached = await asyncio.to_thread(llm_cache.get, question, schema_fingerprint)
+        if cached is not None:
+            cached['attempts'] = 0
+            cached['latency_ms'] = round((time.perf_counter() - start) * 1000, 1)
+            cached['validated'] = True
+            cached['cached'] = True
+            return cached
+    
+    if before_llm_call is not None:
+        await before_llm_call()
+    
     # Use Ollama only
     try:
-        logging.info(f"🟢 Generating SQL with Ollama for database: {active_database}...")
+        logging.info(f"🟢 Generating SQL with Ollama for database: {database}...")
         
         client = OpenAI(
             api_key="ollama",  # Dummy key for Ollama
@@ -308,40 +733,52 @@ Return your response in this exact JSON format:
         )
         
         logging.info(f"Question: {question}")
-        response = client.chat.completions.create(
-            model="qwen2.5:0.5b",  # Lightweight model
-            messages=[
-                {"role": "system", "content": system_message},
-                {"role": "user", "content": question}
-            ],
-            temperature=0.1,
-            max_tokens=500
-        )
         
-        response_text = response.choices[0].message.content
-        logging.info(f"✅ Ollama response: {response_text[:100]}...")
+        # Show the most similar past successes as few-shot examples
+        messages = [{"role": "system", "content": system_message}]
+        for example in example_index.search(database, question, k=FEW_SHOT_EXAMPLES):
+            messages.append({"role": "user", "content": example["question"]})
+            messages.append({
+                "role": "assistant",
+                "content": json.dumps({"sql": example["sql"], "explanation": "Answered previously"})
+            })
+        messages.append({"role": "user", "content": question})
         
-        # Parse response
-        try:
-            json_match = re.search(r'\{[^}]+\}', response_text, re.DOTALL)
-            if json_match:
-                result = json.loads(json_match.group())
-            else:
-                result = json.loads(response_text)
+        # Generate, validate with EXPLAIN, and feed errors back for repair
+        start = time.perf_counter()
+        for attempt in range(1, MAX_REPAIR_ATTEMPTS + 2):
+            # The OpenAI client is blocking; keep the event loop free for other requests
+            parser = await asyncio.to_thread(stream_completion, client, messages)
             
-            # Auto-fix common column name mistakes
-            sql = result.get('sql', '')
-            sql = sql.replace('product_id,', 'id as product_id,')
-            sql = sql.replace('customer_id,', 'id as customer_id,')
-            sql = sql.replace('order_id,', 'id as order_id,')
-            result['sql'] = sql
+            response_text = parser.text
+            logging.info(f"✅ Ollama response (attempt {attempt}): {response_text[:100]}...")
             
-            return result
-        except json.JSONDecodeError:
-            return {
-                "sql": response_text.strip(),
-                "explanation": "SQL query generated from natural language"
-            }
+            result = parser.finish()
+            error = validate_sql(result['sql'])
+            if error is None:
+                break
+            
+            logging.info(f"🔁 Candidate SQL failed validation: {error}")
+            messages.append({"role": "assistant", "content": response_text})
+            messages.append({
+                "role": "user",
+                "content": f"That SQL failed with error: {error}\n"
+                           f"Fix it using ONLY the tables and columns in the schema and "
+                           f"return the corrected JSON."
+            })
+        
+        latency_ms = round((time.perf_counter() - start) * 1000, 1)
+        record_generation(attempt, error is None, latency_ms)
+        
+        result['attempts'] = attempt
+        result['latency_ms'] = latency_ms
+        result['validated'] = error is None
+        
+        if llm_cache is not None and error is None:
+            await asyncio.to_thread(
+                llm_cache.put, question, schema_fingerprint, result['sql'], result.get('explanation', '')
+            )
+        return result
             
     except Exception as e:
         logging.error(f"❌ Ollama failed: {type(e).__name__}: {str(e)}")
@@ -362,17 +799,84 @@ async def health_check():
         "database": "connected"
     }
 
+@api_router.get("/metrics")
+async def get_metrics():
+    """Performance counters for the SQL generation pipeline."""
+    requests = generation_metrics["requests"]
+    return {
+        "generation": {
+            **generation_metrics,
+            "avg_attempts": round(generation_metrics["attempts"] / requests, 3) if requests else 0.0,
+            "avg_latency_ms": round(generation_metrics["latency_ms_total"] / requests, 1) if requests else 0.0
+        },
+        "few_shot_index": example_index.stats(),
+        "response_parsing": get_parse_stats(),
+        "coalescing": {
+            "generate_sql": generation_flight.stats(),
+            "execute_query": execution_flight.stats()
+        },
+        "query_jobs": query_jobs.stats(),
+        "federated_pool": federated_pool.stats(),
+        "admission": admission.stats(),
+        "llm_cache": llm_cache.stats() if llm_cache is not None else None,
+        "template_fast_path": template_stats.stats()
+    }
+
 @api_router.post("/generate-sql", response_model=QueryResponse)
-async def generate_sql(request: QueryRequest):
+async def generate_sql(request: QueryRequest, http_request: Request):
     """Generate SQL query from natural language."""
     try:
         if not request.question.strip():
             raise HTTPException(status_code=422, detail="Question cannot be empty")
         
-        result = await generate_sql_with_llm(request.question)
+        # Charged (on a cache miss) the completion budget plus roughly 4 characters per question token
+        own_limit = []
+        async def admit_llm_call():
+            try:
+                await admit(http_request, "llm_tokens", LLM_MAX_TOKENS + len(request.question) // 4)
+            except RateLimited:
+                own_limit.append(True)
+                raise
+        
+        # Common shapes are answered directly from the schema catalog
+        matcher = get_template_matcher() if ENABLE_TEMPLATE_FAST_PATH else None
+        if matcher is not None:
+            match, elapsed_us = timed_match(matcher, request.question)
+            requests = generation_metrics["requests"]
+            avg_llm_ms = generation_metrics["latency_ms_total"] / requests if requests else 0.0
+            template_stats.record(elapsed_us, match and match["template"], avg_llm_ms)
+            if match is not None:
+                return QueryResponse(
+                    sql=match["sql"],
+                    explanation=match["explanation"],
+                    attempts=0,
+                    latency_ms=round(elapsed_us / 1000, 3),
+                    template=match["template"]
+                )
+        
+        # Identical concurrent questions share one LLM call
+        # Questions are keyed exactly: case and spacing inside quoted values matter
+        key = (active_database, request.question.strip())
+        while True:
+            try:
+                result = await generation_flight.do(key, lambda: generate_sql_with_llm(request.question, admit_llm_call))
+                break
+            except RateLimited:
+                # Only the client whose budget ran out gets the 429; the others share a new flight
+                if own_limit:
+                    raise
         # Validate the generated SQL
         sanitize_sql(result['sql'])
-        return QueryResponse(sql=result['sql'], explanation=result.get('explanation', ''))
+        return QueryResponse(
+            sql=result['sql'],
+            explanation=result.get('explanation', ''),
+            attempts=result.get('attempts', 1),
+            latency_ms=result.get('latency_ms'),
+            validated=result.get('validated', True),
+            cached=result.get('cached', False)
+        )
+    except (HTTPException, RateLimited):
+        raise
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
@@ -380,23 +884,47 @@ async def generate_sql(request: QueryRequest):
         raise HTTPException(status_code=500, detail=str(e))
 
 @api_router.post("/execute-query", response_model=ExecuteQueryResponse)
-async def execute_query(request: ExecuteQueryRequest):
+async def execute_query(request: ExecuteQueryRequest, http_request: Request):
     """Execute SQL query and return results."""
     try:
         # Sanitize and validate SQL
         sql = sanitize_sql(request.sql)
         
-        # Execute query on appropriate database
-        if active_database == "default":
-            conn = sqlite3.connect(DB_PATH)
-            cursor = conn.cursor()
-            cursor.execute(sql)
-            columns = [description[0] for description in cursor.description]
-            rows = cursor.fetchall()
-            conn.close()
+        database = active_database
+        
+        # Approximate mode falls back to the exact query when no sample can answer it
+        approximate = None
+        if request.approximate and database not in ("default", FEDERATED_DATABASE):
+            approximate = await execution_flight.do(
+                (database, coalesce_key(sql), "approximate"),
+                lambda: asyncio.to_thread(execute_approximate_query, sql, database)
+            )
+        
+        if approximate is None:
+            await admit_scan(http_request, sql, database)
+            # Execute query on appropriate database; identical concurrent queries share one scan
+            columns, rows = await execution_flight.do(
+                (database, coalesce_key(sql)),
+                lambda: asyncio.to_thread(run_query, sql, database)
+            )
         else:
-            # Execute on uploaded database
-            columns, rows = execute_query_on_uploaded_db(sql)
+            columns, rows = approximate["columns"], approximate["rows"]
+        
+        # Remember the question -> SQL pair for future prompts
+        if request.question and request.question.strip():
+            example_index.add(database, request.question, sql)
+        
+        if approximate is not None:
+            return ExecuteQueryResponse(
+                columns=columns,
+                rows=rows,
+                row_count=len(rows),
+                approximate=True,
+                error_bounds=approximate["error_bounds"],
+                confidence=approximate["confidence"],
+                sample_rows=approximate["sample_rows"],
+                total_rows=approximate["total_rows"]
+            )
         
         return ExecuteQueryResponse(
             columns=columns,
@@ -404,6 +932,8 @@ async def execute_query(request: ExecuteQueryRequest):
             row_count=len(rows)
         )
     
+    except RateLimited:
+        raise
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except sqlite3.Error as e:
@@ -412,6 +942,95 @@ async def execute_query(request: ExecuteQueryRequest):
         logging.error(f"Error executing query: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@api_router.post("/query-jobs")
+async def submit_query_job(request: QueryJobRequest, http_request: Request):
+    """Run a query exactly in the background; poll GET /query-jobs/{job_id} for the result."""
+    try:
+        sql = sanitize_sql(request.sql)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    database = active_database
+    await admit_scan(http_request, sql, database)
+    
+    async def run_exact():
+        columns, rows = await execution_flight.do(
+            (database, coalesce_key(sql)),
+            lambda: asyncio.to_thread(run_query, sql, database)
+        )
+        return {"columns": columns, "rows": rows, "row_count": len(rows)}
+    
+    job_id = query_jobs.submit(run_exact, sql=sql, database=database)
+    return {"job_id": job_id, "status": "running"}
+
+@api_router.get("/query-jobs/{job_id}")
+async def get_query_job(job_id: str):
+    """Get the status (and, once done, the exact result) of a background query."""
+    job = query_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@api_router.post("/export")
+async def export_query(request: ExportRequest, http_request: Request):
+    """Write the full result of a query to a CSV/Parquet file; download it from GET /export/{export_id}."""
+    try:
+        sql = sanitize_sql(request.sql)
+        if request.format not in EXPORT_FORMATS:
+            raise ValueError(f"Unsupported export format: {request.format}. Available: {', '.join(EXPORT_FORMATS)}")
+        
+        database = active_database
+        await admit_scan(http_request, sql, database)
+        export = await asyncio.to_thread(run_export, sql, database, request.format)
+        export["download_url"] = f"/api/export/{export['export_id']}"
+        return export
+    
+    except RateLimited:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except sqlite3.Error as e:
+        raise HTTPException(status_code=400, detail=f"SQL Error: {str(e)}")
+    except Exception as e:
+        logging.error(f"Error exporting query: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@api_router.get("/export/{export_id}")
+async def download_export(export_id: str, request: Request):
+    """Stream an export file from disk, honoring single byte-range requests."""
+    path = find_export(export_id)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Export not found or expired")
+    
+    export_format = path.suffix.lstrip('.')
+    size = path.stat().st_size
+    headers = {
+        "Accept-Ranges": "bytes",
+        "Content-Disposition": f'attachment; filename="query_results.{export_format}"'
+    }
+    
+    try:
+        byte_range = parse_range(request.headers.get("range"), size)
+    except ValueError:
+        raise HTTPException(
+            status_code=416,
+            detail="Requested range not satisfiable",
+            headers={"Content-Range": f"bytes */{size}"}
+        )
+    
+    if byte_range is None:
+        return FileResponse(path, media_type=MEDIA_TYPES[export_format], headers=headers)
+    
+    start, end = byte_range
+    headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    headers["Content-Length"] = str(end - start + 1)
+    return StreamingResponse(
+        iter_file_range(path, start, end),
+        status_code=206,
+        media_type=MEDIA_TYPES[export_format],
+        headers=headers
+    )
+
 @api_router.get("/schema", response_model=SchemaInfo)
 async def get_schema():
     """Get database schema information."""
@@ -419,8 +1038,11 @@ async def get_schema():
         conn = sqlite3.connect(DB_PATH)
         cursor = conn.cursor()
         
-        # Get all tables
-        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' ORDER BY name")
+        # Get all tables (internal tables are prefixed with an underscore)
+        cursor.execute(
+            "SELECT name FROM sqlite_master WHERE type='table' "
+            "AND name NOT LIKE '\\_%' ESCAPE '\\' ORDER BY name"
+        )
         tables = cursor.fetchall()
         
         schema_info = {}
@@ -517,11 +1139,30 @@ async def get_sample_data():
         raise HTTPException(status_code=500, detail=str(e))
 
 @api_router.post("/upload-data")
-async def upload_data(file: UploadFile = File(...)):
-    """Upload CSV/Excel/JSON file and create table."""
+async def upload_data(
+    file: UploadFile = File(...),
+    materialize_summaries: bool = False,
+    full_text_index: bool = False,
+    mode: str = "replace",
+    table_name: Optional[str] = None,
+    key_column: Optional[str] = None,
+    time_partitioning: bool = False
+):
+    """
+    Upload CSV/Excel/JSON file and create table, optionally with rollup tables.
+    
+    mode="append" / "upsert" merges into an existing table (matched by
+    table_name, or by file name) instead of recreating it.
+    
+    time_partitioning=true stores date/timestamp columns as epoch seconds,
+    split into per-month partitions for very large uploads.
+    """
     global active_database
     
     try:
+        if mode not in ("replace", "append", "upsert"):
+            raise HTTPException(status_code=400, detail="mode must be one of: replace, append, upsert")
+        
         # Validate file size (10MB limit)
         file_content = await file.read()
         if len(file_content) > 10 * 1024 * 1024:
@@ -536,14 +1177,29 @@ async def upload_data(file: UploadFile = File(...)):
         
         logging.info(f"📁 Uploading file: {file.filename}")
         
+        # SQLite files and SQL dumps are attached directly instead of parsed
+        if file.filename.endswith(('.sql', '.db', '.sqlite')):
+            return await upload_database_file(file_content, file.filename)
+        
         # Process the file
-        df, schema, preview = process_uploaded_file(file_content, file.filename)
+        df, schema, preview, stats = process_uploaded_file(file_content, file.filename)
         
         # Create table name
-        table_name = sanitize_table_name(file.filename)
+        table_name = sanitize_table_name(table_name or file.filename)
         
-        # Create table in uploaded database
-        create_table_from_dataframe(df, table_name, schema)
+        ingest_start = time.perf_counter()
+        if mode == "replace":
+            # Create table in uploaded database
+            create_table_from_dataframe(
+                df, table_name, schema, materialize_summaries, full_text_index, stats, time_partitioning
+            )
+            counts = {"inserted": len(df), "updated": 0, "skipped": 0}
+            row_count = len(df)
+        else:
+            # Merge only new/changed rows into the existing table
+            counts = append_to_table(df, table_name, schema, mode, key_column)
+            row_count = execute_query_on_uploaded_db(f"SELECT COUNT(*) FROM {table_name}")[1][0][0]
+        ingest_seconds = round(time.perf_counter() - ingest_start, 4)
         
         # Switch to uploaded database
         active_database = table_name
@@ -554,18 +1210,146 @@ async def upload_data(file: UploadFile = File(...)):
             "success": True,
             "table_name": table_name,
             "display_name": table_name.replace('_', ' ').title(),
-            "row_count": len(df),
+            "row_count": row_count,
             "column_count": len(df.columns),
             "schema": schema,
-            "preview": preview
+            "preview": preview,
+            "mode": mode,
+            "rows_inserted": counts["inserted"],
+            "rows_updated": counts["updated"],
+            "rows_skipped": counts["skipped"],
+            "column_stats": get_table_column_stats(table_name),
+            "ingest_seconds": ingest_seconds
         }
         
+    except HTTPException:
+        raise
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logging.error(f"❌ Upload failed: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Upload failed: {str(e)}")
 
+async def upload_database_file(file_content: bytes, filename: str) -> dict:
+    """Attach an uploaded SQLite database or SQL dump and switch to its first table."""
+    global active_database
+    
+    attached = await asyncio.get_running_loop().run_in_executor(
+        None, import_database_file, file_content, filename
+    )
+    
+    table_name = attached["tables"][0]
+    columns = attached["schema"][table_name]
+    try:
+        _, rows = execute_query_on_uploaded_db(f"SELECT * FROM {quote_table_name(table_name)} LIMIT 5")
+        row_count = execute_query_on_uploaded_db(f"SELECT COUNT(*) FROM {quote_table_name(table_name)}")[1][0][0]
+        
+        active_database = table_name
+    except Exception:
+        # A database that cannot be previewed must not stay listed
+        conn = sqlite3.connect(UPLOAD_DB_PATH)
+        try:
+            unregister_database(conn, attached["alias"])
+        finally:
+            conn.close()
+        federated_pool.clear()
+        raise
+    
+    logging.info(f"✅ Database attached successfully: {attached['alias']}")
+    
+    return {
+        "success": True,
+        "table_name": table_name,
+        "display_name": table_name.replace('.', ' / ').replace('_', ' ').title(),
+        "row_count": row_count,
+        "column_count": len(columns),
+        "schema": {col["name"]: col["type"] for col in columns},
+        "preview": [dict(zip([col["name"] for col in columns], row)) for row in rows],
+        "alias": attached["alias"],
+        "tables": attached["tables"]
+    }
+
+@api_router.post("/upload-data/batch")
+async def upload_data_batch(
+    files: List[UploadFile] = File(...),
+    materialize_summaries: bool = False,
+    full_text_index: bool = False,
+    time_partitioning: bool = False
+):
+    """Upload several files (multi-sheet workbooks, zip archives of CSVs) as separate tables."""
+    global active_database
+    
+    try:
+        start = time.perf_counter()
+        items = []
+        for file in files:
+            file_content = await file.read()
+            if len(file_content) > 10 * 1024 * 1024:
+                raise HTTPException(status_code=413, detail=f"File too large: {file.filename}. Maximum size is 10MB")
+            if not file.filename.endswith(('.csv', '.xlsx', '.xls', '.json', '.zip')):
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"Unsupported file format: {file.filename}. Please upload CSV, Excel, JSON or zip files"
+                )
+            items.append((file_content, file.filename))
+        
+        logging.info(f"📁 Uploading {len(items)} files")
+        
+        # Parse in worker processes without blocking the event loop
+        loop = asyncio.get_running_loop()
+        results = await loop.run_in_executor(None, process_uploaded_files, items)
+        
+        tables = []
+        used_names = set()
+        for result in results:
+            # Keep each sheet/file in its own table even if names collide
+            table_name = sanitize_table_name(result["name"])
+            base_name, suffix = table_name, 2
+            while table_name in used_names:
+                table_name = f"{base_name[:46]}_{suffix}"
+                suffix += 1
+            used_names.add(table_name)
+            
+            ingest_start = time.perf_counter()
+            create_table_from_dataframe(
+                result["df"], table_name, result["schema"], materialize_summaries, full_text_index,
+                result["column_stats"], time_partitioning
+            )
+            
+            tables.append({
+                "table_name": table_name,
+                "display_name": table_name.replace('_', ' ').title(),
+                "source": result["name"],
+                "sheet_name": result["sheet_name"],
+                "row_count": len(result["df"]),
+                "column_count": len(result["df"].columns),
+                "schema": result["schema"],
+                "preview": result["preview"],
+                "column_stats": get_table_column_stats(table_name),
+                "parse_seconds": result["parse_seconds"],
+                "ingest_seconds": round(time.perf_counter() - ingest_start, 4)
+            })
+        
+        # Switch to the first uploaded table
+        active_database = tables[0]["table_name"]
+        
+        logging.info(f"✅ Uploaded {len(tables)} tables")
+        
+        return {
+            "success": True,
+            "tables": tables,
+            "active_database": active_database,
+            "total_seconds": round(time.perf_counter() - start, 4)
+        }
+    
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logging.error(f"❌ Batch upload failed: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Upload failed: {str(e)}")
+
 @api_router.get("/databases")
 async def get_databases():
     """Get list of available databases."""
@@ -584,6 +1368,15 @@ async def get_databases():
         table["active"] = active_database == table["name"]
         databases.append(table)
     
+    # Cross-database mode is only useful once something has been uploaded
+    if uploaded:
+        databases.insert(1, {
+            "name": FEDERATED_DATABASE,
+            "display_name": "All data (cross-database)",
+            "type": "federated",
+            "active": active_database == FEDERATED_DATABASE
+        })
+    
     return {"databases": databases, "active": active_database}
 
 @api_router.post("/switch-database")
@@ -597,6 +1390,10 @@ async def switch_database(db_name: str):
     
     # Check if uploaded database exists
     uploaded = get_uploaded_tables()
+    if db_name == FEDERATED_DATABASE and uploaded:
+        active_database = FEDERATED_DATABASE
+        return {"success": True, "active_database": FEDERATED_DATABASE}
+    
     if any(t["name"] == db_name for t in uploaded):
         active_database = db_name
         return {"success": True, "active_database": db_name}
@@ -614,16 +1411,55 @@ async def delete_upload(table_name: str):
         # Switch to default if deleted table was active
         if active_database == table_name:
             active_database = "default"
+        # Cross-database mode needs at least one upload
+        if active_database == FEDERATED_DATABASE and not get_uploaded_tables():
+            active_database = "default"
         return {"success": True, "message": f"Deleted {table_name}"}
     
     raise HTTPException(status_code=404, detail="Table not found")
 
+@api_router.get("/summaries/{table_name}")
+async def get_summaries(table_name: str):
+    """List rollup tables built for an uploaded table."""
+    return {"table_name": table_name, "summaries": list_summary_tables(table_name)}
+
+@api_router.post("/summaries/{table_name}")
+async def build_summaries(table_name: str):
+    """Build (or rebuild) rollup tables for an uploaded table on demand."""
+    try:
+        summaries = materialize_summary_tables(table_name)
+        return {"success": True, "table_name": table_name, "summaries": summaries}
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        logging.error(f"❌ Building summaries failed: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@api_router.get("/column-stats/{table_name}")
+async def column_stats(table_name: str):
+    """Get null counts, distinct estimates, ranges and common values for an uploaded table."""
+    stats = get_table_column_stats(table_name)
+    if not stats:
+        raise HTTPException(status_code=404, detail="No statistics for table")
+    return {"table_name": table_name, "columns": stats}
+
+@api_router.get("/catalog")
+async def get_catalog():
+    """List every table queryable in cross-database mode, keyed by qualified name."""
+    return {"tables": get_federated_catalog()}
+
 @api_router.get("/active-schema")
 async def get_active_schema():
     """Get schema for currently active database."""
     if active_database == "default":
         # Return default database schema
         return await get_schema()
+    elif active_database == FEDERATED_DATABASE:
+        # Return every table reachable in cross-database mode
+        return {"tables": get_federated_catalog()}
+    elif '.' in active_database:
+        # Return every table of the attached database file
+        return {"tables": get_attached_database_schema(active_database.split('.', 1)[0])}
     else:
         # Return uploaded database schema
         schema = get_table_schema(active_database)
@@ -649,4 +1485,6 @@ logger = logging.getLogger(__name__)
 @app.on_event("shutdown")
 async def shutdown_db_client():
     if client is not None:
-        client.close()
\ No newline at end of file
+        client.close()
+    if llm_cache is not None:
+        llm_cache.close()
\ No newline at end of file
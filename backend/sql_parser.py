@@ -0,0 +1,234 @@
+"""
+Lightweight SQL parsing helpers used by the query rewriters.
+Only understands the single-SELECT shapes the LLM generates; anything
+more complex is reported as unsupported so callers run the query as-is.
+"""
+
+import re
+from typing import Dict, List, Optional, Set
+
+# Top-level clause keywords, in the order they may appear in a SELECT
+CLAUSE_KEYWORDS = ['select', 'from', 'where', 'group by', 'having', 'order by', 'limit']
+
+AGGREGATE_PATTERN = re.compile(
+    r'\b(COUNT|SUM|MIN|MAX|AVG)\s*\(\s*(DISTINCT\s+)?(\*|[A-Za-z_][A-Za-z0-9_]*)\s*\)',
+    re.IGNORECASE
+)
+
+IDENTIFIER_PATTERN = re.compile(r'"([^"]+)"|\b([A-Za-z_][A-Za-z0-9_]*)\b(\s*\()?')
+
+SQL_KEYWORDS = {
+    'and', 'or', 'not', 'in', 'is', 'null', 'like', 'glob', 'between', 'as',
+    'asc', 'desc', 'case', 'when', 'then', 'else', 'end', 'distinct', 'true',
+    'false', 'collate', 'nocase', 'escape', 'cast', 'integer', 'real', 'text',
+}
+
+
+def strip_string_literals(sql: str) -> str:
+    """
+    Replace the contents of single-quoted literals with blanks.
+
+    Args:
+        sql: SQL text
+
+    Returns:
+        SQL text of the same length with literal contents blanked out
+    """
+    return re.sub(r"'(?:[^']|'')*'", lambda m: "'" + ' ' * (len(m.group()) - 2) + "'", sql)
+
+
+def split_top_level(text: str, separator: str = ',') -> List[str]:
+    """
+    Split text on a separator that is not nested in parentheses or quotes.
+
+    Args:
+        text: Text to split
+        separator: Single separator character
+
+    Returns:
+        List of stripped parts
+    """
+    parts = []
+    depth = 0
+    quote = None
+    start = 0
+    for i, ch in enumerate(text):
+        if quote:
+            if ch == quote:
+                quote = None
+        elif ch in ("'", '"'):
+            quote = ch
+        elif ch == '(':
+            depth += 1
+        elif ch == ')':
+            depth -= 1
+        elif ch == separator and depth == 0:
+            parts.append(text[start:i].strip())
+            start = i + 1
+    parts.append(text[start:].strip())
+    return parts
+
+
+def split_clauses(sql: str) -> Optional[Dict[str, str]]:
+    """
+    Split a single SELECT statement into its top-level clauses.
+
+    Args:
+        sql: SQL query
+
+    Returns:
+        Dictionary mapping clause keyword to clause body, or None if the
+        statement uses constructs the rewriters do not handle
+    """
+    sql = sql.strip().rstrip(';').strip()
+    masked = strip_string_literals(sql)
+
+    # Blank out everything nested in parentheses so only top-level keywords match
+    flat = []
+    depth = 0
+    for ch in masked:
+        if ch == '(':
+            depth += 1
+            flat.append(ch)
+        elif ch == ')':
+            depth -= 1
+            flat.append(ch)
+        else:
+            flat.append(ch if depth == 0 else ' ')
+    flat = ''.join(flat)
+
+    if re.search(r'\b(union|intersect|except|with|join|window)\b|;', flat, re.IGNORECASE):
+        return None
+
+    positions = []
+    for keyword in CLAUSE_KEYWORDS:
+        pattern = r'\b' + keyword.replace(' ', r'\s+') + r'\b'
+        matches = list(re.finditer(pattern, flat, re.IGNORECASE))
+        if len(matches) > 1:
+            return None
+        if matches:
+            positions.append((matches[0].start(), matches[0].end(), keyword))
+
+    positions.sort()
+    if not positions or positions[0][2] != 'select' or positions[0][0] != 0:
+        return None
+    # Clauses must appear in canonical order
+    if [p[2] for p in positions] != [k for k in CLAUSE_KEYWORDS if k in {p[2] for p in positions}]:
+        return None
+
+    clauses = {}
+    for i, (start, end, keyword) in enumerate(positions):
+        stop = positions[i + 1][0] if i + 1 < len(positions) else len(sql)
+        clauses[keyword] = sql[end:stop].strip()
+
+    if 'from' not in clauses:
+        return None
+    return clauses
+
+
+def join_clauses(clauses: Dict[str, str]) -> str:
+    """
+    Rebuild a SELECT statement from clauses produced by split_clauses.
+
+    Args:
+        clauses: Dictionary mapping clause keyword to clause body
+
+    Returns:
+        SQL query
+    """
+    return ' '.join(
+        f"{keyword.upper()} {clauses[keyword]}"
+        for keyword in CLAUSE_KEYWORDS
+        if clauses.get(keyword)
+    )
+
+
+def split_alias(item: str) -> tuple:
+    """
+    Split a select item into expression and explicit alias.
+
+    Args:
+        item: Select list item
+
+    Returns:
+        Tuple of (expression, alias or None)
+    """
+    match = re.match(r'^(.*?)\s+AS\s+("[^"]+"|[A-Za-z_][A-Za-z0-9_]*)$', item, re.IGNORECASE | re.DOTALL)
+    if match:
+        return match.group(1).strip(), match.group(2).strip('"')
+    return item.strip(), None
+
+
+def parse_single_table(from_clause: str) -> Optional[str]:
+    """
+    Extract the table name from a FROM clause that names exactly one table.
+
+    Args:
+        from_clause: Body of the FROM clause
+
+    Returns:
+        Table name (lowercase), or None for joins, aliases and subqueries
+    """
+    match = re.fullmatch(r'"?([A-Za-z_][A-Za-z0-9_]*(?:\.[A-Za-z_][A-Za-z0-9_]*)?)"?', from_clause.strip())
+    return match.group(1).lower() if match else None
+
+
+def referenced_columns(expr: str) -> Set[str]:
+    """
+    Collect bare identifiers referenced by an expression.
+
+    Function names, keywords and string literals are ignored.
+
+    Args:
+        expr: SQL expression
+
+    Returns:
+        Set of lowercase identifiers
+    """
+    names = set()
+    for match in IDENTIFIER_PATTERN.finditer(strip_string_literals(expr)):
+        quoted, bare, call = match.groups()
+        if quoted:
+            names.add(quoted.lower())
+        elif bare and not call and bare.lower() not in SQL_KEYWORDS:
+            names.add(bare.lower())
+    return names
+
+
+def normalize_expression(expr: str) -> str:
+    """
+    Normalize an expression for comparison (case and whitespace insensitive).
+
+    Args:
+        expr: SQL expression
+
+    Returns:
+        Normalized expression
+    """
+    return re.sub(r'\s+', '', expr).lower()
+
+
+def referenced_tables(sql: str) -> List[str]:
+    """
+    Collect the tables named after FROM and JOIN anywhere in a query.
+
+    Names defined by a WITH clause are skipped since they are not stored tables.
+
+    Args:
+        sql: SQL text
+
+    Returns:
+        Distinct table names (lowercase, qualified names kept), in order of appearance
+    """
+    text = strip_string_literals(sql)
+    cte_names = {name.lower() for name in re.findall(r'\b([A-Za-z_][A-Za-z0-9_]*)\s+AS\s*\(', text, re.IGNORECASE)}
+    tables = []
+    for match in re.finditer(
+        r'\b(?:FROM|JOIN)\s+"?([A-Za-z_][A-Za-z0-9_]*(?:\.[A-Za-z_][A-Za-z0-9_]*)?)"?',
+        text,
+        re.IGNORECASE
+    ):
+        name = match.group(1).lower()
+        if name not in cte_names and name not in tables:
+            tables.append(name)
+    return tables
@@ -0,0 +1,338 @@
+"""
+Materialized summary tables (rollups) for uploaded datasets.
+Builds pre-aggregated tables over low-cardinality dimension columns and
+rewrites matching aggregate queries to read from them instead of
+rescanning the base table.
+"""
+
+import sqlite3
+import json
+import re
+import logging
+from typing import Dict, List, Optional, Any
+
+from sql_parser import (
+    AGGREGATE_PATTERN,
+    split_clauses,
+    join_clauses,
+    split_top_level,
+    split_alias,
+    parse_single_table,
+    referenced_columns,
+    normalize_expression,
+)
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_META_TABLE = '_summary_tables'
+
+# Columns with at most this many distinct values are treated as dimensions
+MAX_DIMENSION_CARDINALITY = 100
+
+
+def _ensure_meta_table(cursor: sqlite3.Cursor) -> None:
+    cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS {SUMMARY_META_TABLE} (
+            table_name TEXT NOT NULL,
+            dimension TEXT NOT NULL,
+            key_column TEXT NOT NULL,
+            summary_table TEXT NOT NULL,
+            measures TEXT NOT NULL
+        )
+    """)
+
+
+def _is_date_column(cursor: sqlite3.Cursor, table_name: str, column: str) -> bool:
+    cursor.execute(
+        f"SELECT COUNT(*) FROM {table_name} WHERE {column} IS NOT NULL "
+        f"AND {column} NOT GLOB '[0-9][0-9][0-9][0-9]-[0-9][0-9]*'"
+    )
+    if cursor.fetchone()[0] > 0:
+        return False
+    cursor.execute(f"SELECT COUNT({column}) FROM {table_name}")
+    return cursor.fetchone()[0] > 0
+
+
+def detect_dimensions(
+    cursor: sqlite3.Cursor,
+    table_name: str,
+    schema: Dict[str, str]
+) -> List[Dict[str, str]]:
+    """
+    Detect dimension columns suitable for rollups.
+
+    Low-cardinality TEXT columns become plain dimensions and ISO date
+    columns become a monthly dimension.
+
+    Args:
+        cursor: Cursor on the uploaded database
+        table_name: Base table name
+        schema: Dictionary mapping column names to SQLite types
+
+    Returns:
+        List of dicts with 'dimension' (SQL expression) and 'key_column'
+    """
+    dimensions = []
+    for column, col_type in schema.items():
+        if col_type != 'TEXT':
+            continue
+
+        if _is_date_column(cursor, table_name, column):
+            dimensions.append({
+                "dimension": f"strftime('%Y-%m', {column})",
+                "key_column": f"{column}_month"
+            })
+            continue
+
+        cursor.execute(
+            f"SELECT COUNT(*) FROM (SELECT DISTINCT {column} FROM {table_name} "
+            f"LIMIT {MAX_DIMENSION_CARDINALITY + 1})"
+        )
+        if cursor.fetchone()[0] <= MAX_DIMENSION_CARDINALITY:
+            dimensions.append({"dimension": column, "key_column": column})
+
+    return dimensions
+
+
+def drop_summary_tables(cursor: sqlite3.Cursor, table_name: str) -> None:
+    """
+    Drop all summary tables built for a base table.
+
+    Args:
+        cursor: Cursor on the uploaded database
+        table_name: Base table name
+    """
+    _ensure_meta_table(cursor)
+    cursor.execute(
+        f"SELECT summary_table FROM {SUMMARY_META_TABLE} WHERE table_name = ?",
+        (table_name,)
+    )
+    for (summary_table,) in cursor.fetchall():
+        cursor.execute(f"DROP TABLE IF EXISTS {summary_table}")
+    cursor.execute(f"DELETE FROM {SUMMARY_META_TABLE} WHERE table_name = ?", (table_name,))
+
+
+def build_summary_tables(
+    conn: sqlite3.Connection,
+    table_name: str,
+    schema: Dict[str, str]
+) -> List[Dict[str, Any]]:
+    """
+    Build one rollup table per detected dimension of a base table.
+
+    Each rollup stores row_count plus sum/count/min/max of every numeric
+    measure, grouped by the dimension.
+
+    Args:
+        conn: Connection to the uploaded database
+        table_name: Base table name
+        schema: Dictionary mapping column names to SQLite types
+
+    Returns:
+        List of summary table info dictionaries
+    """
+    cursor = conn.cursor()
+    drop_summary_tables(cursor, table_name)
+
+    measures = [col for col, col_type in schema.items() if col_type in ('INTEGER', 'REAL')]
+    dimensions = detect_dimensions(cursor, table_name, schema)
+
+    built = []
+    for dim in dimensions:
+        summary_table = f"_summary_{table_name}_{dim['key_column']}"
+        aggregates = ["COUNT(*) AS row_count"]
+        for measure in measures:
+            aggregates.extend([
+                f"SUM({measure}) AS sum_{measure}",
+                f"COUNT({measure}) AS count_{measure}",
+                f"MIN({measure}) AS min_{measure}",
+                f"MAX({measure}) AS max_{measure}",
+            ])
+
+        cursor.execute(f"DROP TABLE IF EXISTS {summary_table}")
+        cursor.execute(
+            f"CREATE TABLE {summary_table} AS "
+            f"SELECT {dim['dimension']} AS {dim['key_column']}, {', '.join(aggregates)} "
+            f"FROM {table_name} GROUP BY {dim['dimension']}"
+        )
+        cursor.execute(
+            f"INSERT INTO {SUMMARY_META_TABLE} VALUES (?, ?, ?, ?, ?)",
+            (table_name, dim['dimension'], dim['key_column'], summary_table, json.dumps(measures))
+        )
+        cursor.execute(f"SELECT COUNT(*) FROM {summary_table}")
+        built.append({
+            "summary_table": summary_table,
+            "dimension": dim['dimension'],
+            "row_count": cursor.fetchone()[0]
+        })
+
+    logger.info(f"✅ Built {len(built)} summary tables for {table_name}")
+    return built
+
+
+def get_summary_tables(cursor: sqlite3.Cursor, table_name: str) -> List[Dict[str, Any]]:
+    """
+    List summary tables registered for a base table.
+
+    Args:
+        cursor: Cursor on the uploaded database
+        table_name: Base table name
+
+    Returns:
+        List of summary table info dictionaries
+    """
+    cursor.execute(
+        "SELECT name FROM sqlite_master WHERE type='table' AND name = ?",
+        (SUMMARY_META_TABLE,)
+    )
+    if cursor.fetchone() is None:
+        return []
+
+    cursor.execute(
+        f"SELECT dimension, key_column, summary_table, measures FROM {SUMMARY_META_TABLE} "
+        f"WHERE table_name = ?",
+        (table_name,)
+    )
+    return [
+        {
+            "dimension": dimension,
+            "key_column": key_column,
+            "summary_table": summary_table,
+            "measures": json.loads(measures)
+        }
+        for dimension, key_column, summary_table, measures in cursor.fetchall()
+    ]
+
+
+def _rewrite_aggregates(expr: str, measures: List[str]) -> Optional[str]:
+    """Replace aggregates over the base table with aggregates over a rollup."""
+    unsupported = False
+
+    def replace(match: re.Match) -> str:
+        nonlocal unsupported
+        func, distinct, arg = match.group(1).upper(), match.group(2), match.group(3).lower()
+        if distinct:
+            unsupported = True
+            return match.group()
+        if arg == '*':
+            if func != 'COUNT':
+                unsupported = True
+                return match.group()
+            return "COALESCE(SUM(row_count), 0)"
+        if arg not in measures:
+            unsupported = True
+            return match.group()
+        if func == 'COUNT':
+            return f"COALESCE(SUM(count_{arg}), 0)"
+        if func == 'SUM':
+            return f"SUM(sum_{arg})"
+        if func == 'AVG':
+            return f"(SUM(sum_{arg}) * 1.0 / SUM(count_{arg}))"
+        return f"{func}({func.lower()}_{arg})"
+
+    rewritten = AGGREGATE_PATTERN.sub(replace, expr)
+    return None if unsupported else rewritten
+
+
+def _rewrite_for_summary(
+    clauses: Dict[str, str],
+    summary: Dict[str, Any],
+    base_columns: List[str]
+) -> Optional[str]:
+    """Try to answer a parsed query from a single rollup table."""
+    dimension = normalize_expression(summary['dimension'])
+    key_column = summary['key_column']
+    measures = summary['measures']
+    is_plain_dimension = dimension == key_column.lower()
+
+    def substitute_dimension(expr: str) -> str:
+        if is_plain_dimension:
+            return expr
+        # Month dimensions are matched on the normalized expression text
+        pattern = re.escape(summary['dimension']).replace(r'\ ', r'\s*').replace(',', r',\s*')
+        return re.sub(pattern, key_column, expr, flags=re.IGNORECASE)
+
+    def uses_only_dimension(expr: str) -> bool:
+        return referenced_columns(expr) & set(base_columns) <= {key_column.lower()}
+
+    # GROUP BY must be exactly the dimension (or absent for grand totals)
+    group_by = clauses.get('group by')
+    if group_by:
+        if normalize_expression(group_by) not in (dimension, key_column.lower()):
+            return None
+    elif not AGGREGATE_PATTERN.search(clauses['select']):
+        # Without aggregation every base row would be returned
+        return None
+
+    # WHERE is only answerable when it filters on a plain dimension
+    where = clauses.get('where')
+    if where and not (is_plain_dimension and uses_only_dimension(where)):
+        return None
+
+    select_items = []
+    for item in split_top_level(clauses['select']):
+        expr, alias = split_alias(item)
+        if expr == '*':
+            return None
+        rewritten = _rewrite_aggregates(substitute_dimension(expr), measures)
+        if rewritten is None or not uses_only_dimension(rewritten):
+            return None
+        if rewritten != expr and alias is None:
+            # Preserve the column name the original query would produce
+            alias = expr
+        select_items.append(f'{rewritten} AS "{alias}"' if alias else rewritten)
+
+    new_clauses = {
+        'select': ', '.join(select_items),
+        'from': summary['summary_table'],
+        'where': where,
+        'limit': clauses.get('limit'),
+    }
+    if group_by:
+        new_clauses['group by'] = key_column
+
+    for clause in ('having', 'order by'):
+        if clauses.get(clause):
+            rewritten = _rewrite_aggregates(substitute_dimension(clauses[clause]), measures)
+            if rewritten is None or not uses_only_dimension(rewritten):
+                return None
+            new_clauses[clause] = rewritten
+
+    return join_clauses(new_clauses)
+
+
+def rewrite_with_summaries(
+    conn: sqlite3.Connection,
+    sql: str,
+    table_name: str
+) -> str:
+    """
+    Rewrite an aggregate query to read from a matching rollup table.
+
+    Args:
+        conn: Connection to the uploaded database
+        sql: Validated SELECT query
+        table_name: Active uploaded table
+
+    Returns:
+        Rewritten SQL, or the original SQL when no rollup matches
+    """
+    clauses = split_clauses(sql)
+    if clauses is None or parse_single_table(clauses['from']) != table_name.lower():
+        return sql
+
+    cursor = conn.cursor()
+    summaries = get_summary_tables(cursor, table_name)
+    if not summaries:
+        return sql
+
+    cursor.execute(f"PRAGMA table_info({table_name})")
+    base_columns = [col[1].lower() for col in cursor.fetchall()]
+
+    for summary in summaries:
+        rewritten = _rewrite_for_summary(clauses, summary, base_columns)
+        if rewritten:
+            logger.info(f"⚡ Answered from summary table {summary['summary_table']}")
+            return rewritten
+
+    return sql
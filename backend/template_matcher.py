@@ -0,0 +1,397 @@
+"""
+Deterministic fast path for common question shapes.
+Recognizes counts, top-N, group-by counts/aggregates, single aggregates
+and filtered listings against the table and column names of the active
+schema (plus common values from column statistics), and builds the SQL
+directly. Questions with any word the matcher cannot account for are
+left to the LLM.
+"""
+
+import re
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from attached_databases import quote_table_name
+from column_stats import MAX_VALUE_LENGTH, MAX_HINT_CARDINALITY
+
+# Fraction of the question's words that must be explained by the template;
+# a single unexplained word (a negation, a second condition) can change the meaning
+MIN_CONFIDENCE = 1.0
+
+# Rows returned for "top"/"cheapest" questions that do not give a number
+DEFAULT_TOP_N = 10
+
+NUMERIC_TYPES = ('INT', 'REAL', 'FLOA', 'DOUB', 'NUM', 'DEC')
+
+COUNT_WORDS = {'count', 'many', 'number'}
+GROUP_WORDS = {'by', 'per', 'each', 'every'}
+TOP_WORDS = {'top', 'highest', 'most', 'largest', 'biggest', 'greatest'}
+BOTTOM_WORDS = {'bottom', 'lowest', 'least', 'smallest', 'fewest'}
+AGGREGATE_WORDS = {
+    'average': 'AVG', 'avg': 'AVG', 'mean': 'AVG',
+    'total': 'SUM', 'sum': 'SUM',
+    'maximum': 'MAX', 'max': 'MAX',
+    'minimum': 'MIN', 'min': 'MIN',
+}
+# Adjectives that imply both an ordering and the column to order by
+IMPLIED_ORDER_WORDS = {
+    'expensive': ('price', 'DESC'),
+    'priciest': ('price', 'DESC'),
+    'cheapest': ('price', 'ASC'),
+    'cheap': ('price', 'ASC'),
+    'newest': ('created_at', 'DESC'),
+    'latest': ('created_at', 'DESC'),
+    'recent': ('created_at', 'DESC'),
+    'oldest': ('created_at', 'ASC'),
+}
+FILLER_WORDS = {
+    'a', 'an', 'the', 'of', 'in', 'on', 'for', 'to', 'with', 'me', 'show', 'list',
+    'give', 'what', 'which', 'is', 'are', 'all', 'get', 'find', 'display', 'please',
+    'from', 'that', 'whose', 'where', 'have', 'has', 'there', 'do', 'does', 'we', 'i',
+    'how', 'tell', 'records', 'rows', 'entries', 'and', 'their', 'them', 'it', 'its',
+}
+# Words after which a number is a row limit ("top 5", "show 10")
+LIMIT_PREFIX_WORDS = TOP_WORDS | BOTTOM_WORDS | {'show', 'list', 'give', 'get', 'find', 'display', 'first'}
+# Words after which a column name starts a condition ("products with stock")
+CONDITION_WORDS = {'with', 'having', 'whose'}
+ARTICLE_WORDS = {'a', 'an', 'the'}
+# Column values this short, or spelled like a word the matcher already reads
+# ("a" for grade A), are only filters right after their column name ("grade a")
+MIN_BARE_VALUE_LENGTH = 3
+RESERVED_WORDS = (FILLER_WORDS | COUNT_WORDS | GROUP_WORDS | TOP_WORDS | BOTTOM_WORDS
+                  | set(AGGREGATE_WORDS) | set(IMPLIED_ORDER_WORDS))
+
+
+class TemplateMatcher:
+    """Matches questions against a schema catalog and builds SQL for known shapes."""
+
+    def __init__(
+        self,
+        schema: Dict[str, List[Dict[str, Any]]],
+        column_stats: Optional[Dict[str, Dict[str, Dict[str, Any]]]] = None
+    ):
+        """
+        Args:
+            schema: Table name to column dicts (name, type), as from get_table_schema
+            column_stats: Table name to get_column_stats results; common string
+                values become recognizable filter values
+        """
+        self.schema = schema
+        self._table_terms = {}
+        self._columns = {}
+        self._values: List[Tuple[re.Pattern, str, str, str]] = []
+        for table_name, columns in schema.items():
+            base = table_name.split('.')[-1].lower()
+            self._table_terms[table_name] = {base, _singular(base)}
+            self._columns[table_name] = {
+                col["name"].lower(): col for col in columns
+            }
+            for column, stats in ((column_stats or {}).get(table_name) or {}).items():
+                # Categories, not unique keys (small tables keep every value)
+                categorical = stats["distinct_count"] <= MAX_HINT_CARDINALITY
+                for item in stats.get("top_values", []):
+                    value = item["value"]
+                    if (isinstance(value, str) and (item["count"] > 1 or categorical)
+                            and value.strip() and len(value) <= MAX_VALUE_LENGTH and not value.isdigit()):
+                        escaped = re.escape(value.lower())
+                        if len(value.strip()) < MIN_BARE_VALUE_LENGTH or value.lower() in RESERVED_WORDS:
+                            escaped = re.escape(column.lower()) + r'\s+' + escaped
+                        pattern = re.compile(r'\b' + escaped + r'\b')
+                        self._values.append((pattern, table_name, column, value))
+        # Longest values first so "New York City" wins over "York"
+        self._values.sort(key=lambda entry: -len(entry[3]))
+
+    def match(self, question: str) -> Optional[Dict[str, Any]]:
+        """
+        Build SQL for a question if it has a known shape.
+
+        Args:
+            question: Natural language question
+
+        Returns:
+            Dictionary with 'sql', 'explanation', 'template' and 'confidence',
+            or None when the question needs the LLM
+        """
+        text = question.lower()
+
+        # Filter values are matched on the raw text, since they may span several words
+        filters = []
+        for pattern, table_name, column, value in self._values:
+            if pattern.search(text):
+                filters.append((table_name, column, value))
+                text = pattern.sub(' ', text)
+
+        words = re.findall(r'[a-z0-9_]+', text)
+        if not words and not filters:
+            return None
+
+        limit = None
+        tables, columns = [], []
+        intent_words = []
+        unexplained = 0
+        # "total price" may mean the total_price column or SUM(price)
+        ambiguous_total = False
+        i = 0
+        while i < len(words):
+            word = words[i]
+            # Two-word column names (total price -> total_price) take precedence
+            pair = f"{word}_{words[i + 1]}" if i + 1 < len(words) else None
+            pair_column = pair and self._find_column(pair)
+            if pair_column:
+                columns.append((i, pair_column))
+                ambiguous_total = ambiguous_total or word in AGGREGATE_WORDS
+                i += 2
+                continue
+
+            singular = _singular(word)
+            table = self._find_table(word)
+            column = self._find_column(word) or self._find_column(singular)
+            if word.isdigit():
+                # A number is a row limit only in "top 5 ..." / "5 most ..." / "show 5 products"
+                following = words[i + 1] if i + 1 < len(words) else ''
+                if limit is None and (
+                    (i > 0 and words[i - 1] in LIMIT_PREFIX_WORDS)
+                    or self._find_table(following)
+                    or following in TOP_WORDS | BOTTOM_WORDS | set(IMPLIED_ORDER_WORDS)
+                ):
+                    limit = int(word)
+                else:
+                    unexplained += 1
+            elif table:
+                tables.append(table)
+            elif column:
+                columns.append((i, column))
+            elif (word in COUNT_WORDS or word in GROUP_WORDS or word in TOP_WORDS or word in BOTTOM_WORDS
+                  or word in AGGREGATE_WORDS or word in IMPLIED_ORDER_WORDS):
+                intent_words.append((i, word))
+            elif word not in FILLER_WORDS:
+                unexplained += 1
+            i += 1
+
+        total = len(words) + len(filters)
+        confidence = (total - unexplained) / total
+        if confidence < MIN_CONFIDENCE:
+            return None
+
+        table_name = self._resolve_table(tables, columns, filters)
+        if table_name is None:
+            return None
+        table_columns = self._columns[table_name]
+        source = quote_table_name(table_name)
+
+        # Every column and filter must belong to the chosen table (otherwise it needs a join)
+        if any(column not in table_columns for _, column in columns):
+            return None
+        if any(filter_table != table_name for filter_table, _, _ in filters):
+            return None
+        # "status" in "orders with status pending" is part of the filter
+        filter_columns = {column for _, column, _ in filters}
+        columns = [(position, column) for position, column in columns if column not in filter_columns]
+        # Any other column after "with"/"whose" names a condition without its value
+        for position, _ in columns:
+            previous = [word for word in words[:position] if word not in ARTICLE_WORDS]
+            if previous and previous[-1] in CONDITION_WORDS:
+                return None
+
+        where = ""
+        if filters:
+            where = " WHERE " + " AND ".join(
+                f"{column} = '{value.replace(chr(39), chr(39) * 2)}'" for _, column, value in filters
+            )
+
+        words_only = [word for _, word in intent_words]
+        if ambiguous_total and not any(word in AGGREGATE_WORDS for word in words_only):
+            return None
+        top = any(word in TOP_WORDS for word in words_only)
+        bottom = any(word in BOTTOM_WORDS for word in words_only)
+        ranked = top or bottom
+        # "cheapest", "newest": only the top-N template can honor these
+        implied_order = any(word in IMPLIED_ORDER_WORDS for word in words_only)
+        group_column = self._group_column(intent_words, columns)
+        if group_column and ranked and self._is_numeric(table_name, group_column):
+            # "top 5 products by price" orders by the column rather than grouping
+            group_column = None
+        aggregate = next((AGGREGATE_WORDS[word] for word in words_only if word in AGGREGATE_WORDS), None)
+        measures = [column for _, column in columns if column != group_column]
+
+        if group_column:
+            # "most expensive product in each category" is a per-group top-N, not a count
+            if implied_order or (top and bottom):
+                return None
+            if aggregate and len(measures) == 1 and self._is_numeric(table_name, measures[0]):
+                alias = f"{aggregate.lower()}_{measures[0]}"
+                select = f"{aggregate}({measures[0]}) AS {alias}"
+                template = "group_aggregate"
+            elif not measures and not aggregate:
+                alias = "count"
+                select = "COUNT(*) AS count"
+                template = "group_count"
+            else:
+                return None
+            sql = (f"SELECT {group_column}, {select} FROM {source}{where} "
+                   f"GROUP BY {group_column} ORDER BY {alias} {'ASC' if bottom else 'DESC'}")
+            if limit:
+                sql += f" LIMIT {limit}"
+            explanation = f"{select.split(' AS ')[0]} of {table_name} for each {group_column}"
+        elif any(word in COUNT_WORDS for word in words_only):
+            # "total number of orders" is still a count
+            if measures or limit or ranked or implied_order or aggregate not in (None, 'SUM'):
+                return None
+            sql = f"SELECT COUNT(*) AS count FROM {source}{where}"
+            template = "count"
+            explanation = f"Counts {table_name}" + (" matching the filter" if where else "")
+        elif aggregate and not (ranked or implied_order):
+            if len(measures) != 1 or not self._is_numeric(table_name, measures[0]) or limit:
+                return None
+            sql = f"SELECT {aggregate}({measures[0]}) AS {aggregate.lower()}_{measures[0]} FROM {source}{where}"
+            template = "aggregate"
+            explanation = f"{aggregate} of {measures[0]} over {table_name}"
+        else:
+            order = self._order(table_name, words_only, measures)
+            # "total price of the top 5 products" aggregates over the top rows
+            if order is False or (order is not None and aggregate):
+                return None
+            if order is None:
+                if aggregate:
+                    return None
+                sql = f"SELECT {', '.join(measures) or '*'} FROM {source}{where}"
+                if limit:
+                    sql += f" LIMIT {limit}"
+                template = "list"
+                explanation = f"Lists {table_name}" + (" matching the filter" if where else "")
+            else:
+                order_column, direction = order
+                sql = (f"SELECT * FROM {source}{where} ORDER BY {order_column} {direction} "
+                       f"LIMIT {limit or DEFAULT_TOP_N}")
+                template = "top_n"
+                explanation = f"{table_name} with the {'highest' if direction == 'DESC' else 'lowest'} {order_column}"
+
+        return {
+            "sql": sql,
+            "explanation": explanation,
+            "template": template,
+            "confidence": round(confidence, 3)
+        }
+
+    def _find_table(self, word: str) -> Optional[str]:
+        for table_name, terms in self._table_terms.items():
+            if word in terms or _singular(word) in terms:
+                return table_name
+        return None
+
+    def _find_column(self, word: str) -> Optional[str]:
+        for columns in self._columns.values():
+            if word in columns:
+                return word
+        return None
+
+    def _resolve_table(self, tables, columns, filters) -> Optional[str]:
+        candidates = set(tables) | {table_name for table_name, _, _ in filters}
+        if len(candidates) == 1:
+            return candidates.pop()
+        if candidates:
+            return None
+        # No table named: accept it only if the columns identify exactly one table
+        owners = [
+            table_name for table_name, table_columns in self._columns.items()
+            if columns and all(column in table_columns for _, column in columns)
+        ]
+        return owners[0] if len(owners) == 1 else None
+
+    def _group_column(self, intent_words, columns) -> Optional[str]:
+        # "by status", "per city": the column right after the grouping word
+        for position, word in intent_words:
+            if word in GROUP_WORDS:
+                for column_position, column in columns:
+                    if column_position == position + 1:
+                        return column
+        return None
+
+    def _is_numeric(self, table_name: str, column: str) -> bool:
+        column_type = (self._columns[table_name][column]["type"] or "").upper()
+        return any(numeric in column_type for numeric in NUMERIC_TYPES)
+
+    def _order(self, table_name: str, words: List[str], measures: List[str]):
+        """(column, direction) for top-N questions, None for none, False if ambiguous."""
+        implied = {IMPLIED_ORDER_WORDS[word] for word in words if word in IMPLIED_ORDER_WORDS}
+        top = any(word in TOP_WORDS for word in words)
+        bottom = any(word in BOTTOM_WORDS for word in words)
+        if implied:
+            if len(implied) > 1 or top and bottom:
+                return False
+            column, direction = implied.pop()
+            if column not in self._columns[table_name] or measures:
+                return False
+            # "least expensive" reverses "expensive"
+            if bottom:
+                direction = 'ASC' if direction == 'DESC' else 'DESC'
+            return column, direction
+
+        if not (top or bottom):
+            return None
+        if top and bottom or len(measures) != 1 or not self._is_numeric(table_name, measures[0]):
+            return False
+        return measures[0], 'DESC' if top else 'ASC'
+
+
+def _singular(word: str) -> str:
+    if len(word) > 4 and word.endswith('ies'):
+        return word[:-3] + 'y'
+    if len(word) > 3 and word.endswith('s') and not word.endswith('ss'):
+        return word[:-1]
+    return word
+
+
+class FastPathStats:
+    """Hit rate and estimated latency saved by the template fast path."""
+
+    def __init__(self):
+        self.lookups = 0
+        self.hits = 0
+        self.match_us_total = 0.0
+        self.latency_saved_ms = 0.0
+        self.templates: Dict[str, int] = {}
+
+    def record(self, elapsed_us: float, template: Optional[str], llm_latency_ms: float) -> None:
+        """
+        Record one lookup.
+
+        Args:
+            elapsed_us: Time spent matching
+            template: Matched template, or None on a miss
+            llm_latency_ms: Average LLM generation latency a hit avoids
+        """
+        self.lookups += 1
+        self.match_us_total += elapsed_us
+        if template is not None:
+            self.hits += 1
+            self.templates[template] = self.templates.get(template, 0) + 1
+            self.latency_saved_ms += max(llm_latency_ms - elapsed_us / 1000, 0.0)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Report fast path counters.
+
+        Returns:
+            Dictionary of counters
+        """
+        return {
+            "lookups": self.lookups,
+            "hits": self.hits,
+            "hit_rate": round(self.hits / self.lookups, 3) if self.lookups else 0.0,
+            "avg_match_us": round(self.match_us_total / self.lookups, 1) if self.lookups else 0.0,
+            "latency_saved_ms": round(self.latency_saved_ms, 1),
+            "templates": dict(self.templates)
+        }
+
+
+def timed_match(matcher: TemplateMatcher, question: str) -> Tuple[Optional[Dict[str, Any]], float]:
+    """
+    Match a question and measure how long it took.
+
+    Returns:
+        Tuple of (match result or None, elapsed microseconds)
+    """
+    start = time.perf_counter()
+    result = matcher.match(question)
+    return result, (time.perf_counter() - start) * 1_000_000
@@ -0,0 +1,514 @@
+"""
+Time-partitioned storage for date-heavy uploads.
+Detected datetime columns are stored as integer epoch seconds (with an
+index) in child tables, one per month for very large uploads, and the
+table name becomes a view rendering them back as the original text.
+Queries with date-range predicates are rewritten to read only the
+overlapping partitions and to use the epoch indexes.
+"""
+
+import calendar
+import re
+import sqlite3
+import logging
+from datetime import datetime
+from typing import Dict, List, Optional, Any, Tuple
+
+import pandas as pd
+
+from sql_parser import (
+    split_clauses,
+    join_clauses,
+    split_top_level,
+    parse_single_table,
+    referenced_columns,
+    strip_string_literals,
+)
+
+logger = logging.getLogger(__name__)
+
+PARTITION_META_TABLE = '_time_partitions'
+COLUMN_META_TABLE = '_time_columns'
+
+# Uploads with at least this many rows are split into per-month partitions
+PARTITION_MIN_ROWS = 1000000
+
+# Compound SELECTs are limited to 500 terms in SQLite; keep the view well below that
+MAX_PARTITIONS = 400
+
+# Text layouts that round-trip exactly through epoch seconds
+DATETIME_FORMATS = {
+    '%Y-%m-%d': 10,
+    '%Y-%m-%d %H:%M:%S': 19,
+}
+
+# Values checked before parsing a whole column
+DETECTION_SAMPLE_ROWS = 1000
+
+# Comparison operators that bound a range, mirrored for "literal op column"
+RANGE_OPERATORS = {'>=': '<=', '>': '<', '<=': '>=', '<': '>', '=': '='}
+
+LITERAL = r"'([^']*)'"
+
+# Literals naming a whole year, month or day
+PERIOD_PATTERN = re.compile(r'\d{4}(?:-\d{2}(?:-\d{2})?)?')
+
+
+def partition_table(table_name: str, suffix: str) -> str:
+    """Name of a partition of a table (suffix is YYYYMM, 'all' or 'null')."""
+    return f"_tp_{table_name}_{suffix}"
+
+
+def _ensure_meta_tables(cursor: sqlite3.Cursor) -> None:
+    cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS {PARTITION_META_TABLE} (
+            table_name TEXT NOT NULL,
+            partition_table TEXT NOT NULL,
+            range_start INTEGER,
+            range_end INTEGER,
+            row_count INTEGER NOT NULL,
+            PRIMARY KEY (table_name, partition_table)
+        )
+    """)
+    cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS {COLUMN_META_TABLE} (
+            table_name TEXT NOT NULL,
+            column_name TEXT NOT NULL,
+            format TEXT NOT NULL,
+            is_partition_key INTEGER NOT NULL,
+            PRIMARY KEY (table_name, column_name)
+        )
+    """)
+
+
+def detect_datetime_columns(df: pd.DataFrame) -> Dict[str, str]:
+    """
+    Find text columns holding dates or timestamps in a canonical layout.
+
+    Only columns whose every value is 'YYYY-MM-DD' or 'YYYY-MM-DD HH:MM:SS'
+    qualify, so rendering the stored epoch seconds gives back the same text.
+
+    Args:
+        df: Cleaned DataFrame
+
+    Returns:
+        Column name to strftime format
+    """
+    columns = {}
+    for col in df.columns:
+        series = df[col]
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            values = pd.Series(series.cat.categories)
+        elif pd.api.types.is_object_dtype(series) or pd.api.types.is_string_dtype(series):
+            values = series.dropna()
+        else:
+            continue
+        if values.empty or not all(isinstance(value, str) for value in values.head(DETECTION_SAMPLE_ROWS)):
+            continue
+
+        for fmt, length in DATETIME_FORMATS.items():
+            sample = values.head(DETECTION_SAMPLE_ROWS)
+            if not (sample.str.len() == length).all():
+                continue
+            try:
+                parsed = pd.to_datetime(values, format=fmt, errors='coerce')
+            except (ValueError, OverflowError):
+                break
+            if parsed.notna().all() and (values.str.len() == length).all():
+                columns[col] = fmt
+            break
+    return columns
+
+
+def _epoch_seconds(series: pd.Series, fmt: str) -> pd.Series:
+    parsed = pd.to_datetime(series.astype(object), format=fmt)
+    seconds = pd.Series(parsed.to_numpy(dtype='datetime64[s]').astype('int64'), index=series.index, dtype='Int64')
+    return seconds.mask(parsed.isna())
+
+
+def _month_bounds(month: int) -> Tuple[int, int]:
+    year, month = divmod(month, 100)
+    start = calendar.timegm((year, month, 1, 0, 0, 0))
+    end = calendar.timegm((year + month // 12, month % 12 + 1, 1, 0, 0, 0))
+    return start, end
+
+
+def _view_select(columns: List[str], formats: Dict[str, str], source: str, where: str = "") -> str:
+    select_list = ", ".join(
+        f"strftime('{formats[col]}', {col}, 'unixepoch') AS {col}" if col in formats else col
+        for col in columns
+    )
+    return f"SELECT {select_list} FROM {source}{where}"
+
+
+def drop_time_partitions(cursor: sqlite3.Cursor, table_name: str) -> None:
+    """
+    Drop the view and partitions of a time-partitioned table.
+
+    Args:
+        cursor: Cursor on the uploaded database
+        table_name: Table (view) name
+    """
+    _ensure_meta_tables(cursor)
+    cursor.execute(f"SELECT partition_table FROM {PARTITION_META_TABLE} WHERE table_name = ?", (table_name,))
+    partitions = [row[0] for row in cursor.fetchall()]
+    if partitions:
+        cursor.execute(f"DROP VIEW IF EXISTS {table_name}")
+    for name in partitions:
+        cursor.execute(f"DROP TABLE IF EXISTS {name}")
+    cursor.execute(f"DELETE FROM {PARTITION_META_TABLE} WHERE table_name = ?", (table_name,))
+    cursor.execute(f"DELETE FROM {COLUMN_META_TABLE} WHERE table_name = ?", (table_name,))
+
+
+def build_time_partitions(
+    conn: sqlite3.Connection,
+    df: pd.DataFrame,
+    table_name: str,
+    schema: Dict[str, str],
+    datetime_columns: Dict[str, str]
+) -> List[Dict[str, Any]]:
+    """
+    Store a DataFrame as epoch-encoded partitions behind a view named table_name.
+
+    The first datetime column is the partition key. Uploads of at least
+    PARTITION_MIN_ROWS rows get one child table per month (plus one for
+    missing dates); smaller ones get a single child table.
+
+    Args:
+        conn: Connection to the uploaded database
+        df: Cleaned DataFrame
+        table_name: Name of the view to create
+        schema: Column name to SQLite type (datetime columns are TEXT)
+        datetime_columns: Result of detect_datetime_columns
+
+    Returns:
+        List of partition dicts with 'partition_table', 'range_start',
+        'range_end' and 'row_count'
+    """
+    cursor = conn.cursor()
+    _ensure_meta_tables(cursor)
+    drop_time_partitions(cursor, table_name)
+
+    key_column = next(col for col in df.columns if col in datetime_columns)
+    data = df.copy(deep=False)
+    for col, fmt in datetime_columns.items():
+        data[col] = _epoch_seconds(df[col], fmt)
+
+    keys = pd.to_datetime(data[key_column], unit='s')
+    months = (keys.dt.year * 100 + keys.dt.month).astype('Int64')
+    if len(data) >= PARTITION_MIN_ROWS and months.nunique() <= MAX_PARTITIONS:
+        groups = [(str(month), part) for month, part in data.groupby(months, sort=True)]
+        if months.isna().any():
+            groups.append(('null', data[months.isna()]))
+    else:
+        groups = [('all', data)]
+
+    column_defs = ", ".join(
+        f"{col} {'INTEGER' if col in datetime_columns else col_type}" for col, col_type in schema.items()
+    )
+    partitions = []
+    for suffix, part in groups:
+        name = partition_table(table_name, suffix)
+        cursor.execute(f"CREATE TABLE {name} ({column_defs})")
+        part.to_sql(name, conn, if_exists='append', index=False)
+        # Companion indexes let range predicates on the epoch values seek instead of scan
+        for col in datetime_columns:
+            cursor.execute(f"CREATE INDEX {name}_{col}_idx ON {name}({col})")
+        range_start, range_end = _month_bounds(int(suffix)) if suffix.isdigit() else (None, None)
+        partitions.append({
+            "partition_table": name,
+            "range_start": range_start,
+            "range_end": range_end,
+            "row_count": len(part)
+        })
+
+    cursor.executemany(
+        f"INSERT INTO {PARTITION_META_TABLE} (table_name, partition_table, range_start, range_end, row_count) "
+        f"VALUES (?, ?, ?, ?, ?)",
+        [(table_name, p["partition_table"], p["range_start"], p["range_end"], p["row_count"]) for p in partitions]
+    )
+    cursor.executemany(
+        f"INSERT INTO {COLUMN_META_TABLE} (table_name, column_name, format, is_partition_key) VALUES (?, ?, ?, ?)",
+        [(table_name, col, fmt, int(col == key_column)) for col, fmt in datetime_columns.items()]
+    )
+
+    columns = list(schema)
+    cursor.execute(
+        f"CREATE VIEW {table_name} AS "
+        + " UNION ALL ".join(_view_select(columns, datetime_columns, p["partition_table"]) for p in partitions)
+    )
+    logger.info(
+        f"✅ Stored {table_name} in {len(partitions)} partitions by {key_column} "
+        f"with epoch-encoded {', '.join(datetime_columns)}"
+    )
+    return partitions
+
+
+def get_time_partitions(cursor: sqlite3.Cursor, table_name: str) -> Optional[Dict[str, Any]]:
+    """
+    Get the partition layout of a table.
+
+    Args:
+        cursor: Cursor on the uploaded database
+        table_name: Table (view) name
+
+    Returns:
+        Dictionary with 'key_column', 'formats' and 'partitions', or None
+        if the table is not time-partitioned
+    """
+    try:
+        cursor.execute(
+            f"SELECT column_name, format, is_partition_key FROM {COLUMN_META_TABLE} WHERE table_name = ?",
+            (table_name,)
+        )
+        columns = cursor.fetchall()
+        if not columns:
+            return None
+        cursor.execute(
+            f"SELECT partition_table, range_start, range_end, row_count FROM {PARTITION_META_TABLE} "
+            f"WHERE table_name = ? ORDER BY range_start",
+            (table_name,)
+        )
+        partitions = [
+            {"partition_table": row[0], "range_start": row[1], "range_end": row[2], "row_count": row[3]}
+            for row in cursor.fetchall()
+        ]
+    except sqlite3.OperationalError:
+        return None
+    return {
+        "key_column": next(name for name, _, is_key in columns if is_key),
+        "formats": {name: fmt for name, fmt, _ in columns},
+        "partitions": partitions
+    }
+
+
+def _period_bounds(prefix: str) -> Tuple[int, int]:
+    """
+    Epoch range [start, end) of the year, month or day a literal starts with.
+
+    Raises:
+        ValueError: If the literal names no real period ('2023-13', '2023-02-30')
+    """
+    parts = [int(part) for part in prefix.split('-')]
+    # Rejects month 13 or February 30, which timegm would silently roll over
+    datetime(*parts, *[1] * (3 - len(parts)))
+    if len(parts) == 1:
+        return calendar.timegm((parts[0], 1, 1, 0, 0, 0)), calendar.timegm((parts[0] + 1, 1, 1, 0, 0, 0))
+    if len(parts) == 2:
+        return _month_bounds(parts[0] * 100 + parts[1])
+    start = calendar.timegm((parts[0], parts[1], parts[2], 0, 0, 0))
+    return start, start + 86400
+
+
+def _comparison_bounds(operator: str, literal: str, fmt: str) -> Optional[Tuple[Optional[int], Optional[int], bool]]:
+    """
+    Epoch range [low, high) of the values whose text satisfies `column op literal`.
+
+    Rendered values sort in time order, so a whole period ('2024', '2024-03',
+    '2024-03-01') or a complete value in the column's layout gives exact
+    bounds; any other literal is bounded by the period it starts with, and
+    the text predicate must then be kept.
+
+    Returns:
+        Tuple of (low, high, exact), or None if the literal is not a date
+    """
+    if len(literal) == DATETIME_FORMATS[fmt]:
+        try:
+            value = calendar.timegm(datetime.strptime(literal, fmt).timetuple())
+        except ValueError:
+            return None
+        return {
+            '>=': (value, None), '>': (value + 1, None),
+            '<': (None, value), '<=': (None, value + 1),
+            '=': (value, value + 1),
+        }[operator] + (True,)
+
+    if PERIOD_PATTERN.fullmatch(literal) and len(literal) < DATETIME_FORMATS[fmt]:
+        # Every value in the period is longer than the literal, so sorts after it
+        try:
+            start, _ = _period_bounds(literal)
+        except ValueError:
+            return None
+        return {
+            '>=': (start, None), '>': (start, None),
+            '<': (None, start), '<=': (None, start),
+            '=': (start, start),
+        }[operator] + (True,)
+
+    match = PERIOD_PATTERN.match(literal)
+    if not match:
+        return None
+    try:
+        start, end = _period_bounds(match.group())
+    except ValueError:
+        return None
+    return {
+        '>=': (start, None), '>': (start, None),
+        '<': (None, end), '<=': (None, end),
+        '=': (start, end),
+    }[operator] + (False,)
+
+
+def _top_level_conjuncts(where: str) -> Optional[List[str]]:
+    """Split a WHERE clause on top-level AND (keeping BETWEEN ... AND); None if it has a top-level OR."""
+    masked = strip_string_literals(where)
+    parts, depth, start, between = [], 0, 0, False
+    for match in re.finditer(r"\(|\)|\bAND\b|\bOR\b|\bBETWEEN\b", masked, re.IGNORECASE):
+        token = match.group().upper()
+        if token == '(':
+            depth += 1
+        elif token == ')':
+            depth -= 1
+        elif depth:
+            continue
+        elif token == 'OR':
+            return None
+        elif token == 'BETWEEN':
+            between = True
+        elif between:
+            between = False
+        else:
+            parts.append(where[start:match.start()].strip())
+            start = match.end()
+    parts.append(where[start:].strip())
+    return parts
+
+
+def _predicate_bounds(conjunct: str, column: str, fmt: str) -> Optional[Tuple[Optional[int], Optional[int], bool]]:
+    """
+    Epoch range [low, high) implied by one predicate on a datetime column,
+    and whether it is exact; None if the predicate does not constrain it.
+    """
+    col = rf"(?:\w+\.)?{re.escape(column)}"
+    text = conjunct.strip()
+
+    match = re.fullmatch(rf"{col}\s+BETWEEN\s+{LITERAL}\s+AND\s+{LITERAL}", text, re.IGNORECASE)
+    if match:
+        lower = _comparison_bounds('>=', match.group(1), fmt)
+        upper = _comparison_bounds('<=', match.group(2), fmt)
+        if lower is None or upper is None:
+            return None
+        return lower[0], upper[1], lower[2] and upper[2]
+
+    match = re.fullmatch(rf"strftime\(\s*'(%Y|%Y-%m|%Y-%m-%d)'\s*,\s*{col}\s*\)\s*=\s*{LITERAL}", text, re.IGNORECASE)
+    if match:
+        literal = match.group(2)
+        if not PERIOD_PATTERN.fullmatch(literal) or literal.count('-') != match.group(1).count('-'):
+            return None
+        try:
+            return _period_bounds(literal) + (True,)
+        except ValueError:
+            # No such period: leave the predicate to SQLite
+            return None
+
+    match = re.fullmatch(rf"{col}\s*(>=|<=|=|>|<)\s*{LITERAL}", text, re.IGNORECASE)
+    if match:
+        return _comparison_bounds(match.group(1), match.group(2), fmt)
+
+    match = re.fullmatch(rf"{LITERAL}\s*(>=|<=|=|>|<)\s*{col}", text, re.IGNORECASE)
+    if match:
+        return _comparison_bounds(RANGE_OPERATORS[match.group(2)], match.group(1), fmt)
+    return None
+
+
+def _needed_columns(clauses: Dict[str, str], columns: List[str], table_name: str) -> List[str]:
+    """Columns the query reads; SELECT * needs them all."""
+    for item in split_top_level(clauses['select']):
+        if item.strip().lower() in ('*', f"{table_name.lower()}.*"):
+            return columns
+    referenced = set()
+    for keyword, body in clauses.items():
+        if keyword != 'from':
+            referenced |= referenced_columns(body)
+    return [col for col in columns if col.lower() in referenced]
+
+
+def rewrite_with_partitions(conn: sqlite3.Connection, sql: str, table_name: str) -> str:
+    """
+    Rewrite a query on a time-partitioned table to read only the partitions
+    its date predicates can match, using the epoch indexes, and to render
+    only the columns it uses.
+
+    Date predicates with exact epoch bounds are replaced by them; others
+    are kept alongside the pushed-down bounds, so results are unchanged.
+
+    Args:
+        conn: Connection to the uploaded database
+        sql: SQL query
+        table_name: Active uploaded table
+
+    Returns:
+        Rewritten SQL, or the original SQL for shapes it does not handle
+    """
+    clauses = split_clauses(sql)
+    if not clauses or parse_single_table(clauses['from']) != table_name.lower():
+        return sql
+
+    layout = get_time_partitions(conn.cursor(), table_name)
+    if layout is None:
+        return sql
+
+    conjuncts = _top_level_conjuncts(clauses['where']) if clauses.get('where') else []
+    if conjuncts is None:
+        conjuncts = [clauses['where']]
+
+    ranges = {}
+    remaining = []
+    for conjunct in conjuncts:
+        exact = False
+        for column, fmt in layout["formats"].items():
+            bounds = _predicate_bounds(conjunct, column, fmt)
+            if bounds is None:
+                continue
+            low, high = ranges.get(column, (None, None))
+            if bounds[0] is not None:
+                low = bounds[0] if low is None else max(low, bounds[0])
+            if bounds[1] is not None:
+                high = bounds[1] if high is None else min(high, bounds[1])
+            ranges[column] = (low, high)
+            exact = bounds[2]
+            break
+        if not exact:
+            remaining.append(conjunct)
+
+    pushdown = []
+    for column, (low, high) in ranges.items():
+        if low is not None:
+            pushdown.append(f"{column} >= {low}")
+        if high is not None:
+            pushdown.append(f"{column} < {high}")
+    where = " WHERE " + " AND ".join(pushdown) if pushdown else ""
+
+    partitions = layout["partitions"]
+    if layout["key_column"] in ranges:
+        key_low, key_high = ranges[layout["key_column"]]
+        # NULL dates never satisfy a range, and whole-table partitions have no bounds to prune by
+        partitions = [
+            p for p in partitions
+            if p["partition_table"] == partition_table(table_name, 'all') or (
+                p["range_start"] is not None
+                and (key_high is None or p["range_start"] < key_high)
+                and (key_low is None or p["range_end"] > key_low)
+            )
+        ] or partitions[:1]
+
+    if remaining:
+        clauses['where'] = " AND ".join(f"({conjunct})" if len(remaining) > 1 else conjunct for conjunct in remaining)
+    else:
+        clauses.pop('where', None)
+
+    cursor = conn.cursor()
+    cursor.execute(f"PRAGMA table_info({partitions[0]['partition_table']})")
+    columns = _needed_columns(clauses, [col[1] for col in cursor.fetchall()], table_name)
+    if columns:
+        source = " UNION ALL ".join(
+            _view_select(columns, layout["formats"], p["partition_table"], where) for p in partitions
+        )
+    else:
+        # Only rows are counted: no column needs rendering
+        source = " UNION ALL ".join(f"SELECT 1 AS _row FROM {p['partition_table']}{where}" for p in partitions)
+    clauses['from'] = f"({source}) AS {table_name}"
+    logger.info(
+        f"🗂️ Reading {len(partitions)} of {len(layout['partitions'])} partitions of {table_name}"
+    )
+    return join_clauses(clauses)
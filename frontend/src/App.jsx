@@ -11,10 +11,13 @@ import axios from 'axios'
 function App() {
     const [question, setQuestion] = useState('')
     const [sqlQuery, setSqlQuery] = useState('')
+    // The question the current SQL was generated for (the input may have changed since)
+    const [sqlQuestion, setSqlQuestion] = useState('')
     const [explanation, setExplanation] = useState('')
     const [results, setResults] = useState(null)
     const [isGenerating, setIsGenerating] = useState(false)
     const [isExecuting, setIsExecuting] = useState(false)
+    const [isExporting, setIsExporting] = useState(false)
     const [error, setError] = useState(null)
     const [showUpload, setShowUpload] = useState(false)
     const [activeDatabase, setActiveDatabase] = useState('default')
@@ -34,6 +37,7 @@ function App() {
         setIsGenerating(true)
         setError(null)
         setSqlQuery('')
+        setSqlQuestion('')
         setExplanation('')
         setResults(null)
 
@@ -43,6 +47,7 @@ function App() {
             })
 
             setSqlQuery(response.data.sql)
+            setSqlQuestion(userQuestion)
             setExplanation(response.data.explanation)
         } catch (err) {
             setError(err.response?.data?.detail || 'Failed to generate SQL query')
@@ -58,7 +63,8 @@ function App() {
 
         try {
             const response = await axios.post('/api/execute-query', {
-                sql: sql
+                sql: sql,
+                question: sqlQuestion
             })
 
             setResults(response.data)
@@ -66,7 +72,7 @@ function App() {
             // Save to history
             try {
                 await axios.post('/api/history', {
-                    question: question,
+                    question: sqlQuestion,
                     sql: sql
                 })
             } catch (historyErr) {
@@ -80,6 +86,25 @@ function App() {
         }
     }
 
+    const handleExport = async () => {
+        setIsExporting(true)
+        setError(null)
+
+        try {
+            // The full result is written server-side and downloaded from disk
+            const response = await axios.post('/api/export', {
+                sql: sqlQuery,
+                format: 'csv'
+            })
+            window.location.href = response.data.download_url
+        } catch (err) {
+            setError(err.response?.data?.detail || 'Failed to export results')
+            console.error('Error exporting results:', err)
+        } finally {
+            setIsExporting(false)
+        }
+    }
+
     const handleUploadSuccess = (uploadData) => {
         setShowUpload(false)
         setActiveDatabase(uploadData.table_name)
@@ -193,6 +218,8 @@ function App() {
                                     columns={results.columns}
                                     rows={results.rows}
                                     rowCount={results.row_count}
+                                    onExport={handleExport}
+                                    isExporting={isExporting}
                                 />
                             </section>
                         )}
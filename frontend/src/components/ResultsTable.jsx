@@ -1,7 +1,7 @@
 import { motion } from 'framer-motion'
-import { Table, CheckCircle2 } from 'lucide-react'
+import { Table, CheckCircle2, Download } from 'lucide-react'
 
-export default function ResultsTable({ columns, rows, rowCount }) {
+export default function ResultsTable({ columns, rows, rowCount, onExport, isExporting }) {
     return (
         <motion.div
             initial={{ y: 20, opacity: 0 }}
@@ -14,9 +14,21 @@ export default function ResultsTable({ columns, rows, rowCount }) {
                     <Table className="w-5 h-5 text-primary-400" />
                     <h3 className="font-semibold text-dark-100">Query Results</h3>
                 </div>
-                <div className="flex items-center gap-2 text-sm text-dark-400">
-                    <CheckCircle2 className="w-4 h-4 text-green-400" />
-                    <span>{rowCount} {rowCount === 1 ? 'row' : 'rows'}</span>
+                <div className="flex items-center gap-4 text-sm text-dark-400">
+                    <div className="flex items-center gap-2">
+                        <CheckCircle2 className="w-4 h-4 text-green-400" />
+                        <span>{rowCount} {rowCount === 1 ? 'row' : 'rows'}</span>
+                    </div>
+                    {onExport && (
+                        <button
+                            onClick={onExport}
+                            disabled={isExporting}
+                            className="flex items-center gap-1 text-primary-400 hover:text-primary-300 disabled:opacity-50"
+                        >
+                            <Download className="w-4 h-4" />
+                            <span>{isExporting ? 'Exporting...' : 'Export CSV'}</span>
+                        </button>
+                    )}
                 </div>
             </div>
 
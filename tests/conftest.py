@@ -0,0 +1,26 @@
+"""
+Shared fixtures. Backend modules import each other by bare name, so the
+backend directory is put on the path; the uploaded database and attached
+files are redirected to a temporary directory per test.
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent / 'backend'
+sys.path.insert(0, str(BACKEND_DIR))
+
+
+@pytest.fixture
+def upload_db(tmp_path, monkeypatch):
+    """Point db_manager at an empty uploaded database in tmp_path."""
+    import attached_databases
+    import db_manager
+
+    monkeypatch.setattr(db_manager, 'UPLOAD_DB_PATH', tmp_path / 'uploaded_data.db')
+    monkeypatch.setattr(attached_databases, 'ATTACHED_DB_DIR', tmp_path / 'attached_dbs')
+    db_manager.federated_pool.clear()
+    yield db_manager.UPLOAD_DB_PATH
+    db_manager.federated_pool.clear()
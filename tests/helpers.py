@@ -0,0 +1,32 @@
+"""Helpers for differential tests of the query rewriters."""
+
+import math
+import sqlite3
+from typing import Any, List, Sequence
+
+
+def _normalize(value: Any) -> Any:
+    if isinstance(value, float):
+        # Rewrites may add partial sums in a different order
+        return round(value, 6 - int(math.floor(math.log10(abs(value)))) if value else 0)
+    return value
+
+
+def normalize_rows(rows: Sequence[Sequence[Any]], ordered: bool = False) -> List[tuple]:
+    """Round floats and, unless the query orders its rows, sort them."""
+    normalized = [tuple(_normalize(value) for value in row) for row in rows]
+    return normalized if ordered else sorted(normalized, key=repr)
+
+
+def assert_same_results(conn: sqlite3.Connection, original: str, rewritten: str) -> None:
+    """Run both queries and assert they return the same columns and rows."""
+    cursor = conn.execute(original)
+    expected_columns = [d[0] for d in cursor.description]
+    expected = cursor.fetchall()
+    cursor = conn.execute(rewritten)
+    columns = [d[0] for d in cursor.description]
+    actual = cursor.fetchall()
+
+    ordered = 'order by' in original.lower()
+    assert columns == expected_columns, f"{rewritten}\n  columns {columns} != {expected_columns}"
+    assert normalize_rows(actual, ordered) == normalize_rows(expected, ordered), rewritten
@@ -0,0 +1,139 @@
+"""Token buckets, queueing versus rejection, execution slots and client tracking."""
+
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+import admission
+from admission import AdmissionController, RateLimited, TokenBucket
+
+
+class Clock:
+    """Stands in for time.monotonic and asyncio.sleep so waits are exact and instant."""
+
+    def __init__(self):
+        self.now = 1000.0
+        self.slept = []
+
+    def monotonic(self):
+        return self.now
+
+    async def sleep(self, seconds):
+        self.slept.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(admission, 'time', SimpleNamespace(monotonic=clock.monotonic))
+    return clock
+
+
+def test_refill_is_proportional_to_elapsed_time(clock):
+    bucket = TokenBucket(10, 2)
+    assert bucket.take(10) == 0
+    clock.now += 1
+    # 2 tokens back, 4 needed: one more second
+    assert bucket.take(4) == pytest.approx(1.0)
+    clock.now += 1
+    assert bucket.take(4) == 0
+    assert bucket.tokens == pytest.approx(0)
+    clock.now += 100
+    bucket.take(0)
+    assert bucket.tokens == 10
+    assert bucket.is_full()
+
+
+def test_cost_above_capacity_waits_for_a_full_bucket_then_goes_into_debt(clock):
+    bucket = TokenBucket(10, 2)
+    bucket.take(4)
+    # Needs only a full bucket, not 25 tokens
+    assert bucket.take(25) == pytest.approx(2.0)
+    clock.now += 2
+    assert bucket.take(25) == 0
+    assert bucket.tokens == pytest.approx(-15)
+    # The debt delays the next request: 16 tokens at 2 per second
+    assert bucket.take(1) == pytest.approx(8.0)
+
+
+def test_short_waits_queue_and_long_waits_are_rejected(clock, monkeypatch):
+    monkeypatch.setattr(admission, 'asyncio', SimpleNamespace(sleep=clock.sleep))
+    controller = AdmissionController({"llm_tokens": (10, 10)}, max_queue_wait=0.5)
+
+    async def run():
+        await controller.admit('a', 'llm_tokens', 10)
+        # Exactly max_queue_wait away: queued
+        await controller.admit('a', 'llm_tokens', 5)
+        with pytest.raises(RateLimited) as rejected:
+            await controller.admit('a', 'llm_tokens', 6)
+        # Other clients have their own buckets
+        await controller.admit('b', 'llm_tokens', 10)
+        return rejected.value
+
+    rejected = asyncio.run(run())
+    assert clock.slept == [pytest.approx(0.5)]
+    assert rejected.resource == 'llm_tokens'
+    assert rejected.retry_after == pytest.approx(0.6)
+    metrics = controller.stats()["resources"]["llm_tokens"]
+    assert (metrics["admitted"], metrics["queued"], metrics["rejected"]) == (3, 1, 1)
+    assert metrics["cost_total"] == 25
+
+
+def test_slot_waits_then_times_out():
+    controller = AdmissionController(max_concurrent=1, max_queue_wait=0.05)
+
+    async def hold(seconds):
+        async with controller.slot():
+            await asyncio.sleep(seconds)
+
+    async def run():
+        holder = asyncio.create_task(hold(0.2))
+        await asyncio.sleep(0)
+        assert controller.in_flight == 1
+        with pytest.raises(RateLimited):
+            await hold(0)
+        await holder
+        # A slot freed within the wait is taken
+        holder = asyncio.create_task(hold(0.01))
+        await asyncio.sleep(0)
+        await hold(0)
+        await holder
+
+    asyncio.run(run())
+    assert controller.stats()["slots"] == {"queued": 2, "rejected": 1, "in_flight": 0, "max_concurrent": 1}
+
+
+def test_full_buckets_are_pruned_when_too_many_clients_are_tracked(clock, monkeypatch):
+    monkeypatch.setattr(admission, 'MAX_TRACKED_CLIENTS', 3)
+    controller = AdmissionController({"rows_scanned": (100, 1)})
+
+    async def run():
+        await controller.admit('busy', 'rows_scanned', 50)
+        for client in ('idle1', 'idle2'):
+            await controller.admit(client, 'rows_scanned', 0)
+        assert controller.stats()["tracked_clients"] == 3
+        await controller.admit('new', 'rows_scanned', 1)
+
+    asyncio.run(run())
+    # Only the client still refilling keeps its bucket (and its debt)
+    assert {client for client, _ in controller._buckets} == {'busy', 'new'}
+    assert controller._bucket('busy', 'rows_scanned').tokens == pytest.approx(50)
+
+
+def test_uploads_without_content_length_are_refused():
+    from fastapi.testclient import TestClient
+
+    import server
+
+    def chunks():
+        yield b"id,name\n"
+        yield b"1,a\n"
+
+    client = TestClient(server.app)
+    response = client.post("/api/upload-data", content=chunks(), headers={"content-type": "text/csv"})
+    assert response.status_code == 411
+    # With a length the request is admitted (and rejected by the endpoint for lacking a file)
+    response = client.post("/api/upload-data", content=b"id,name\n1,a\n", headers={"content-type": "text/csv"})
+    assert response.status_code == 422
@@ -0,0 +1,117 @@
+"""Uploaded SQLite files attached under schema aliases."""
+
+import asyncio
+import sqlite3
+
+import pytest
+
+import attached_databases
+import db_manager
+from attached_databases import make_alias, register_database, list_attached_databases
+
+
+def _database_bytes(tmp_path, name='source.db', table='items'):
+    path = tmp_path / name
+    conn = sqlite3.connect(path)
+    conn.execute(f'CREATE TABLE "{table}" (id INTEGER PRIMARY KEY, label TEXT)')
+    conn.executemany(f'INSERT INTO "{table}" (label) VALUES (?)', [('a',), ('b',)])
+    conn.commit()
+    conn.close()
+    return path.read_bytes()
+
+
+@pytest.mark.parametrize('name', ['main', 'uploads', 'order', 'select', 'group', 'table'])
+def test_keyword_and_reserved_names_get_a_prefix(name):
+    assert make_alias(name) == f"db_{name}"
+
+
+@pytest.mark.parametrize('name', ['sales', 'inventory_2024', 'orders'])
+def test_plain_names_are_kept(name):
+    assert make_alias(name) == name
+
+
+def test_keyword_named_file_can_be_queried(upload_db, tmp_path):
+    result = db_manager.import_database_file(_database_bytes(tmp_path), 'order.db')
+    assert result["alias"] == 'db_order'
+    assert result["tables"] == ['db_order.items']
+
+    conn = db_manager.get_upload_connection()
+    try:
+        assert conn.execute("SELECT COUNT(*) FROM db_order.items").fetchone()[0] == 2
+    finally:
+        conn.close()
+
+
+def test_failed_attach_removes_registry_entry(upload_db, tmp_path, monkeypatch):
+    def fail(alias):
+        raise sqlite3.OperationalError("attach failed")
+
+    monkeypatch.setattr(db_manager, 'get_attached_database_schema', fail)
+    with pytest.raises(ValueError):
+        db_manager.import_database_file(_database_bytes(tmp_path), 'shop.db')
+
+    conn = sqlite3.connect(upload_db)
+    try:
+        assert list_attached_databases(conn) == []
+    finally:
+        conn.close()
+
+
+def test_unattachable_registry_entry_does_not_break_connections(upload_db, tmp_path):
+    db_manager.import_database_file(_database_bytes(tmp_path), 'shop.db')
+
+    # An entry registered before aliases were checked against keywords
+    conn = sqlite3.connect(upload_db)
+    try:
+        register_database(conn, 'order', 'order.db', attached_databases.ATTACHED_DB_DIR / 'shop.db')
+    finally:
+        conn.close()
+
+    conn = db_manager.get_upload_connection()
+    try:
+        assert conn.execute("SELECT COUNT(*) FROM shop.items").fetchone()[0] == 2
+    finally:
+        conn.close()
+
+
+@pytest.fixture
+def server_upload_db(upload_db, monkeypatch):
+    """The server module with its own copy of the upload path redirected too."""
+    import server
+    monkeypatch.setattr(server, 'UPLOAD_DB_PATH', upload_db)
+    monkeypatch.setattr(server, 'active_database', 'default')
+    return server
+
+
+def test_table_name_with_a_space(server_upload_db, upload_db, tmp_path):
+    server = server_upload_db
+    result = asyncio.run(server.upload_database_file(_database_bytes(tmp_path, table='Categories Old'), 'north.db'))
+    assert result["table_name"] == 'north.Categories Old'
+    assert result["row_count"] == 2
+    assert [row["label"] for row in result["preview"]] == ['a', 'b']
+    assert server.active_database == 'north.Categories Old'
+
+    tables = {table["name"]: table for table in db_manager.get_uploaded_tables()}
+    assert tables['north.Categories Old']["row_count"] == 2
+    assert db_manager.get_table_schema('north.Categories Old', upload_db)['north.Categories Old'][1]["name"] == 'label'
+
+    # SQL the fast path builds from the name must run
+    matcher = server.TemplateMatcher(db_manager.get_attached_database_schema('north'))
+    sql = matcher.match("list label")["sql"]
+    assert sql == 'SELECT label FROM north."Categories Old"'
+    assert db_manager.execute_query_on_uploaded_db(sql, 'north.Categories Old')[1] == [('a',), ('b',)]
+
+
+def test_failed_preview_unregisters_database(server_upload_db, tmp_path, monkeypatch):
+    server = server_upload_db
+
+    def fail(sql, table_name=None):
+        raise sqlite3.OperationalError("no such table")
+
+    monkeypatch.setattr(server, 'execute_query_on_uploaded_db', fail)
+    with pytest.raises(sqlite3.OperationalError):
+        asyncio.run(server.upload_database_file(_database_bytes(tmp_path), 'north.db'))
+
+    assert server.active_database == 'default'
+    assert db_manager.get_uploaded_tables() == []
+    assert not (attached_databases.ATTACHED_DB_DIR / 'north.db').exists()
@@ -0,0 +1,65 @@
+"""Table selection and join-key suggestions for federated prompts."""
+
+import sqlite3
+
+from catalog import find_join_keys, list_catalog_tables, select_relevant_tables
+
+
+def _columns(*names):
+    return [{"name": name, "type": 'TEXT', "isPrimaryKey": name == 'id'} for name in names]
+
+
+CATALOG = {
+    'ecommerce.customers': _columns('id', 'name', 'email', 'city'),
+    'ecommerce.orders': _columns('id', 'customer_id', 'product_id', 'total_price', 'status'),
+    'ecommerce.products': _columns('id', 'name', 'category', 'price'),
+    'uploads.signups': _columns('signup_id', 'email', 'plan', 'signup_date'),
+    'uploads.weather': _columns('day', 'temperature', 'rainfall'),
+    'crm.tickets': _columns('ticket_id', 'customer_id', 'priority', 'opened_at'),
+}
+
+
+def test_join_keys_from_table_ids_and_shared_key_columns():
+    assert find_join_keys(CATALOG, ['ecommerce.orders', 'ecommerce.customers']) == [
+        ('ecommerce.orders.customer_id', 'ecommerce.customers.id')
+    ]
+    assert find_join_keys(CATALOG, ['crm.tickets', 'ecommerce.customers']) == [
+        ('crm.tickets.customer_id', 'ecommerce.customers.id')
+    ]
+    assert find_join_keys(CATALOG, ['ecommerce.customers', 'uploads.signups']) == [
+        ('ecommerce.customers.email', 'uploads.signups.email')
+    ]
+
+
+def test_unrelated_tables_have_no_join_keys():
+    assert find_join_keys(CATALOG, ['uploads.weather', 'ecommerce.products']) == []
+
+
+def test_selects_tables_named_in_the_question_first():
+    tables = select_relevant_tables(CATALOG, "which signups have a premium plan")
+    assert tables[0] == 'uploads.signups'
+    # Joinable tables come along so the model can connect them
+    assert 'ecommerce.customers' in tables
+    assert 'uploads.weather' not in tables
+
+
+def test_columns_count_when_no_table_is_named():
+    assert select_relevant_tables(CATALOG, "average temperature and rainfall")[0] == 'uploads.weather'
+
+
+def test_selection_is_bounded():
+    tables = select_relevant_tables(CATALOG, "customers orders products signups tickets weather", max_tables=2)
+    assert len(tables) == 4
+    assert tables[:2] == ['ecommerce.orders', 'crm.tickets']
+    assert len(select_relevant_tables(CATALOG, "zzz", max_tables=2)) == 4
+
+
+def test_list_catalog_tables_skips_internal_tables():
+    conn = sqlite3.connect(':memory:')
+    conn.execute("ATTACH DATABASE ':memory:' AS shop")
+    conn.execute('CREATE TABLE shop."Order Items" (id INTEGER PRIMARY KEY, sku TEXT)')
+    conn.execute("CREATE TABLE shop._fts_items (x)")
+    catalog = list_catalog_tables(conn)
+    assert list(catalog) == ['shop.Order Items']
+    assert [col["name"] for col in catalog['shop.Order Items']] == ['id', 'sku']
+    assert catalog['shop.Order Items'][0]["isPrimaryKey"]
@@ -0,0 +1,93 @@
+"""Column profiling: distinct-count sketch accuracy and per-column statistics."""
+
+import math
+import sqlite3
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from column_stats import HLL_PRECISION, HyperLogLog, describe_column_stats, profile_dataframe, profile_table
+from file_handler import process_uploaded_file
+
+# Standard error of HyperLogLog with 2^p registers
+HLL_STANDARD_ERROR = 1.04 / math.sqrt(1 << HLL_PRECISION)
+
+
+@pytest.mark.parametrize('distinct', [1, 10, 1000, 50000, 1000000])
+def test_hll_estimate_within_error_bound(distinct):
+    sketch = HyperLogLog()
+    # Repeat values so duplicates are exercised too
+    values = pd.Series(np.arange(distinct, dtype=np.int64)).repeat(2)
+    sketch.add_series(values)
+    error = abs(sketch.estimate() - distinct) / distinct
+    assert error <= 4 * HLL_STANDARD_ERROR, f"{sketch.estimate()} vs {distinct}"
+
+
+def test_hll_on_strings_within_error_bound():
+    sketch = HyperLogLog()
+    distinct = 200000
+    sketch.add_series(pd.Series([f"customer-{i}@example.com" for i in range(distinct)]))
+    assert abs(sketch.estimate() - distinct) / distinct <= 4 * HLL_STANDARD_ERROR
+
+
+def test_hll_merge_matches_single_sketch():
+    values = pd.Series(np.arange(30000, dtype=np.int64))
+    whole, left, right = HyperLogLog(), HyperLogLog(), HyperLogLog()
+    whole.add_series(values)
+    left.add_series(values[:20000])
+    right.add_series(values[10000:])
+    left.merge(right)
+    assert left.estimate() == whole.estimate()
+
+
+def test_hll_ignores_nulls():
+    sketch = HyperLogLog()
+    sketch.add_series(pd.Series([None, np.nan, 'a', 'a', 'b']))
+    assert sketch.estimate() == 2
+
+
+def test_profile_dataframe():
+    df = pd.DataFrame({
+        'city': pd.Series(['Boston'] * 5 + ['Austin'] * 3 + [None] * 2, dtype='category'),
+        'amount': [1.5, 2.0, None, 4.0, 4.0, 4.0, 7.0, 8.0, 9.0, 10.0],
+    })
+    stats = profile_dataframe(df)
+    assert stats["row_count"] == 10
+
+    city = stats["columns"]["city"]
+    assert city["null_count"] == 2
+    assert city["distinct_count"] == 2
+    assert (city["min"], city["max"]) == ('Austin', 'Boston')
+    assert city["top_values"][0] == {"value": 'Boston', "count": 5}
+
+    amount = stats["columns"]["amount"]
+    assert amount["null_count"] == 1
+    assert (amount["min"], amount["max"]) == (1.5, 10.0)
+    assert amount["top_values"][0] == {"value": 4.0, "count": 3}
+
+
+def test_bool_columns_are_profiled_as_stored(upload_db):
+    import db_manager
+
+    csv = b"id,active,verified\n" + b"".join(
+        f"{i},{'true' if i % 3 else 'false'},{'' if i % 5 == 0 else ('True' if i % 2 else 'False')}\n".encode()
+        for i in range(1, 31)
+    )
+    df, schema, _, stats = process_uploaded_file(csv, 'users.csv')
+    db_manager.create_table_from_dataframe(df, 'users', schema, column_stats=stats)
+
+    conn = sqlite3.connect(upload_db)
+    try:
+        for profiled in (stats, profile_table(conn, 'users')):
+            for column in ('active', 'verified'):
+                column_stats = profiled["columns"][column]
+                assert {item["value"] for item in column_stats["top_values"]} <= {0, 1, '0', '1'}
+                # Every hinted literal matches the rows stored in SQLite
+                for item in column_stats["top_values"]:
+                    query = f"SELECT COUNT(*) FROM users WHERE {column} = ?"
+                    assert conn.execute(query, (item["value"],)).fetchone()[0] == item["count"]
+            prompt = describe_column_stats({'users': profiled["columns"]})
+            assert 'True' not in prompt and 'False' not in prompt
+    finally:
+        conn.close()
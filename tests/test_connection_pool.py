@@ -0,0 +1,95 @@
+"""Connection reuse, idle limit and retirement after clear()."""
+
+import sqlite3
+import threading
+
+import pytest
+
+from connection_pool import ConnectionPool
+
+
+@pytest.fixture
+def pool():
+    opened = []
+
+    def factory():
+        conn = sqlite3.connect(':memory:', check_same_thread=False)
+        opened.append(conn)
+        return conn
+
+    pool = ConnectionPool(factory, max_idle=2)
+    pool.opened = opened
+    return pool
+
+
+def _is_closed(conn):
+    try:
+        conn.execute("SELECT 1")
+        return False
+    except sqlite3.ProgrammingError:
+        return True
+
+
+def test_connections_are_reused(pool):
+    with pool.connection() as first:
+        pass
+    with pool.connection() as second:
+        assert second is first
+    assert pool.stats() == {"created": 1, "reused": 1, "idle": 1}
+
+
+def test_idle_connections_are_capped(pool):
+    with pool.connection(), pool.connection(), pool.connection():
+        pass
+    assert pool.stats()["created"] == 3
+    assert pool.stats()["idle"] == 2
+    assert sum(_is_closed(conn) for conn in pool.opened) == 1
+
+
+def test_clear_retires_idle_and_borrowed_connections(pool):
+    with pool.connection() as borrowed:
+        with pool.connection() as idle:
+            pass
+        pool.clear()
+        assert _is_closed(idle)
+        # Still usable by its borrower
+        assert borrowed.execute("SELECT 1").fetchone() == (1,)
+    # Returned after clear(): from an older generation, so closed rather than kept
+    assert _is_closed(borrowed)
+    assert pool.stats()["idle"] == 0
+    with pool.connection() as fresh:
+        assert fresh not in (borrowed, idle)
+    assert pool.stats()["created"] == 3
+
+
+def test_failed_block_rolls_back(pool):
+    with pytest.raises(RuntimeError):
+        with pool.connection() as conn:
+            conn.execute("CREATE TABLE t (x)")
+            conn.execute("INSERT INTO t VALUES (1)")
+            raise RuntimeError
+    with pool.connection() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM t").fetchone() == (0,)
+
+
+def test_threads_never_share_a_connection(pool):
+    in_use, errors = set(), []
+    lock = threading.Lock()
+
+    def borrow():
+        for _ in range(50):
+            with pool.connection() as conn:
+                with lock:
+                    if id(conn) in in_use:
+                        errors.append(conn)
+                    in_use.add(id(conn))
+                with lock:
+                    in_use.discard(id(conn))
+
+    threads = [threading.Thread(target=borrow) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    assert pool.stats()["idle"] <= pool.max_idle
@@ -0,0 +1,113 @@
+"""Few-shot example retrieval: ranking, per-database partitions and lookup latency."""
+
+import asyncio
+import random
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from example_index import LOOKUP_BUDGET_MS, ExampleIndex, tokenize
+
+EXAMPLES = [
+    ("How many orders were shipped last month?", "SELECT COUNT(*) FROM orders WHERE status = 'shipped'"),
+    ("Total revenue by product category", "SELECT category, SUM(price) FROM products GROUP BY category"),
+    ("List customers in Boston", "SELECT * FROM customers WHERE city = 'Boston'"),
+    ("Average order quantity per customer", "SELECT customer_id, AVG(quantity) FROM orders GROUP BY customer_id"),
+    ("Which products are out of stock?", "SELECT * FROM products WHERE stock = 0"),
+]
+
+
+@pytest.fixture
+def index():
+    index = ExampleIndex()
+    for question, sql in EXAMPLES:
+        index.add('default', question, sql)
+    return index
+
+
+def test_tokenize_drops_stopwords_and_plurals():
+    assert tokenize("Show me all the Orders by customers") == ['order', 'customer']
+
+
+def test_most_similar_example_ranks_first(index):
+    results = index.search('default', "revenue for each product category")
+    assert results[0]["sql"] == EXAMPLES[1][1]
+    assert results[0]["score"] > 0.5
+    assert [r["score"] for r in results] == sorted((r["score"] for r in results), reverse=True)
+
+
+def test_rare_terms_outweigh_common_ones(index):
+    # "orders" appears in two examples, "shipped" in one
+    results = index.search('default', "shipped orders")
+    assert results[0]["question"] == EXAMPLES[0][0]
+
+
+def test_unrelated_questions_return_nothing(index):
+    assert index.search('default', "weather forecast tomorrow") == []
+    assert index.search('default', "") == []
+
+
+def test_databases_are_separate(index):
+    index.add('sales', "Total revenue by region", "SELECT region, SUM(revenue) FROM sales GROUP BY region")
+    assert [r["sql"] for r in index.search('sales', "revenue by category")] == [
+        "SELECT region, SUM(revenue) FROM sales GROUP BY region"
+    ]
+    assert index.search('other', "revenue by category") == []
+
+
+def test_readding_a_question_replaces_its_sql(index):
+    index.add('default', "  list CUSTOMERS in boston ", "SELECT name FROM customers WHERE city = 'Boston'")
+    results = index.search('default', "customers in Boston")
+    assert results[0]["sql"] == "SELECT name FROM customers WHERE city = 'Boston'"
+    assert index.stats()["examples"] == len(EXAMPLES)
+
+
+def test_oldest_examples_are_evicted():
+    index = ExampleIndex(max_examples_per_database=3)
+    for i in range(5):
+        index.add('default', f"orders for store{i}", f"SELECT {i}")
+    assert index.stats()["examples"] == 3
+    assert index.search('default', "orders for store0") == []
+    assert index.search('default', "orders for store4")[0]["sql"] == "SELECT 4"
+
+
+def test_lookup_within_budget():
+    """Average few-shot lookup over a full index stays under LOOKUP_BUDGET_MS."""
+    rng = random.Random(0)
+    vocabulary = [f"term{i}" for i in range(400)] + ['orders', 'customers', 'products', 'total', 'average']
+    index = ExampleIndex()
+    for i in range(1000):
+        index.add('default', " ".join(rng.sample(vocabulary, 8)), f"SELECT {i}")
+
+    questions = [" ".join(rng.sample(vocabulary, 6)) for _ in range(200)]
+    start = time.perf_counter()
+    for question in questions:
+        index.search('default', question)
+    avg_ms = (time.perf_counter() - start) * 1000 / len(questions)
+    print(f"\n1000 examples: {avg_ms:.3f}ms per lookup (budget {LOOKUP_BUDGET_MS}ms)")
+    assert avg_ms < LOOKUP_BUDGET_MS
+
+
+def test_executed_example_is_filed_under_the_database_it_ran_on(monkeypatch):
+    import server
+
+    index = ExampleIndex()
+    monkeypatch.setattr(server, 'example_index', index)
+    monkeypatch.setattr(server, 'active_database', 'sales')
+
+    async def admit_scan(http_request, sql, database):
+        pass
+
+    def run_query(sql, database):
+        # Another client switches databases while the query runs
+        server.active_database = 'default'
+        return ['n'], [(1,)]
+
+    monkeypatch.setattr(server, 'admit_scan', admit_scan)
+    monkeypatch.setattr(server, 'run_query', run_query)
+
+    request = server.ExecuteQueryRequest(sql="SELECT COUNT(*) FROM sales", question="how many sales")
+    asyncio.run(server.execute_query(request, SimpleNamespace(client=None)))
+    assert index.search('sales', "how many sales")[0]["sql"] == "SELECT COUNT(*) FROM sales"
+    assert index.search('default', "how many sales") == []
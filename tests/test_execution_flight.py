@@ -0,0 +1,78 @@
+"""Identical concurrent queries share one execution; different ones never do."""
+
+import asyncio
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+import server
+from server import coalesce_key
+
+
+@pytest.mark.parametrize('left, right', [
+    ("SELECT * FROM t", "  SELECT *\n  FROM t ;"),
+    ("SELECT a,  b FROM t WHERE x = 1", "SELECT a, b FROM t WHERE x = 1;"),
+])
+def test_equivalent_spacing_shares_a_key(left, right):
+    assert coalesce_key(left) == coalesce_key(right)
+
+
+@pytest.mark.parametrize('left, right', [
+    ("SELECT * FROM t WHERE name = 'a  b'", "SELECT * FROM t WHERE name = 'a b'"),
+    ("SELECT * FROM t WHERE name = 'Boston'", "SELECT * FROM t WHERE name = 'boston'"),
+    ('SELECT "My  Col" FROM t', 'SELECT "My Col" FROM t'),
+    ("SELECT * FROM t WHERE name = 'it''s  here'", "SELECT * FROM t WHERE name = 'it''s here'"),
+])
+def test_different_literals_get_different_keys(left, right):
+    assert coalesce_key(left) != coalesce_key(right)
+
+
+@pytest.fixture
+def slow_queries(monkeypatch):
+    """Stub execution that records each scan and holds it long enough for others to join."""
+    calls = []
+    lock = threading.Lock()
+
+    def run_query(sql, database):
+        with lock:
+            calls.append(sql)
+        time.sleep(0.1)
+        return ['sql'], [(sql,)]
+
+    async def admit_scan(http_request, sql, database):
+        pass
+
+    monkeypatch.setattr(server, 'run_query', run_query)
+    monkeypatch.setattr(server, 'admit_scan', admit_scan)
+    monkeypatch.setattr(server, 'active_database', 'default')
+    return calls
+
+
+def _execute_concurrently(sqls):
+    async def run():
+        return await asyncio.gather(*(
+            server.execute_query(server.ExecuteQueryRequest(sql=sql), SimpleNamespace(client=None))
+            for sql in sqls
+        ))
+    return asyncio.run(run())
+
+
+def test_identical_concurrent_queries_share_one_scan(slow_queries):
+    sql = "SELECT * FROM products WHERE category = 'Books'"
+    results = _execute_concurrently([sql, sql, "  " + sql + " ;"])
+    assert len(slow_queries) == 1
+    assert all(result.rows == results[0].rows for result in results)
+
+
+def test_queries_differing_in_a_literal_run_separately(slow_queries):
+    results = _execute_concurrently([
+        "SELECT * FROM customers WHERE name = 'a  b'",
+        "SELECT * FROM customers WHERE name = 'a b'",
+    ])
+    assert len(slow_queries) == 2
+    assert [result.rows[0][0] for result in results] == [
+        "SELECT * FROM customers WHERE name = 'a  b'",
+        "SELECT * FROM customers WHERE name = 'a b'",
+    ]
@@ -0,0 +1,106 @@
+"""Spooled CSV/Parquet exports and range parsing."""
+
+import csv
+import sqlite3
+
+import pytest
+
+import exporter
+from exporter import export_cursor, find_export, iter_file_range, parse_range
+
+
+@pytest.fixture
+def export_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(exporter, 'EXPORT_DIR', tmp_path / 'exports')
+    # Small batches so every export spans several writes
+    monkeypatch.setattr(exporter, 'EXPORT_BATCH_ROWS', 3)
+    return tmp_path / 'exports'
+
+
+@pytest.fixture
+def conn():
+    conn = sqlite3.connect(':memory:')
+    # Untyped columns: SQLite keeps each value's own type
+    conn.execute("CREATE TABLE t (id INTEGER, amount, label, note)")
+    conn.executemany("INSERT INTO t VALUES (?, ?, ?, ?)", [
+        (1, 10, 'a', None),
+        (2, 20, 'b', None),
+        (3, 30, 'c', None),
+        (4, 40.5, 7, 'late text'),
+        (5, None, 'e', None),
+        (6, 60, 'f', None),
+        (7, 70.25, 'g', None),
+    ])
+    yield conn
+    conn.close()
+
+
+def test_csv_export(export_dir, conn):
+    result = export_cursor(conn.execute("SELECT * FROM t ORDER BY id"), 'csv')
+    assert result["row_count"] == 7
+    with open(find_export(result["export_id"]), newline='') as f:
+        rows = list(csv.reader(f))
+    assert rows[0] == ['id', 'amount', 'label', 'note']
+    assert rows[4] == ['4', '40.5', '7', 'late text']
+    assert len(rows) == 8
+
+
+def test_parquet_export_keeps_values_that_change_type_across_batches(export_dir, conn):
+    pq = pytest.importorskip('pyarrow.parquet')
+    result = export_cursor(conn.execute("SELECT * FROM t ORDER BY id"), 'parquet')
+    assert result["row_count"] == 7
+
+    table = pq.read_table(find_export(result["export_id"]))
+    assert [str(field.type) for field in table.schema] == ['double', 'double', 'string', 'string']
+    data = table.to_pydict()
+    # Integers in the first batch, fractions later: nothing is truncated
+    assert data["amount"] == [10.0, 20.0, 30.0, 40.5, None, 60.0, 70.25]
+    assert data["label"][3] == '7'
+    assert data["note"][3] == 'late text'
+
+
+def test_parquet_export_rejects_text_in_numeric_column(export_dir, conn):
+    pytest.importorskip('pyarrow')
+    conn.execute("INSERT INTO t VALUES (8, 'n/a', 'h', NULL)")
+    with pytest.raises(ValueError, match='amount'):
+        export_cursor(conn.execute("SELECT * FROM t ORDER BY id"), 'parquet')
+    assert not any(export_dir.iterdir())
+
+
+def test_empty_parquet_export(export_dir, conn):
+    pq = pytest.importorskip('pyarrow.parquet')
+    result = export_cursor(conn.execute("SELECT id, label FROM t WHERE 0"), 'parquet')
+    assert result["row_count"] == 0
+    assert pq.read_table(find_export(result["export_id"])).num_rows == 0
+
+
+def test_unknown_format_and_ids(export_dir, conn):
+    with pytest.raises(ValueError):
+        export_cursor(conn.execute("SELECT * FROM t"), 'xlsx')
+    assert find_export('../../etc/passwd') is None
+    assert find_export('0' * 32) is None
+
+
+@pytest.mark.parametrize('header, expected', [
+    (None, None),
+    ('bytes=0-9', (0, 9)),
+    ('bytes=90-', (90, 99)),
+    ('bytes=-10', (90, 99)),
+    ('bytes=95-200', (95, 99)),
+    ('bytes=0-1,5-6', None),
+    ('items=0-1', None),
+])
+def test_parse_range(header, expected):
+    assert parse_range(header, 100) == expected
+
+
+def test_unsatisfiable_range():
+    with pytest.raises(ValueError):
+        parse_range('bytes=100-', 100)
+
+
+def test_iter_file_range(tmp_path, monkeypatch):
+    monkeypatch.setattr(exporter, 'STREAM_CHUNK_BYTES', 4)
+    path = tmp_path / 'data.bin'
+    path.write_bytes(bytes(range(50)))
+    assert b''.join(iter_file_range(path, 10, 29)) == bytes(range(10, 30))
@@ -0,0 +1,91 @@
+"""Queries across the default database, uploads and attached files."""
+
+import asyncio
+import sqlite3
+
+import pandas as pd
+import pytest
+
+import db_manager
+from llm_response import JsonEnvelopeParser
+
+
+@pytest.fixture
+def federated(upload_db, tmp_path, monkeypatch):
+    """A small ecommerce database, one uploaded table and one attached file."""
+    default_db = tmp_path / 'ecommerce.db'
+    conn = sqlite3.connect(default_db)
+    conn.execute("CREATE TABLE customers (id INTEGER PRIMARY KEY, name TEXT, city TEXT)")
+    conn.executemany("INSERT INTO customers VALUES (?, ?, ?)", [
+        (1, 'Ada', 'Boston'), (2, 'Grace', 'Austin'), (3, 'Linus', 'Boston'),
+    ])
+    conn.commit()
+    conn.close()
+    monkeypatch.setattr(db_manager, 'DEFAULT_DB_PATH', default_db)
+
+    signups = pd.DataFrame({'customer_id': [1, 3, 3, 4], 'plan_code': ['pro', 'free', 'pro', 'pro']})
+    db_manager.create_table_from_dataframe(signups, 'signups', {'customer_id': 'INTEGER', 'plan_code': 'TEXT'})
+
+    source = tmp_path / 'billing.db'
+    conn = sqlite3.connect(source)
+    conn.execute('CREATE TABLE "Plan Prices" (plan_code TEXT, price REAL)')
+    conn.executemany('INSERT INTO "Plan Prices" VALUES (?, ?)', [('pro', 20.0), ('free', 0.0)])
+    conn.commit()
+    conn.close()
+    db_manager.import_database_file(source.read_bytes(), 'billing.db')
+    return db_manager
+
+
+def test_catalog_lists_every_database(federated):
+    assert set(federated.get_federated_catalog()) == {
+        'ecommerce.customers', 'uploads.signups', 'billing.Plan Prices'
+    }
+
+
+def test_join_upload_with_default_database(federated):
+    created = federated.federated_pool.stats()["created"]
+    columns, rows = federated.execute_federated_query("""
+        SELECT c.name, COUNT(*) AS signups, SUM(p.price) AS revenue
+        FROM ecommerce.customers c
+        JOIN uploads.signups s ON s.customer_id = c.id
+        JOIN billing."Plan Prices" p ON p.plan_code = s.plan_code
+        GROUP BY c.name ORDER BY c.name
+    """)
+    assert columns == ['name', 'signups', 'revenue']
+    assert rows == [('Ada', 1, 20.0), ('Linus', 2, 20.0)]
+    # The attaching connection is opened once and then reused
+    federated.execute_federated_query("SELECT COUNT(*) FROM uploads.signups")
+    assert federated.federated_pool.stats()["created"] == created + 1
+
+
+def test_new_attachments_are_visible_after_import(federated, tmp_path):
+    federated.execute_federated_query("SELECT 1")
+    source = tmp_path / 'extra.db'
+    conn = sqlite3.connect(source)
+    conn.execute("CREATE TABLE notes (id INTEGER)")
+    conn.commit()
+    conn.close()
+    federated.import_database_file(source.read_bytes(), 'extra.db')
+    assert federated.execute_federated_query("SELECT COUNT(*) FROM extra.notes")[1] == [(0,)]
+
+
+def test_prompt_quotes_attached_table_names(federated, monkeypatch):
+    import server
+
+    prompts = []
+
+    def stream_completion(client, messages):
+        prompts.append(messages[0]["content"])
+        parser = JsonEnvelopeParser()
+        parser.feed('{"sql": "SELECT plan_code FROM billing.\\"Plan Prices\\"", "explanation": ""}')
+        return parser
+
+    monkeypatch.setattr(server, 'active_database', server.FEDERATED_DATABASE)
+    monkeypatch.setattr(server, 'llm_cache', None)
+    monkeypatch.setattr(server, 'stream_completion', stream_completion)
+
+    result = asyncio.run(server.generate_sql_with_llm("price of each plan for signups"))
+    assert result["validated"]
+    assert 'Table: billing."Plan Prices"' in prompts[0]
+    assert '- billing."Plan Prices".plan_code = uploads.signups.plan_code' in prompts[0]
+    assert '- uploads.signups.customer_id = ecommerce.customers.id' in prompts[0]
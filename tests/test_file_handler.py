@@ -0,0 +1,60 @@
+"""Batch ingestion of workbooks and archives."""
+
+import io
+import zipfile
+
+import openpyxl
+import pytest
+
+from file_handler import expand_upload, process_uploaded_files
+
+
+def _workbook(sheets):
+    workbook = openpyxl.Workbook()
+    workbook.remove(workbook.active)
+    for name, rows in sheets.items():
+        sheet = workbook.create_sheet(name)
+        for row in rows:
+            sheet.append(row)
+    buffer = io.BytesIO()
+    workbook.save(buffer)
+    return buffer.getvalue()
+
+
+def test_expand_upload_yields_one_task_per_sheet():
+    content = _workbook({'orders': [['id'], [1]], 'notes': []})
+    tasks = expand_upload(content, 'book.xlsx')
+    assert [task["name"] for task in tasks] == ['book_orders.xlsx', 'book_notes.xlsx']
+
+
+def test_expand_upload_reads_zip_members():
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w') as archive:
+        archive.writestr('a.csv', 'x,y\n1,2\n')
+        archive.writestr('readme.txt', 'ignored')
+    tasks = expand_upload(buffer.getvalue(), 'data.zip')
+    assert [task["name"] for task in tasks] == ['a.csv']
+
+
+def test_blank_sheets_are_skipped():
+    content = _workbook({
+        'orders': [['id', 'amount'], [1, 9.5], [2, 3.0]],
+        'blank': [],
+    })
+    results = process_uploaded_files([(content, 'book.xlsx')])
+    assert [result["sheet_name"] for result in results] == ['orders']
+    assert results[0]["schema"] == {'id': 'INTEGER', 'amount': 'REAL'}
+
+
+def test_batch_of_only_blank_sheets_is_rejected():
+    content = _workbook({'blank': [], 'empty': []})
+    with pytest.raises(ValueError):
+        process_uploaded_files([(content, 'book.xlsx')])
+
+
+def test_create_table_rejects_empty_schema(upload_db):
+    import pandas as pd
+    import db_manager
+
+    with pytest.raises(ValueError):
+        db_manager.create_table_from_dataframe(pd.DataFrame(), 'blank', {})
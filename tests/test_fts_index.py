@@ -0,0 +1,101 @@
+"""FTS rewrites must return exactly what the original LIKE query returns."""
+
+import sqlite3
+
+import pytest
+
+from fts_index import build_fts_index, rewrite_like_with_fts
+from tests.helpers import assert_same_results
+
+PRODUCTS = ['Laptop Pro', 'Laptop Air', 'Wireless Mouse', 'Desk Lamp', 'Office Chair', 'USB Hub']
+CITIES = ['New York', 'Boston', 'Newark', 'Austin']
+
+
+@pytest.fixture(scope='module')
+def conn():
+    conn = sqlite3.connect(':memory:')
+    conn.executescript("""
+        CREATE TABLE customers (id INTEGER PRIMARY KEY, name TEXT, email TEXT, city TEXT);
+        CREATE TABLE products (id INTEGER PRIMARY KEY, name TEXT, category TEXT, price REAL);
+        CREATE TABLE orders (id INTEGER PRIMARY KEY, customer_id INTEGER, product_id INTEGER, status TEXT);
+    """)
+    conn.executemany(
+        "INSERT INTO products (name, category, price) VALUES (?, ?, ?)",
+        [(name, 'Computers' if 'Laptop' in name else 'Office', 100.0 + i) for i, name in enumerate(PRODUCTS)]
+    )
+    conn.executemany(
+        "INSERT INTO customers (name, email, city) VALUES (?, ?, ?)",
+        [(f"Customer {i}", f"user{i}@example.com", CITIES[i % len(CITIES)]) for i in range(40)]
+    )
+    conn.executemany(
+        "INSERT INTO orders (customer_id, product_id, status) VALUES (?, ?, ?)",
+        [(i % 40 + 1, i * 7 % len(PRODUCTS) + 1, 'shipped' if i % 3 else 'pending') for i in range(120)]
+    )
+    for table in ('customers', 'products', 'orders'):
+        text_columns = [col[1] for col in conn.execute(f"PRAGMA table_info({table})") if col[2] == 'TEXT']
+        build_fts_index(conn, table, text_columns)
+    yield conn
+    conn.close()
+
+
+REWRITTEN = [
+    "SELECT * FROM products WHERE name LIKE '%Laptop%'",
+    "SELECT name FROM customers WHERE city LIKE '%New%' AND email LIKE '%@example%'",
+    "SELECT COUNT(*) FROM customers WHERE (city LIKE '%ewar%' OR city = 'Boston')",
+    "SELECT name, price FROM products WHERE name LIKE 'Desk%' ORDER BY price",
+    "SELECT id FROM customers WHERE city LIKE '%Austin%' "
+    "AND id IN (SELECT customer_id FROM orders WHERE status = 'pending')",
+]
+
+NOT_REWRITTEN = [
+    "SELECT * FROM products WHERE name NOT LIKE '%Laptop%'",
+    "SELECT * FROM products WHERE name LIKE '%a%'",
+    "SELECT * FROM products WHERE price > 100",
+    "SELECT name FROM customers WHERE id IN (SELECT customer_id FROM orders WHERE product_id IN "
+    "(SELECT id FROM products WHERE name LIKE '%Laptop%'))",
+    "SELECT name FROM customers WHERE EXISTS (SELECT 1 FROM products WHERE products.name LIKE '%Laptop%' "
+    "AND products.id = customers.id)",
+    "SELECT * FROM customers WHERE name = 'x LIKE ''%abc%'''",
+    "SELECT * FROM products WHERE NOT (name LIKE '%Laptop%')",
+    "SELECT * FROM products WHERE NOT (price > 100 OR (name LIKE '%Laptop%'))",
+    "SELECT * FROM products WHERE name LIKE '%Laptop\\%' ESCAPE '\\'",
+    "SELECT * FROM products WHERE name LIKE '%Laptop%' escape '!' AND price > 0",
+]
+
+
+@pytest.mark.parametrize('sql', REWRITTEN)
+def test_rewrite_matches_original(conn, sql):
+    rewritten = rewrite_like_with_fts(conn, sql)
+    assert '_fts_' in rewritten
+    assert_same_results(conn, sql, rewritten)
+
+
+@pytest.mark.parametrize('sql', NOT_REWRITTEN)
+def test_unsupported_likes_run_unchanged(conn, sql):
+    assert rewrite_like_with_fts(conn, sql) == sql
+
+
+def test_subquery_like_keeps_inner_table(conn):
+    """The outer table's index must not be used for a LIKE on an inner table."""
+    sql = (
+        "SELECT name FROM customers WHERE city LIKE '%Boston%' AND id IN (SELECT customer_id FROM orders "
+        "WHERE product_id IN (SELECT id FROM products WHERE name LIKE '%Laptop%'))"
+    )
+    rewritten = rewrite_like_with_fts(conn, sql)
+    assert rewritten.count('_fts_customers') == 1
+    assert "products WHERE name LIKE '%Laptop%'" in rewritten
+    assert_same_results(conn, sql, rewritten)
+
+
+def test_negated_like_keeps_null_rows_out():
+    """NOT (col LIKE ...) must not return rows whose column is NULL."""
+    conn = sqlite3.connect(':memory:')
+    conn.execute("CREATE TABLE notes (id INTEGER PRIMARY KEY, body TEXT)")
+    conn.executemany("INSERT INTO notes (body) VALUES (?)", [('hello world',), (None,), ('other',)])
+    build_fts_index(conn, 'notes', ['body'])
+    sql = "SELECT id FROM notes WHERE NOT (body LIKE '%hello%')"
+    rewritten = rewrite_like_with_fts(conn, sql)
+    assert rewritten == sql
+    assert_same_results(conn, sql, rewritten)
+    assert conn.execute(rewritten).fetchall() == [(3,)]
+    conn.close()
@@ -0,0 +1,44 @@
+"""Coalesced SQL generation charges each waiting request to its own client."""
+
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+import server
+from admission import RateLimited
+
+
+def _request(host):
+    return SimpleNamespace(client=SimpleNamespace(host=host))
+
+
+def test_rate_limited_leader_does_not_fail_followers(monkeypatch):
+    monkeypatch.setattr(server, 'ENABLE_TEMPLATE_FAST_PATH', False)
+    charged = []
+
+    async def admit(http_request, resource, cost):
+        charged.append(http_request.client.host)
+        if http_request.client.host == 'over-budget':
+            raise RateLimited(resource, 1.0)
+
+    async def generate(question, before_llm_call=None):
+        # Give the second request time to join the flight
+        await asyncio.sleep(0.05)
+        await before_llm_call()
+        return {"sql": "SELECT 1", "explanation": ""}
+
+    monkeypatch.setattr(server, 'admit', admit)
+    monkeypatch.setattr(server, 'generate_sql_with_llm', generate)
+
+    async def run():
+        question = server.QueryRequest(question="how many orders are there")
+        leader = asyncio.create_task(server.generate_sql(question, _request('over-budget')))
+        await asyncio.sleep(0.01)
+        follower = asyncio.create_task(server.generate_sql(question, _request('within-budget')))
+        return await asyncio.gather(leader, follower, return_exceptions=True)
+
+    leader, follower = asyncio.run(run())
+    assert isinstance(leader, RateLimited)
+    assert follower.sql == "SELECT 1"
+    assert charged == ['over-budget', 'within-budget']
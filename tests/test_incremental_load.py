@@ -0,0 +1,56 @@
+"""Append/upsert merges of re-uploaded data."""
+
+import sqlite3
+
+import pandas as pd
+import pytest
+
+from file_handler import process_uploaded_file
+from incremental_load import compute_row_hashes, merge_dataframe
+
+CSV = (
+    b"id,name,active,verified,score,joined\n"
+    b"1,Ann,True,True,9.5,2024-01-02\n"
+    b"2,Bob,False,,7,2024-02-03\n"
+    b"3,Cy,True,False,,2024-03-04\n"
+)
+
+
+@pytest.fixture
+def table():
+    df, schema, _, _ = process_uploaded_file(CSV, 'people.csv')
+    conn = sqlite3.connect(':memory:')
+    conn.execute(f"CREATE TABLE people ({', '.join(f'{c} {t}' for c, t in schema.items())})")
+    df.to_sql('people', conn, if_exists='append', index=False)
+    yield conn, df
+    conn.close()
+
+
+def test_rows_read_back_from_sqlite_hash_the_same(table):
+    conn, df = table
+    stored = pd.read_sql("SELECT * FROM people", conn)
+    columns = list(df.columns)
+    assert compute_row_hashes(stored, columns).tolist() == compute_row_hashes(df, columns).tolist()
+
+
+def test_reappending_identical_file_inserts_nothing(table):
+    conn, df = table
+    counts = merge_dataframe(conn, df, 'people', 'append')
+    assert counts == {"inserted": 0, "updated": 0, "skipped": 3}
+    assert conn.execute("SELECT COUNT(*) FROM people").fetchone()[0] == 3
+
+
+def test_append_inserts_only_new_rows(table):
+    conn, _ = table
+    df, _, _, _ = process_uploaded_file(CSV + b"4,Di,False,True,3.5,2024-04-05\n", 'people.csv')
+    counts = merge_dataframe(conn, df, 'people', 'append')
+    assert counts["inserted"] == 1
+    assert conn.execute("SELECT COUNT(*) FROM people").fetchone()[0] == 4
+
+
+def test_upsert_updates_changed_rows_by_key(table):
+    conn, _ = table
+    df, _, _, _ = process_uploaded_file(CSV.replace(b"2,Bob,False", b"2,Bob,True"), 'people.csv')
+    counts = merge_dataframe(conn, df, 'people', 'upsert', key_column='id')
+    assert counts == {"inserted": 0, "updated": 1, "skipped": 2}
+    assert conn.execute("SELECT active FROM people WHERE id = 2").fetchone()[0] == 1
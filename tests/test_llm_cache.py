@@ -0,0 +1,186 @@
+"""Persistent LLM generation cache: LRU eviction, persistence, warm-up and hit flushing."""
+
+import asyncio
+import sqlite3
+import threading
+import time
+
+import pytest
+
+import llm_cache
+from llm_cache import LLMCache, fingerprint
+
+SCHEMA = fingerprint("Table: products\nColumns: id, name, price")
+
+# Warm-up of a full in-memory hot set from a full disk cache (MAX_DISK_ENTRIES rows)
+MAX_WARM_MS = 500
+
+
+@pytest.fixture
+def path(tmp_path):
+    return tmp_path / 'llm_cache.db'
+
+
+def _disk_keys(path):
+    conn = sqlite3.connect(path)
+    try:
+        return {question for (question,) in conn.execute("SELECT question FROM generations")}
+    finally:
+        conn.close()
+
+
+def test_hit_after_put_ignores_case_spacing_and_punctuation(path):
+    cache = LLMCache(path)
+    assert cache.get("How many products?", SCHEMA) is None
+    cache.put("How many products?", SCHEMA, "SELECT COUNT(*) FROM products", "Counts products")
+    assert cache.get("  how many   PRODUCTS ", SCHEMA) == {
+        "sql": "SELECT COUNT(*) FROM products", "explanation": "Counts products"
+    }
+    # A different schema never reuses the answer
+    assert cache.get("How many products?", fingerprint("other schema")) is None
+    cache.close()
+
+
+def test_least_recently_used_entries_are_evicted_from_disk(path):
+    cache = LLMCache(path, max_disk_entries=3)
+    for i in range(3):
+        cache.put(f"question {i}", SCHEMA, f"SELECT {i}", "")
+        time.sleep(0.01)
+    # Using question 0 makes question 1 the least recently used
+    assert cache.get("question 0", SCHEMA) is not None
+    time.sleep(0.01)
+    cache.put("question 3", SCHEMA, "SELECT 3", "")
+
+    assert _disk_keys(path) == {"question 0", "question 2", "question 3"}
+    assert cache.stats()["disk_entries"] == 3
+    assert cache.stats()["evicted"] == 1
+    # Overwriting an entry does not grow the count
+    cache.put("question 3", SCHEMA, "SELECT 33", "")
+    assert cache.stats()["disk_entries"] == 3
+    cache.close()
+
+
+def test_memory_is_bounded_but_disk_still_answers(path):
+    cache = LLMCache(path, max_memory_entries=2)
+    for i in range(4):
+        cache.put(f"question {i}", SCHEMA, f"SELECT {i}", "")
+    assert cache.stats()["memory_entries"] == 2
+    assert cache.get("question 0", SCHEMA)["sql"] == "SELECT 0"
+    assert cache.stats()["disk_hits"] == 1
+    cache.close()
+
+
+def test_entries_survive_reopening(path):
+    cache = LLMCache(path)
+    cache.put("top products", SCHEMA, "SELECT * FROM products LIMIT 10", "Top ten")
+    cache.close()
+
+    reopened = LLMCache(path)
+    assert reopened.stats()["disk_entries"] == 1
+    assert reopened.get("top products", SCHEMA)["sql"] == "SELECT * FROM products LIMIT 10"
+    reopened.close()
+
+
+def test_warm_loads_the_most_used_entries(path):
+    cache = LLMCache(path)
+    for i in range(5):
+        cache.put(f"question {i}", SCHEMA, f"SELECT {i}", "")
+    for i in range(5):
+        for _ in range(i):
+            cache.get(f"question {i}", SCHEMA)
+    cache.close()
+
+    warmed = LLMCache(path, max_memory_entries=2)
+    warmed.warm()
+    assert warmed.stats()["warm_entries"] == 2
+    assert warmed.get("question 4", SCHEMA) is not None
+    assert warmed.get("question 3", SCHEMA) is not None
+    assert warmed.stats()["memory_hits"] == 2
+    assert warmed.get("question 0", SCHEMA) is not None
+    assert warmed.stats()["disk_hits"] == 1
+    warmed.close()
+
+
+def test_hit_counts_are_flushed_in_batches_and_on_close(path, monkeypatch):
+    monkeypatch.setattr(llm_cache, 'TOUCH_FLUSH_EVERY', 3)
+    cache = LLMCache(path)
+    for i in range(4):
+        cache.put(f"question {i}", SCHEMA, f"SELECT {i}", "")
+
+    def hits():
+        conn = sqlite3.connect(path)
+        try:
+            return dict(conn.execute("SELECT question, hits FROM generations").fetchall())
+        finally:
+            conn.close()
+
+    cache.get("question 0", SCHEMA)
+    cache.get("question 0", SCHEMA)
+    cache.get("question 1", SCHEMA)
+    assert hits()["question 0"] == 0
+    cache.get("question 2", SCHEMA)
+    # Third distinct key: the batch is written
+    assert hits() == {"question 0": 2, "question 1": 1, "question 2": 1, "question 3": 0}
+
+    cache.get("question 3", SCHEMA)
+    cache.close()
+    assert hits()["question 3"] == 1
+
+
+def test_warm_time(path):
+    """Startup warm-up of MAX_MEMORY_ENTRIES from a cache holding MAX_DISK_ENTRIES rows."""
+    cache = LLMCache(path)
+    cache.close()
+    now = time.time()
+    conn = sqlite3.connect(path)
+    conn.executemany(
+        "INSERT INTO generations VALUES (?, ?, ?, ?, ?, ?, ?)",
+        [(f"key{i}", f"question {i}", f"SELECT {i} FROM products WHERE price > {i}", "Filters products",
+          i % 97, now - i, now - i) for i in range(llm_cache.MAX_DISK_ENTRIES)]
+    )
+    conn.commit()
+    conn.close()
+
+    start = time.perf_counter()
+    cache = LLMCache(path)
+    cache.warm()
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    print(f"\nOpened and warmed {cache.stats()['warm_entries']} of {llm_cache.MAX_DISK_ENTRIES} entries "
+          f"in {elapsed_ms:.1f}ms")
+    assert cache.stats()["warm_entries"] == llm_cache.MAX_MEMORY_ENTRIES
+    assert cache.stats()["disk_entries"] == llm_cache.MAX_DISK_ENTRIES
+    assert elapsed_ms < MAX_WARM_MS
+    cache.close()
+
+
+def test_generation_reads_and_writes_the_cache_off_the_event_loop(path, monkeypatch):
+    import server
+    from llm_response import JsonEnvelopeParser
+
+    threads = []
+
+    class RecordingCache(LLMCache):
+        def get(self, *args):
+            threads.append(threading.current_thread())
+            return super().get(*args)
+
+        def put(self, *args):
+            threads.append(threading.current_thread())
+            return super().put(*args)
+
+    def stream_completion(client, messages):
+        parser = JsonEnvelopeParser()
+        parser.feed('{"sql": "SELECT COUNT(*) FROM products", "explanation": ""}')
+        return parser
+
+    cache = RecordingCache(path)
+    monkeypatch.setattr(server, 'llm_cache', cache)
+    monkeypatch.setattr(server, 'active_database', 'default')
+    monkeypatch.setattr(server, 'stream_completion', stream_completion)
+
+    first = asyncio.run(server.generate_sql_with_llm("how many products"))
+    second = asyncio.run(server.generate_sql_with_llm("how many products"))
+    assert not first.get("cached") and second["cached"]
+    assert len(threads) == 3
+    assert threading.main_thread() not in threads
+    cache.close()
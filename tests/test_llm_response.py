@@ -0,0 +1,100 @@
+"""
+JsonEnvelopeParser against a corpus of model outputs (tests/data/llm_outputs.jsonl),
+streamed in random chunks, truncated and wrapped in noise.
+"""
+
+import json
+import random
+import time
+from pathlib import Path
+
+import pytest
+
+import llm_response
+from llm_response import JsonEnvelopeParser
+
+CORPUS = [
+    json.loads(line)
+    for line in (Path(__file__).parent / 'data' / 'llm_outputs.jsonl').read_text(encoding='utf-8').splitlines()
+]
+ENVELOPES = [case for case in CORPUS if case["kind"] == "envelopes"]
+
+NOISE = [
+    "Here you go:\n",
+    "Thinking about {customers} and {orders}...\n",
+    "Note: use {placeholder syntax carefully\n",
+    'He said "hi" and left.\n',
+    "```json\n",
+    "}}} stray braces\n",
+]
+
+
+def _parse(text, chunks=None):
+    parser = JsonEnvelopeParser()
+    for chunk in chunks or [text]:
+        parser.feed(chunk)
+    return parser.finish()
+
+
+def _random_chunks(text, rng):
+    cuts = sorted(rng.sample(range(1, len(text)), min(len(text) - 1, rng.randint(1, 12)))) if len(text) > 1 else []
+    bounds = [0] + cuts + [len(text)]
+    return [text[a:b] for a, b in zip(bounds, bounds[1:])]
+
+
+@pytest.mark.parametrize('case', CORPUS, ids=[case["name"] for case in CORPUS])
+def test_corpus(case):
+    before = dict(llm_response.parse_stats)
+    result = _parse(case["output"])
+    assert result["sql"] == case["sql"]
+    assert isinstance(result["explanation"], str)
+    assert llm_response.parse_stats[case["kind"]] == before[case["kind"]] + 1
+
+
+@pytest.mark.parametrize('case', CORPUS, ids=[case["name"] for case in CORPUS])
+def test_streamed_chunks_match_single_feed(case):
+    rng = random.Random(case["name"])
+    expected = _parse(case["output"])
+    for _ in range(20):
+        assert _parse(case["output"], _random_chunks(case["output"], rng)) == expected
+
+
+def test_envelope_completes_before_trailing_text_arrives():
+    parser = JsonEnvelopeParser()
+    assert parser.feed('{"sql": "SELECT 1", "expla') is None
+    assert parser.feed('nation": "x"} and more') == {"sql": "SELECT 1", "explanation": "x"}
+    assert parser.feed(' ignored {"sql": "SELECT 2"}')["sql"] == "SELECT 1"
+
+
+@pytest.mark.parametrize('case', ENVELOPES, ids=[case["name"] for case in ENVELOPES])
+def test_noise_around_envelope(case):
+    rng = random.Random(case["name"])
+    for _ in range(20):
+        text = rng.choice(NOISE) + case["output"] + rng.choice(NOISE)
+        assert _parse(text)["sql"] == case["sql"], text
+
+
+def test_truncation_never_raises():
+    rng = random.Random(0)
+    for case in CORPUS:
+        text = case["output"]
+        for cut in sorted({rng.randint(0, len(text)) for _ in range(30)}):
+            result = _parse(text[:cut])
+            assert isinstance(result["sql"], str)
+            assert isinstance(result["explanation"], str)
+
+
+def test_parse_success_rate_and_cost():
+    """Share of corpus outputs parsed to the expected SQL, and the average parse cost."""
+    rounds = 200
+    parsed = 0
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for case in CORPUS:
+            parsed += _parse(case["output"])["sql"] == case["sql"]
+    avg_us = (time.perf_counter() - start) / (rounds * len(CORPUS)) * 1e6
+    success_rate = parsed / (rounds * len(CORPUS))
+    print(f"\n{len(CORPUS)} outputs: success rate {success_rate:.3f}, {avg_us:.1f}us per parse")
+
+    assert success_rate == 1.0
+    assert avg_us < 1000
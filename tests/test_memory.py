@@ -0,0 +1,96 @@
+"""
+Memory use of the upload pipeline: compact string columns and peak RSS
+per MB of input for parsing, cleaning and profiling a wide CSV.
+"""
+
+import os
+import subprocess
+import sys
+import textwrap
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from file_handler import compact_strings
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent / 'backend'
+
+# Size of the generated CSV; set MEMORY_BENCH_MB=70 for the full-size run
+BENCH_MB = int(os.environ.get('MEMORY_BENCH_MB', '20'))
+
+# Peak RSS growth allowed per MB of CSV input
+MAX_RSS_PER_INPUT_MB = 3.0
+
+
+def _wide_csv(path, target_mb):
+    rng = np.random.default_rng(0)
+    rows = 20000
+    columns = {}
+    for i in range(6):
+        columns[f"category_{i}"] = rng.choice([f"value_{j}" for j in range(40)], rows)
+    for i in range(8):
+        columns[f"metric_{i}"] = rng.random(rows).round(4)
+    for i in range(4):
+        columns[f"count_{i}"] = rng.integers(0, 10000, rows)
+    columns["order_date"] = (pd.Timestamp('2023-01-01') + pd.to_timedelta(rng.integers(0, 365, rows), unit='D')).strftime('%Y-%m-%d')
+    columns["email"] = [f"user{n}@example.com" for n in rng.integers(0, 10**9, rows)]
+    chunk = pd.DataFrame(columns).to_csv(index=False)
+    header, body = chunk.split('\n', 1)
+    with open(path, 'w') as f:
+        f.write(header + '\n')
+        written = 0
+        while written < target_mb * 1024 * 1024:
+            f.write(body)
+            written += len(body)
+
+
+def test_compact_strings_shrinks_repeated_text():
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({
+        'region': rng.choice(['North', 'South', 'East', 'West'], 50000).astype(object),
+        'email': [f"user{i}@example.com" for i in range(50000)],
+        'amount': rng.random(50000),
+    })
+    expected = df.copy()
+    before = df['region'].memory_usage(deep=True)
+
+    compact_strings(df)
+
+    assert isinstance(df['region'].dtype, pd.CategoricalDtype)
+    assert df['region'].memory_usage(deep=True) * 10 < before
+    # Unique text and numbers keep their dtypes
+    assert df['email'].dtype == object
+    assert df['amount'].dtype == np.float64
+    pd.testing.assert_frame_equal(df.astype({'region': object}), expected)
+
+
+def test_peak_rss_per_input_mb(tmp_path):
+    """Peak RSS growth of process_uploaded_file per MB of CSV (MEMORY_BENCH_MB of input)."""
+    csv_path = tmp_path / 'wide.csv'
+    _wide_csv(csv_path, BENCH_MB)
+
+    # A fresh interpreter, so the high-water mark only reflects this upload
+    script = textwrap.dedent(f"""
+        import resource, sys
+        sys.path.insert(0, {str(BACKEND_DIR)!r})
+        from file_handler import process_uploaded_file
+        content = open({str(csv_path)!r}, 'rb').read()
+        before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        df, schema, preview, stats = process_uploaded_file(content, 'wide.csv')
+        after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        print(len(content), before, after, df.memory_usage(deep=True).sum())
+    """)
+    output = subprocess.run(
+        [sys.executable, '-W', 'ignore', '-c', script], capture_output=True, text=True, check=True
+    ).stdout.split()
+    input_bytes, before_kb, after_kb, frame_bytes = (int(value) for value in output)
+
+    input_mb = input_bytes / 1024 / 1024
+    rss_per_mb = (after_kb - before_kb) / 1024 / input_mb
+    print(
+        f"\n{input_mb:.0f} MB CSV: peak RSS +{(after_kb - before_kb) / 1024:.0f} MB "
+        f"({rss_per_mb:.2f} per input MB), cleaned frame {frame_bytes / 1024 / 1024:.0f} MB"
+    )
+    assert rss_per_mb <= MAX_RSS_PER_INPUT_MB
+    assert frame_bytes < input_bytes
@@ -0,0 +1,84 @@
+"""Approximate answers from weighted samples, compared with the exact query."""
+
+import sqlite3
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import sample_tables
+from sample_tables import build_sample_table, rewrite_for_sample, run_on_sample
+
+SCHEMA = {'region': 'TEXT', 'units': 'INTEGER', 'revenue': 'REAL'}
+ROWS = 20000
+
+
+@pytest.fixture(scope='module')
+def conn():
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.setattr(sample_tables, 'MIN_ROWS_FOR_SAMPLE', 10000)
+        monkeypatch.setattr(sample_tables, 'SAMPLE_SIZE', 4000)
+        rng = np.random.default_rng(0)
+        df = pd.DataFrame({
+            # One rare region so stratification has to keep it
+            'region': rng.choice(['North', 'South', 'East', 'West', 'Polar'], ROWS, p=[0.3, 0.3, 0.2, 0.195, 0.005]),
+            'units': rng.integers(1, 20, ROWS),
+            'revenue': rng.gamma(2.0, 50.0, ROWS).round(2),
+        })
+        conn = sqlite3.connect(':memory:')
+        conn.execute("CREATE TABLE sales (region TEXT, units INTEGER, revenue REAL)")
+        df.to_sql('sales', conn, if_exists='append', index=False)
+        info = build_sample_table(conn, 'sales', SCHEMA)
+        assert info["stratify_column"] == 'region'
+    yield conn
+    conn.close()
+
+
+def _exact(conn, sql):
+    return conn.execute(sql).fetchall()
+
+
+def test_counts_per_stratum_are_exact(conn):
+    sql = "SELECT region, COUNT(*) FROM sales GROUP BY region ORDER BY region"
+    approximate = run_on_sample(conn, sql, 'sales')
+    assert approximate["rows"] == _exact(conn, sql)
+    assert approximate["columns"] == ['region', 'COUNT(*)']
+
+
+@pytest.mark.parametrize('sql', [
+    "SELECT region, SUM(revenue) AS total, AVG(units) FROM sales GROUP BY region ORDER BY region",
+    "SELECT SUM(revenue), COUNT(revenue), AVG(revenue) FROM sales WHERE units > 10",
+])
+def test_estimates_fall_within_error_bounds(conn, sql):
+    approximate = run_on_sample(conn, sql, 'sales')
+    exact = _exact(conn, sql)
+    assert len(approximate["rows"]) == len(exact)
+    for row, exact_row, bounds in zip(approximate["rows"], exact, approximate["error_bounds"]):
+        for name, value, exact_value in zip(approximate["columns"], row, exact_row):
+            if name in bounds:
+                # 95% bounds; allow twice the half-width so the test is not flaky
+                assert abs(value - exact_value) <= 2 * bounds[name] + 1e-9, (name, value, exact_value, bounds)
+            else:
+                assert value == exact_value
+
+
+@pytest.mark.parametrize('sql', [
+    "SELECT MIN(revenue), MAX(revenue) FROM sales",
+    "SELECT SUM(revenue), MAX(units) FROM sales",
+    "SELECT region, AVG(revenue) FROM sales GROUP BY region HAVING MAX(units) > 5",
+    "SELECT region, SUM(revenue) FROM sales GROUP BY region ORDER BY MIN(revenue)",
+    "SELECT COUNT(DISTINCT region) FROM sales",
+    "SELECT region, SUM(revenue) / COUNT(*) FROM sales GROUP BY region",
+    "SELECT * FROM sales WHERE region = 'Polar'",
+])
+def test_unsupported_queries_are_answered_exactly(conn, sql):
+    assert rewrite_for_sample(sql, 'sales', '_sample_sales') is None
+    assert run_on_sample(conn, sql, 'sales') is None
+
+
+def test_small_tables_get_no_sample():
+    conn = sqlite3.connect(':memory:')
+    conn.execute("CREATE TABLE tiny (region TEXT, units INTEGER, revenue REAL)")
+    conn.execute("INSERT INTO tiny VALUES ('North', 1, 2.0)")
+    assert build_sample_table(conn, 'tiny', SCHEMA) is None
+    assert run_on_sample(conn, "SELECT COUNT(*) FROM tiny", 'tiny') is None
@@ -0,0 +1,71 @@
+"""Generate-validate-repair loop with a scripted model."""
+
+import asyncio
+
+import pytest
+
+import server
+from llm_response import JsonEnvelopeParser
+
+
+class ScriptedModel:
+    """Replays scripted SQL answers (the last one repeats) and records the messages of each call."""
+
+    def __init__(self):
+        self.answers = []
+        self.calls = []
+
+    def __call__(self, client, messages):
+        self.calls.append([dict(message) for message in messages])
+        parser = JsonEnvelopeParser()
+        parser.feed(f'{{"sql": "{self.answers[min(len(self.calls), len(self.answers)) - 1]}", "explanation": "x"}}')
+        return parser
+
+
+@pytest.fixture
+def model(monkeypatch):
+    """Stub stream_completion on the default database, without the cache."""
+    script = ScriptedModel()
+    monkeypatch.setattr(server, 'stream_completion', script)
+    monkeypatch.setattr(server, 'active_database', 'default')
+    monkeypatch.setattr(server, 'llm_cache', None)
+    monkeypatch.setattr(server, 'generation_metrics', dict.fromkeys(server.generation_metrics, 0))
+    return script
+
+
+def test_invalid_sql_is_sent_back_with_the_error_and_repaired(model):
+    model.answers = ["SELECT revenue FROM orders", "SELECT SUM(total_price) FROM orders"]
+    result = asyncio.run(server.generate_sql_with_llm("total revenue"))
+
+    assert result["sql"] == "SELECT SUM(total_price) FROM orders"
+    assert result["attempts"] == 2
+    assert result["validated"] is True
+    # The second call sees the failed answer and SQLite's error
+    repair = model.calls[1]
+    assert repair[-2]["role"] == "assistant" and "SELECT revenue FROM orders" in repair[-2]["content"]
+    assert repair[-1]["role"] == "user" and "no such column: revenue" in repair[-1]["content"]
+    assert server.generation_metrics["repaired"] == 1
+
+
+def test_valid_sql_needs_one_attempt(model):
+    model.answers = ["SELECT COUNT(*) FROM products"]
+    result = asyncio.run(server.generate_sql_with_llm("how many products"))
+    assert (result["attempts"], result["validated"]) == (1, True)
+    assert len(model.calls) == 1
+
+
+def test_repair_stops_after_the_bounded_number_of_tries(model, monkeypatch):
+    stored = []
+    monkeypatch.setattr(server, 'llm_cache', type('Cache', (), {
+        'get': lambda self, question, fp: None,
+        'put': lambda self, *args: stored.append(args),
+    })())
+    model.answers = ["SELECT nothing FROM nowhere"]
+    result = asyncio.run(server.generate_sql_with_llm("something impossible"))
+
+    assert len(model.calls) == server.MAX_REPAIR_ATTEMPTS + 1
+    assert result["attempts"] == server.MAX_REPAIR_ATTEMPTS + 1
+    assert result["validated"] is False
+    # Unvalidated SQL is never cached
+    assert stored == []
+    assert server.generation_metrics["failed_validation"] == 1
@@ -0,0 +1,106 @@
+"""Rollup rewrites must return exactly what the base-table query returns."""
+
+import os
+import sqlite3
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from summary_tables import build_summary_tables, rewrite_with_summaries
+from tests.helpers import assert_same_results
+
+SCHEMA = {'order_date': 'TEXT', 'region': 'TEXT', 'product': 'TEXT', 'quantity': 'INTEGER', 'revenue': 'REAL'}
+
+# Rows for the latency benchmark; set SUMMARY_BENCH_ROWS=10000000 for the full-size run
+BENCH_ROWS = int(os.environ.get('SUMMARY_BENCH_ROWS', '200000'))
+
+
+def _sales(rows: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    dates = pd.Timestamp('2023-01-01') + pd.to_timedelta(rng.integers(0, 730, rows), unit='D')
+    df = pd.DataFrame({
+        'order_date': dates.strftime('%Y-%m-%d'),
+        'region': rng.choice(['North', 'South', 'East', 'West'], rows),
+        'product': rng.choice([f"P{i}" for i in range(20)], rows),
+        'quantity': rng.integers(1, 10, rows),
+        'revenue': (rng.random(rows) * 1000).round(2),
+    })
+    # Missing measures must be counted the same way by the rollups
+    df.loc[df.index % 97 == 0, 'revenue'] = None
+    return df
+
+
+def _load(conn: sqlite3.Connection, df: pd.DataFrame) -> None:
+    conn.execute(f"CREATE TABLE sales ({', '.join(f'{c} {t}' for c, t in SCHEMA.items())})")
+    df.to_sql('sales', conn, if_exists='append', index=False)
+    build_summary_tables(conn, 'sales', SCHEMA)
+    conn.commit()
+
+
+@pytest.fixture(scope='module')
+def conn():
+    conn = sqlite3.connect(':memory:')
+    _load(conn, _sales(5000))
+    yield conn
+    conn.close()
+
+
+REWRITTEN = [
+    "SELECT region, SUM(revenue) FROM sales GROUP BY region",
+    "SELECT region, COUNT(*), AVG(revenue), MIN(quantity), MAX(quantity) FROM sales GROUP BY region ORDER BY region",
+    "SELECT region, SUM(revenue) AS total FROM sales WHERE region IN ('North', 'East') GROUP BY region",
+    "SELECT product, COUNT(revenue) FROM sales GROUP BY product HAVING SUM(quantity) > 100",
+    "SELECT strftime('%Y-%m', order_date) AS month, SUM(revenue) FROM sales "
+    "GROUP BY strftime('%Y-%m', order_date) ORDER BY month",
+    "SELECT COUNT(*), SUM(revenue), AVG(quantity) FROM sales",
+    "SELECT region, SUM(quantity) FROM sales GROUP BY region ORDER BY SUM(quantity) DESC LIMIT 2",
+]
+
+NOT_REWRITTEN = [
+    "SELECT region, COUNT(DISTINCT product) FROM sales GROUP BY region",
+    "SELECT region, SUM(revenue) FROM sales WHERE quantity > 5 GROUP BY region",
+    "SELECT region, product, SUM(revenue) FROM sales GROUP BY region, product",
+    "SELECT * FROM sales WHERE region = 'North'",
+    "SELECT region, SUM(revenue * quantity) FROM sales GROUP BY region",
+]
+
+
+@pytest.mark.parametrize('sql', REWRITTEN)
+def test_rewrite_matches_base_table(conn, sql):
+    rewritten = rewrite_with_summaries(conn, sql, 'sales')
+    assert '_summary_sales_' in rewritten
+    assert_same_results(conn, sql, rewritten)
+
+
+@pytest.mark.parametrize('sql', NOT_REWRITTEN)
+def test_unsupported_queries_run_unchanged(conn, sql):
+    assert rewrite_with_summaries(conn, sql, 'sales') == sql
+
+
+def test_other_tables_are_not_rewritten(conn):
+    sql = "SELECT region, SUM(revenue) FROM sales GROUP BY region"
+    assert rewrite_with_summaries(conn, sql, 'orders') == sql
+
+
+def test_rollup_latency(tmp_path):
+    """Aggregate latency on the base table vs its rollup (SUMMARY_BENCH_ROWS rows)."""
+    conn = sqlite3.connect(tmp_path / 'bench.db')
+    try:
+        _load(conn, _sales(BENCH_ROWS, seed=1))
+        sql = "SELECT region, SUM(revenue), AVG(quantity) FROM sales GROUP BY region ORDER BY region"
+        rewritten = rewrite_with_summaries(conn, sql, 'sales')
+
+        timings = {}
+        for name, query in (('base', sql), ('rollup', rewritten)):
+            start = time.perf_counter()
+            for _ in range(3):
+                conn.execute(query).fetchall()
+            timings[name] = (time.perf_counter() - start) / 3 * 1000
+        print(f"\n{BENCH_ROWS} rows: base {timings['base']:.1f}ms, rollup {timings['rollup']:.2f}ms")
+
+        assert_same_results(conn, sql, rewritten)
+        assert timings['rollup'] * 10 < timings['base']
+    finally:
+        conn.close()
@@ -0,0 +1,98 @@
+"""Template fast path: questions it answers, and questions it must leave to the LLM."""
+
+import pytest
+
+from template_matcher import TemplateMatcher
+
+
+def _column(name, column_type):
+    return {"name": name, "type": column_type}
+
+
+SCHEMA = {
+    'products': [_column('id', 'INTEGER'), _column('name', 'TEXT'), _column('category', 'TEXT'),
+                 _column('price', 'REAL'), _column('stock', 'INTEGER')],
+    'customers': [_column('id', 'INTEGER'), _column('name', 'TEXT'), _column('city', 'TEXT'),
+                  _column('created_at', 'TEXT')],
+    'orders': [_column('id', 'INTEGER'), _column('customer_id', 'INTEGER'), _column('total_price', 'REAL'),
+               _column('status', 'TEXT'), _column('created_at', 'TEXT')],
+    'students': [_column('id', 'INTEGER'), _column('name', 'TEXT'), _column('grade', 'TEXT'),
+                 _column('score', 'REAL')],
+}
+
+
+def _stats(*values):
+    return {"distinct_count": len(values), "top_values": [{"value": value, "count": 5} for value in values]}
+
+
+STATS = {
+    'products': {'category': _stats('Electronics', 'Books')},
+    'orders': {'status': _stats('pending', 'shipped')},
+    'students': {'grade': _stats('A', 'B', 'C')},
+}
+
+
+@pytest.fixture(scope='module')
+def matcher():
+    return TemplateMatcher(SCHEMA, STATS)
+
+
+@pytest.mark.parametrize('question, sql', [
+    ("how many products are there", "SELECT COUNT(*) AS count FROM products"),
+    ("number of orders by status",
+     "SELECT status, COUNT(*) AS count FROM orders GROUP BY status ORDER BY count DESC"),
+    ("average price by category",
+     "SELECT category, AVG(price) AS avg_price FROM products GROUP BY category ORDER BY avg_price DESC"),
+    ("fewest products by category",
+     "SELECT category, COUNT(*) AS count FROM products GROUP BY category ORDER BY count ASC"),
+    ("average price of products", "SELECT AVG(price) AS avg_price FROM products"),
+    ("top 5 products by price", "SELECT * FROM products ORDER BY price DESC LIMIT 5"),
+    ("cheapest products", "SELECT * FROM products ORDER BY price ASC LIMIT 10"),
+    ("least expensive products", "SELECT * FROM products ORDER BY price ASC LIMIT 10"),
+    ("3 most expensive products", "SELECT * FROM products ORDER BY price DESC LIMIT 3"),
+    ("newest customers", "SELECT * FROM customers ORDER BY created_at DESC LIMIT 10"),
+    ("show pending orders", "SELECT * FROM orders WHERE status = 'pending'"),
+    ("students with grade a", "SELECT * FROM students WHERE grade = 'A'"),
+])
+def test_answered_shapes(matcher, question, sql):
+    result = matcher.match(question)
+    assert (result and result["sql"]) == sql
+
+
+@pytest.mark.parametrize('question', [
+    # Per-group rankings are not group counts
+    "most expensive product in each category",
+    "cheapest product in each category",
+    "newest customer in each city",
+    "latest order for every status",
+    # Aggregates over ranked rows are not aggregates over the table
+    "average price of the cheapest products",
+    "total price of the top 5 products",
+    "how many of the most expensive products",
+    # Conflicting orderings
+    "newest cheapest products",
+])
+def test_order_words_the_template_cannot_use(matcher, question):
+    assert matcher.match(question) is None
+
+
+@pytest.mark.parametrize('question, sql', [
+    # "a" is an article, not grade A
+    ("show me a list of students", "SELECT * FROM students"),
+    ("how many students have a score", None),
+    ("average score of a student", "SELECT AVG(score) AS avg_score FROM students"),
+])
+def test_short_values_need_their_column_name(matcher, question, sql):
+    result = matcher.match(question)
+    assert (result and result["sql"]) == sql
+
+
+@pytest.mark.parametrize('question', [
+    "products with stock",
+    "show products with a price",
+    "customers whose city",
+    "products having stock",
+])
+def test_conditions_without_a_value(matcher, question):
+    """A column after "with"/"whose" starts a condition the question never finishes."""
+    assert matcher.match(question) is None
@@ -0,0 +1,139 @@
+"""Partition pruning: rewritten queries must return what the view returns."""
+
+import sqlite3
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import time_partitions
+from tests.helpers import assert_same_results
+from time_partitions import build_time_partitions, detect_datetime_columns, rewrite_with_partitions
+
+SCHEMA = {'id': 'INTEGER', 'order_date': 'TEXT', 'shipped_at': 'TEXT', 'region': 'TEXT', 'amount': 'REAL'}
+ROWS = 3000
+
+
+def _frame():
+    rng = np.random.default_rng(0)
+    dates = pd.Timestamp('2023-01-01') + pd.to_timedelta(rng.integers(0, 540, ROWS), unit='D')
+    shipped = dates + pd.to_timedelta(rng.integers(0, 10 * 86400, ROWS), unit='s')
+    df = pd.DataFrame({
+        'id': np.arange(ROWS),
+        'order_date': pd.Series(dates.strftime('%Y-%m-%d'), dtype=object),
+        'shipped_at': pd.Series(shipped.strftime('%Y-%m-%d %H:%M:%S'), dtype=object),
+        'region': rng.choice(['North', 'South', 'East'], ROWS),
+        'amount': rng.gamma(2.0, 40.0, ROWS).round(2),
+    })
+    # Rows without a date live in their own partition
+    df.loc[::97, 'order_date'] = None
+    df.loc[::89, 'shipped_at'] = None
+    return df
+
+
+@pytest.fixture(scope='module')
+def conn():
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.setattr(time_partitions, 'PARTITION_MIN_ROWS', 100)
+        df = _frame()
+        formats = detect_datetime_columns(df)
+        assert formats == {'order_date': '%Y-%m-%d', 'shipped_at': '%Y-%m-%d %H:%M:%S'}
+        conn = sqlite3.connect(':memory:')
+        partitions = build_time_partitions(conn, df, 'orders', SCHEMA, formats)
+        # 18 months plus the missing dates
+        assert len(partitions) == 19
+        conn.execute("CREATE TABLE plain_orders (id INTEGER, order_date TEXT, shipped_at TEXT, region TEXT, amount REAL)")
+        df.to_sql('plain_orders', conn, if_exists='append', index=False)
+    yield conn
+    conn.close()
+
+
+def test_view_matches_plain_table(conn):
+    assert_same_results(conn, "SELECT * FROM plain_orders", "SELECT * FROM orders")
+
+
+QUERIES = [
+    "SELECT * FROM orders",
+    "SELECT COUNT(*) FROM orders",
+    "SELECT COUNT(*) FROM orders WHERE order_date >= '2023-06-01'",
+    "SELECT * FROM orders WHERE order_date >= '2023-03-01' AND order_date < '2023-05-01'",
+    "SELECT id, amount FROM orders WHERE order_date > '2023-03-15' AND order_date <= '2023-04-15'",
+    "SELECT COUNT(*) FROM orders WHERE order_date = '2023-02-14'",
+    "SELECT COUNT(*) FROM orders WHERE '2023-02-14' <= order_date AND '2023-03-01' > order_date",
+    "SELECT SUM(amount) FROM orders WHERE order_date BETWEEN '2023-01-10' AND '2023-02-20'",
+    "SELECT region, COUNT(*) FROM orders WHERE order_date BETWEEN '2023-12' AND '2024-01' GROUP BY region",
+    # Periods: whole years, months and days
+    "SELECT COUNT(*) FROM orders WHERE order_date >= '2024'",
+    "SELECT COUNT(*) FROM orders WHERE order_date < '2023-07'",
+    "SELECT COUNT(*) FROM orders WHERE order_date > '2023-07'",
+    "SELECT COUNT(*) FROM orders WHERE order_date <= '2023-07'",
+    "SELECT COUNT(*) FROM orders WHERE order_date = '2023'",
+    "SELECT COUNT(*) FROM orders WHERE strftime('%Y', order_date) = '2023'",
+    "SELECT region, SUM(amount) FROM orders WHERE strftime('%Y-%m', order_date) = '2024-02' GROUP BY region",
+    "SELECT COUNT(*) FROM orders WHERE strftime('%Y-%m-%d', order_date) = '2023-08-09'",
+    # Literals that are not a whole period or value keep their text predicate
+    "SELECT COUNT(*) FROM orders WHERE order_date >= '2023-06-1'",
+    "SELECT COUNT(*) FROM orders WHERE order_date < '2023-06-15 12:00'",
+    "SELECT COUNT(*) FROM orders WHERE order_date > '2023-06-15T00'",
+    "SELECT COUNT(*) FROM orders WHERE order_date BETWEEN '2023-06-15' AND '2023-07-01 08:00'",
+    # Timestamps on a second datetime column
+    "SELECT COUNT(*) FROM orders WHERE shipped_at >= '2023-05-01 12:30:00' AND shipped_at < '2023-05-02'",
+    "SELECT id, shipped_at FROM orders WHERE shipped_at > '2024-01-01 00:00:00' ORDER BY shipped_at, id LIMIT 20",
+    "SELECT COUNT(*) FROM orders WHERE shipped_at = '2023-05-01'",
+    "SELECT COUNT(*) FROM orders WHERE order_date >= '2023-05-01' AND shipped_at < '2023-05-03'",
+    # Ranges out of the data, empty and contradictory
+    "SELECT COUNT(*) FROM orders WHERE order_date >= '2030-01-01'",
+    "SELECT * FROM orders WHERE order_date < '2000-01-01'",
+    "SELECT COUNT(*) FROM orders WHERE order_date >= '2023-05-01' AND order_date < '2023-04-01'",
+    # Predicates the rewrite does not understand are kept
+    "SELECT COUNT(*) FROM orders WHERE order_date >= '2023-06-01' OR region = 'North'",
+    "SELECT COUNT(*) FROM orders WHERE order_date IS NULL",
+    "SELECT COUNT(*) FROM orders WHERE order_date LIKE '2023-0%'",
+    "SELECT COUNT(*) FROM orders WHERE region = 'East' AND (order_date < '2023-02-01' OR order_date > '2024-05-01')",
+    "SELECT COUNT(*) FROM orders WHERE order_date >= 'not a date'",
+    # Literals naming no real period
+    "SELECT COUNT(*) FROM orders WHERE order_date >= '2023-13'",
+    "SELECT COUNT(*) FROM orders WHERE order_date < '2023-00'",
+    "SELECT COUNT(*) FROM orders WHERE order_date BETWEEN '2023-00' AND '2023-05'",
+    "SELECT COUNT(*) FROM orders WHERE order_date >= '2023-13-01'",
+    "SELECT COUNT(*) FROM orders WHERE strftime('%Y-%m', order_date) = '2023-00'",
+    "SELECT COUNT(*) FROM orders WHERE strftime('%Y-%m', order_date) = '2023-13'",
+    "SELECT COUNT(*) FROM orders WHERE strftime('%Y-%m-%d', order_date) = '2023-02-30'",
+    "SELECT COUNT(*) FROM orders WHERE shipped_at >= '2023-02-30'",
+    "SELECT COUNT(*) FROM orders WHERE shipped_at < '2023-04-31 10:00'",
+    "SELECT COUNT(*) FROM orders WHERE order_date >= '0000'",
+    "SELECT COUNT(*) FROM orders WHERE order_date <= '9999-12'",
+    "SELECT COUNT(*) FROM orders WHERE order_date = '2023-02-30'",
+    "SELECT COUNT(*) FROM orders WHERE order_date != '2023-02-14'",
+    "SELECT COUNT(*) FROM orders WHERE order_date IN ('2023-02-14', '2023-03-01')",
+    "SELECT COUNT(*) FROM orders WHERE NOT order_date >= '2024'",
+    "SELECT * FROM orders WHERE order_date BETWEEN '2024-05-01' AND '2024-04-01'",
+    "SELECT id FROM orders WHERE id IN (SELECT id FROM orders WHERE order_date > '2024-01-01') AND order_date > '2023-12-01'",
+    # Ordering, grouping and expressions on the rendered text
+    "SELECT order_date, SUM(amount) FROM orders WHERE order_date >= '2024-03-01' GROUP BY order_date ORDER BY order_date",
+    "SELECT substr(order_date, 1, 7) AS month, COUNT(*) FROM orders GROUP BY month ORDER BY month",
+    "SELECT MIN(order_date), MAX(order_date) FROM orders WHERE region = 'South'",
+    "SELECT region, COUNT(*) FROM orders WHERE order_date >= '2024' GROUP BY region HAVING COUNT(*) > 1",
+    "SELECT orders.id FROM orders WHERE orders.order_date = '2023-09-30' ORDER BY orders.id",
+]
+
+
+@pytest.mark.parametrize('sql', QUERIES)
+def test_rewrite_returns_same_rows(conn, sql):
+    rewritten = rewrite_with_partitions(conn, sql, 'orders')
+    assert_same_results(conn, sql, rewritten)
+
+
+@pytest.mark.parametrize('sql, partitions', [
+    ("SELECT COUNT(*) FROM orders WHERE order_date >= '2023-03-01' AND order_date < '2023-05-01'", 2),
+    ("SELECT COUNT(*) FROM orders WHERE strftime('%Y', order_date) = '2024'", 6),
+    ("SELECT COUNT(*) FROM orders WHERE order_date = '2023-02-14'", 1),
+    ("SELECT COUNT(*) FROM orders WHERE order_date >= '2030-01-01'", 1),
+])
+def test_rewrite_prunes_partitions(conn, sql, partitions):
+    assert rewrite_with_partitions(conn, sql, 'orders').count(' FROM _tp_orders_') == partitions
+
+
+def test_other_tables_are_left_alone(conn):
+    sql = "SELECT COUNT(*) FROM plain_orders WHERE order_date >= '2024'"
+    assert rewrite_with_partitions(conn, sql, 'orders') == sql